@@ -1,8 +1,8 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from datetime import datetime
-from sqlalchemy import text
+from datetime import datetime, timedelta
+from sqlalchemy import text, bindparam
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
@@ -13,13 +13,36 @@ from langchain_core.runnables import RunnablePassthrough, RunnableWithMessageHis
 from langchain_community.chat_message_histories import ChatMessageHistory
 from dotenv import load_dotenv
 from functools import wraps
+from write_behind import WriteBehindQueue
+from device_state import DeviceStateTable
+from spatial_index import GridIndex, ClusterGrid
+from ping_buffer import RecentPingBuffer
+from event_stream import EventHub, format_sse
+from data_versions import DataVersions
+from single_flight import SingleFlightCache
+from kpi_counters import KPI_NAMES, adjust_kpi, read_kpi, reconcile_kpi
+from heatmap import build_ping_heatmap
+from histograms import ValueColumn, battery_histogram, age_histogram
+from rollups import record_ride, record_report, query_rollups, query_region_totals
+from regions import REGION_ALL, REGION_OTHER, load_region_index, region_names, assign_device_regions
+from ride_metrics import load_ride_points, compute_ride_metrics
+from trajectory import compress_ride_trajectory, load_ride_trajectory
+from timestamps import parse_client_timestamp, parse_local_datetime
+from realtime_records import MAX_AGE_SECONDS, MAX_FUTURE_SKEW_SECONDS, normalize_realtime_record
+from report_images import decode_report_image, image_mimetype, store_report_image
+from blob_store import BlobStore
+from retry_queue import RetryQueue
+from thumbnails import THUMBNAIL_SIZES, ThumbnailCache, ThumbnailWorkerPool, generate_thumbnails, thumbnails_available
+from fleet_snapshot import encode_fleet_snapshot, MIME_TYPE as FLEET_SNAPSHOT_MIME_TYPE
 
 import requests
-import base64
+import hashlib
 import json
 import uuid
 import re
 import os
+import threading
+import time
 
 app = Flask(__name__)
 
@@ -207,76 +230,411 @@ def users():
 def statistics():
     return render_template('statistics.html')
 
+############################ 조건부 조회 (ETag) ############################
+
+# 데이터 종류별 버전 (쓰기 API가 커밋 후 bump, 조회 API는 ETag 계산에 사용)
+# devices: device_info(상태, 배터리 구간) / device_use_log, positions: device_latest_position(위치만 바뀐 경우)
+# users: user_info, reports: report_log
+data_versions = DataVersions(os.getenv('DATA_VERSION_DIR'), names=('devices', 'positions', 'users', 'reports'))
+
+# 앱 밖(직접 SQL 등)에서 바뀐 데이터도 이 시간(초) 안에는 반영되도록 ETag에 시간 구간을 포함
+ETAG_MAX_AGE_SECONDS = int(os.getenv('ETAG_MAX_AGE_SECONDS', 300))
+
+def conditional_get(*names):
+    """names 데이터의 버전과 요청 URL로 ETag를 만들고, If-None-Match가 같으면 쿼리 없이 304 반환"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            versions = data_versions.get_many(names)
+            key = "|".join([
+                request.full_path,
+                str(int(time.time() // ETAG_MAX_AGE_SECONDS)),
+                *(f"{name}={versions[name]}" for name in names)
+            ])
+            etag = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+            
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            response.set_etag(etag, weak=True)
+            # 브라우저가 매번 If-None-Match로 재검증하도록 설정
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+############################ 대시보드 KPI 카운터 ############################
+
+# 배터리 부족 기준 (%)
+LOW_BATTERY_LEVEL = 20
+
+# 워커별로 이 주기(초)마다 카운터를 실제 COUNT 값과 맞춤
+KPI_RECONCILE_SECONDS = float(os.getenv('KPI_RECONCILE_SECONDS', 300))
+kpi_state = {'reconciled_at': None, 'last_drift': {}}
+kpi_reconcile_lock = threading.Lock()
+
+def reconcile_kpi_counters():
+    """kpi_counter를 실제 COUNT 값으로 맞춤 (요청 트랜잭션과 분리된 별도 연결에서 실행)"""
+    with kpi_reconcile_lock:
+        with db.engine.begin() as conn:
+            drift = reconcile_kpi(conn, LOW_BATTERY_LEVEL)
+        kpi_state['reconciled_at'] = time.monotonic()
+        kpi_state['last_drift'] = {name: {'counter': before, 'actual': actual} for name, (before, actual) in drift.items()}
+    if drift:
+        print(f"KPI 카운터 보정: {kpi_state['last_drift']}")
+    return drift
+
+def get_kpi_counters():
+    """대시보드 KPI (카운터 6행 조회, 주기가 지났거나 카운터가 없으면 먼저 보정)"""
+    reconciled_at = kpi_state['reconciled_at']
+    if reconciled_at is None or time.monotonic() - reconciled_at >= KPI_RECONCILE_SECONDS:
+        try:
+            reconcile_kpi_counters()
+        except Exception as e:
+            # 보정에 실패해도 기존 카운터로 응답하고 다음 주기에 다시 시도
+            kpi_state['reconciled_at'] = time.monotonic()
+            print(f"KPI 카운터 보정 오류: {str(e)}")
+    kpi = read_kpi(db.session)
+    if len(kpi) < len(KPI_NAMES):
+        reconcile_kpi_counters()
+        kpi = read_kpi(db.session)
+    return kpi
+
+# 대시보드 KPI 조회 API
+@app.route('/api/kpi')
+def get_kpi():
+    try:
+        kpi = get_kpi_counters()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'KPI 조회 중 오류가 발생했습니다: {str(e)}'}), 500
+    reconciled_at = kpi_state['reconciled_at']
+    return jsonify({
+        **kpi,
+        'reconciled_age': round(time.monotonic() - reconciled_at, 1) if reconciled_at is not None else None,
+        'last_drift': kpi_state['last_drift']
+    })
+
 # 웹 관리자용 디바이스 목록 조회 API
+# 지도 영역 조회 시 최대 기기 수
+WEB_MAP_MAX_DEVICES = int(os.getenv('WEB_MAP_MAX_DEVICES', 5000))
+
+# 지도 영역 파라미터 파싱 함수
+def parse_bbox(value):
+    """'minLat,minLng,maxLat,maxLng' 문자열을 (min_lat, min_lng, max_lat, max_lng)로 변환"""
+    parts = [float(v) for v in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError('bbox는 minLat,minLng,maxLat,maxLng 형식이어야 합니다.')
+    min_lat, min_lng, max_lat, max_lng = parts
+    if not (-90 <= min_lat < max_lat <= 90 and -180 <= min_lng < max_lng <= 180):
+        raise ValueError('bbox 좌표 범위가 올바르지 않습니다.')
+    return min_lat, min_lng, max_lat, max_lng
+
+# 웹 관리자용 디바이스 조회 (전체/변경분/지도 영역/페이지, WHERE 절 등은 query_web_devices 호출하는 쪽에서 추가)
+WEB_DEVICES_SQL = """
+    SELECT 
+        d.DEVICE_CODE,
+        d.device_type,
+        COALESCE(ST_X(r.location), ST_X(d.location)) AS latitude,
+        COALESCE(ST_Y(r.location), ST_Y(d.location)) AS longitude,
+        d.battery_level,
+        d.is_used,
+        COALESCE(r.now_time, d.created_at) AS last_updated,
+        u.USER_ID as current_user_id
+    FROM device_info d
+    LEFT JOIN device_latest_position r ON d.DEVICE_CODE = r.DEVICE_CODE
+    LEFT JOIN device_use_log u ON d.DEVICE_CODE = u.DEVICE_CODE 
+        AND u.end_time IS NULL 
+        AND d.is_used = 1
+"""
+
+# since 커서 이후 위치/배터리/상태가 바뀐 기기 조건 (updated_at 인덱스 두 개를 각각 사용)
+CHANGED_DEVICES_CONDITION = """
+    d.DEVICE_CODE IN (
+        SELECT DEVICE_CODE FROM device_info WHERE updated_at > :since
+        UNION
+        SELECT DEVICE_CODE FROM device_latest_position WHERE updated_at > :since
+    )
+"""
+
+# updated_at은 커밋 시각이 아니라 UPDATE 문을 실행한 시각이므로, 커서는 아직 커밋되지 않은 트랜잭션 중
+# 가장 오래된 것의 시작 시각보다 뒤로 가지 않게 만든다 (그 트랜잭션이 늦게 커밋해도 다음 조회에 포함).
+# trx_started가 초 단위이고 문 시작과 트랜잭션 등록 사이에 간격이 있어 이 시간만큼 더 겹쳐서 조회 (중복 항목은 클라이언트가 덮어씀)
+CHANGE_FEED_OVERLAP_SECONDS = 1
+# information_schema.innodb_trx를 읽을 권한(PROCESS)이 없을 때 대신 겹쳐서 조회할 시간
+CHANGE_FEED_FALLBACK_OVERLAP_SECONDS = 60
+change_cursor_state = {'use_innodb_trx': True}
+
+CHANGE_CURSOR_SQL = text("""
+    SELECT LEAST(NOW(6), COALESCE((
+        SELECT MIN(trx_started) FROM information_schema.innodb_trx
+        WHERE trx_mysql_thread_id != CONNECTION_ID() AND trx_autocommit_non_locking = 0
+    ), NOW(6)))
+""")
+
+# 변경분 커서 생성 함수
+def get_change_cursor():
+    """DB 시계 기준 커서 문자열 반환 (조회 전에 만들어 조회 중 변경과 커밋되지 않은 변경은 다음 조회에 포함)"""
+    if change_cursor_state['use_innodb_trx']:
+        try:
+            cursor = db.session.execute(CHANGE_CURSOR_SQL).scalar()
+            return cursor.isoformat(timespec='microseconds')
+        except Exception as e:
+            db.session.rollback()
+            change_cursor_state['use_innodb_trx'] = False
+            print(f"innodb_trx 조회 불가, 변경분 커서를 {CHANGE_FEED_FALLBACK_OVERLAP_SECONDS}초 겹쳐서 만듦: {str(e)}")
+    now = db.session.execute(text("SELECT NOW(6)")).scalar()
+    return (now - timedelta(seconds=CHANGE_FEED_FALLBACK_OVERLAP_SECONDS)).isoformat(timespec='microseconds')
+
+# 변경분 커서 파싱 함수
+def parse_change_cursor(value):
+    """커서 문자열을 조회 기준 시각으로 변환 (겹침 구간 적용)"""
+    try:
+        cursor = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError('since 커서 형식이 올바르지 않습니다.')
+    return cursor - timedelta(seconds=CHANGE_FEED_OVERLAP_SECONDS)
+
+# 웹 디바이스 조회 함수 (binary면 컬럼 순서 그대로의 행 튜플, 아니면 serialize_web_device에 넘길 매핑)
+def query_web_devices(clause='', params=None, binary=False):
+    result = db.session.execute(text(WEB_DEVICES_SQL + clause), params or {})
+    # 바이너리 응답은 기기별 dict를 만들지 않고 행 튜플에서 바로 열 배열로 변환
+    return result.all() if binary else result.mappings().all()
+
+# 변경된 웹 디바이스 조회 함수
+def query_changed_web_devices(since, binary=False):
+    return query_web_devices(" WHERE " + CHANGED_DEVICES_CONDITION, {'since': since}, binary)
+
+# 지도용 바이너리 스냅샷 응답 (format=binary, 형식은 fleet_snapshot.py 참고)
+def fleet_snapshot_response(rows, cursor, removed=(), truncated=False):
+    response = Response(encode_fleet_snapshot(rows, cursor, removed, truncated), mimetype=FLEET_SNAPSHOT_MIME_TYPE)
+    response.headers['X-Changes-Cursor'] = cursor
+    return response
+
+# 웹 관리자용 변경분 조회 (since 모드, bbox가 있으면 영역 밖으로 나간 기기는 removed로 전달)
+def get_web_device_changes(since, bbox=None, binary=False):
+    cursor = get_change_cursor()
+    rows = query_changed_web_devices(since, binary)
+    
+    removed = []
+    if bbox is not None:
+        min_lat, min_lng, max_lat, max_lng = bbox
+        inside = []
+        for r in rows:
+            # 튜플 행의 컬럼 순서: DEVICE_CODE, device_type, latitude, longitude, ... (WEB_DEVICES_SQL)
+            lat, lng = (r[2], r[3]) if binary else (r['latitude'], r['longitude'])
+            if lat is not None and lng is not None and min_lat <= lat <= max_lat and min_lng <= lng <= max_lng:
+                inside.append(r)
+            else:
+                removed.append(r[0] if binary else r['DEVICE_CODE'])
+        rows = inside
+    
+    if binary:
+        return fleet_snapshot_response(rows, cursor, removed)
+    
+    devices = [serialize_web_device(r) for r in rows]
+    
+    response = jsonify({
+        'devices': devices,
+        'removed': removed,
+        'count': len(devices),
+        'cursor': cursor
+    })
+    response.headers['X-Changes-Cursor'] = cursor
+    return response
+
+# 웹 관리자용 디바이스 항목 변환 (목록, 변경분, 지도 영역 조회와 실시간 스트림에서 공통 사용)
+def serialize_web_device(r):
+    return {
+        'device_id': r['DEVICE_CODE'],
+        'device_type': r['device_type'] or '킥보드',
+        'latitude': float(r['latitude']) if r['latitude'] is not None else None,
+        'longitude': float(r['longitude']) if r['longitude'] is not None else None,
+        'battery_level': r['battery_level'],
+        'is_used': r['is_used'],
+        'status': 'in_use' if r['is_used'] == 1 else 'available',
+        'current_user_id': r['current_user_id'],
+        'last_updated': r['last_updated'].isoformat() if r['last_updated'] else None
+    }
+
+# 웹 관리자용 지도 영역 디바이스 조회 (device_latest_position 공간 인덱스 사용)
+def get_web_devices_in_bbox(bbox, limit, binary=False):
+    min_lat, min_lng, max_lat, max_lng = bbox
+    # POINT(위도 경도) 순서로 저장하므로 영역 다각형도 같은 순서로 구성
+    polygon = (
+        f"POLYGON(({min_lat} {min_lng}, {max_lat} {min_lng}, {max_lat} {max_lng}, "
+        f"{min_lat} {max_lng}, {min_lat} {min_lng}))"
+    )
+    cursor = get_change_cursor()
+    # r.location 조건이 device_latest_position이 없는 행을 걸러 내므로 공간 인덱스로 r부터 읽음
+    rows = query_web_devices(
+        " WHERE MBRContains(ST_GeomFromText(:polygon, 4326), r.location) LIMIT :limit",
+        {'polygon': polygon, 'limit': limit + 1},
+        binary
+    )
+    truncated = len(rows) > limit
+    rows = rows[:limit]
+    
+    if binary:
+        return fleet_snapshot_response(rows, cursor, truncated=truncated)
+    
+    result = [serialize_web_device(r) for r in rows]
+    
+    response = jsonify({
+        'devices': result,
+        'bbox': [min_lat, min_lng, max_lat, max_lng],
+        'count': len(result),
+        'truncated': truncated,
+        'cursor': cursor
+    })
+    response.headers['X-Changes-Cursor'] = cursor
+    return response
+
 @app.route('/api/web/devices')
+@conditional_get('devices', 'positions')
 def get_web_devices():
+    # 지도 영역 모드: bbox=minLat,minLng,maxLat,maxLng (화면에 보이는 기기만 반환)
+    bbox = request.args.get('bbox')
+    since = request.args.get('since')
+    # format=binary: 지도용 열 단위 바이너리 스냅샷 (bbox/since 모드에서 사용)
+    binary = request.args.get('format') == 'binary'
+    try:
+        bbox = parse_bbox(bbox) if bbox else None
+        since = parse_change_cursor(since) if since else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # 변경분 모드: since=<이전 응답의 cursor> (그 이후 위치/배터리/상태가 바뀐 기기만 반환)
+    if since is not None:
+        return get_web_device_changes(since, bbox, binary)
+    if bbox is not None:
+        limit = min(max(request.args.get('limit', WEB_MAP_MAX_DEVICES, type=int), 1), WEB_MAP_MAX_DEVICES)
+        return get_web_devices_in_bbox(bbox, limit, binary)
+    
     # 페이징 파라미터 받기
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     
+    # 다음 변경분 조회(since)에 쓸 커서
+    cursor = get_change_cursor()
+    
     # 전체 개수 조회
     count_sql = text("SELECT COUNT(*) as total FROM device_info")
     total_count = db.session.execute(count_sql).scalar()
     
     # 페이징된 데이터 조회
     offset = (page - 1) * per_page
-    sql = text(
-        """
-        SELECT 
-            d.DEVICE_CODE,
-            d.device_type,
-            COALESCE(ST_X(r.location), ST_X(d.location)) AS latitude,
-            COALESCE(ST_Y(r.location), ST_Y(d.location)) AS longitude,
-            d.battery_level,
-            d.is_used,
-            COALESCE(r.now_time, d.created_at) AS last_updated,
-            u.USER_ID as current_user_id
-        FROM device_info d
-        LEFT JOIN device_realtime_log r ON d.DEVICE_CODE = r.DEVICE_CODE 
-            AND r.now_time = (
-                SELECT MAX(now_time) 
-                FROM device_realtime_log r2 
-                WHERE r2.DEVICE_CODE = d.DEVICE_CODE
-            )
-        LEFT JOIN device_use_log u ON d.DEVICE_CODE = u.DEVICE_CODE 
-            AND u.end_time IS NULL 
-            AND d.is_used = 1
-        ORDER BY d.created_at DESC
-        LIMIT :per_page OFFSET :offset
-        """
+    rows = query_web_devices(
+        " ORDER BY d.created_at DESC LIMIT :per_page OFFSET :offset",
+        {'per_page': per_page, 'offset': offset}
     )
-    rows = db.session.execute(sql, {'per_page': per_page, 'offset': offset}).mappings().all()
     
     # 프론트 호환: id는 일련번호로 제공
-    result = []
-    for idx, r in enumerate(rows, start=offset + 1):
-        # is_used 값을 상태로 변환 (기본값은 available)
-        status = 'available'
-        if r['is_used'] == 1:
-            status = 'in_use'
-        
-        result.append({
-            'id': idx,
-            'device_id': r['DEVICE_CODE'],
-            'device_type': r['device_type'] or '킥보드',  # 기본값 설정
-            'latitude': float(r['latitude']) if r['latitude'] is not None else None,
-            'longitude': float(r['longitude']) if r['longitude'] is not None else None,
-            'battery_level': r['battery_level'],
-            'is_used': r['is_used'],
-            'status': status,
-            'current_user_id': r['current_user_id'],
-            'last_updated': r['last_updated'].isoformat() if r['last_updated'] else None
-        })
+    result = [{'id': idx, **serialize_web_device(r)} for idx, r in enumerate(rows, start=offset + 1)]
     
     # 페이징 정보 포함하여 반환
-    return jsonify({
+    response = jsonify({
         'devices': result,
         'pagination': {
             'page': page,
             'per_page': per_page,
             'total': total_count,
             'pages': (total_count + per_page - 1) // per_page
-        }
+        },
+        'cursor': cursor
+    })
+    response.headers['X-Changes-Cursor'] = cursor
+    return response
+
+# 지도 클러스터 설정
+CLUSTER_CELL_PX = int(os.getenv('CLUSTER_CELL_PX', 64))                       # 클러스터 칸 크기(화면 픽셀)
+CLUSTER_MAX_ZOOM = int(os.getenv('CLUSTER_MAX_ZOOM', 16))                     # 이보다 확대하면 bbox 기기 조회 사용
+CLUSTER_REFRESH_SECONDS = float(os.getenv('CLUSTER_REFRESH_SECONDS', 5))      # 기기 위치 스냅샷 최소 갱신 간격(초)
+CLUSTER_MAX_COUNT = 2000
+
+# 전체 기기 위치 스냅샷 기반 클러스터 색인 (워커별, 줌 레벨별 집계 캐시)
+cluster_grid = ClusterGrid(cell_px=CLUSTER_CELL_PX)
+cluster_state = {'version': None}
+cluster_rebuild_lock = threading.Lock()
+
+CLUSTER_DEVICES_SQL = text(
+    """
+    SELECT 
+        d.DEVICE_CODE,
+        COALESCE(ST_X(r.location), ST_X(d.location)) AS latitude,
+        COALESCE(ST_Y(r.location), ST_Y(d.location)) AS longitude,
+        d.is_used,
+        d.battery_level
+    FROM device_info d
+    LEFT JOIN device_latest_position r ON d.DEVICE_CODE = r.DEVICE_CODE
+    """
+)
+
+def ensure_cluster_grid():
+    """기기/위치 데이터 버전이 바뀌었으면 (최대 CLUSTER_REFRESH_SECONDS마다 한 번) 스냅샷 다시 구성"""
+    age = cluster_grid.age()
+    if age is not None and age < CLUSTER_REFRESH_SECONDS:
+        return
+    version = (data_versions.get('devices'), data_versions.get('positions'))
+    if age is not None and version == cluster_state['version'] and age < ETAG_MAX_AGE_SECONDS:
+        return
+    # 다른 스레드가 구성 중이면 기존 스냅샷으로 응답 (처음 구성할 때만 기다림)
+    if not cluster_rebuild_lock.acquire(blocking=age is None):
+        return
+    try:
+        if cluster_grid.age() is not None and cluster_grid.age() < CLUSTER_REFRESH_SECONDS:
+            return
+        started = time.monotonic()
+        rows = db.session.execute(CLUSTER_DEVICES_SQL).all()
+        cluster_grid.rebuild(
+            [r[0] for r in rows],
+            [float(r[1]) if r[1] is not None else float('nan') for r in rows],
+            [float(r[2]) if r[2] is not None else float('nan') for r in rows],
+            [1 if r[3] == 1 else 0 for r in rows],
+            [float(r[4]) if r[4] is not None else float('nan') for r in rows]
+        )
+        cluster_state['version'] = version
+        print(f"클러스터 색인 구성: 기기 {len(cluster_grid)}대, {(time.monotonic() - started) * 1000:.1f}ms")
+    finally:
+        cluster_rebuild_lock.release()
+
+# 웹 관리자용 지도 클러스터 조회 API (축소된 지도에서 기기 대신 칸별 집계를 표시)
+@app.route('/api/web/device-clusters')
+def get_web_device_clusters():
+    """zoom 레벨 화면 격자 칸별 기기 수, 무게중심, 대여 가능/사용 중 수, 최저 배터리 반환"""
+    zoom = request.args.get('zoom', type=int)
+    bbox = request.args.get('bbox')
+    if zoom is None or not bbox:
+        return jsonify({'error': 'zoom과 bbox가 필요합니다.'}), 400
+    if not 0 <= zoom <= CLUSTER_MAX_ZOOM:
+        return jsonify({'error': f'zoom은 0~{CLUSTER_MAX_ZOOM} 사이여야 합니다. 더 확대한 경우 /api/web/devices?bbox=를 사용하세요.'}), 400
+    try:
+        bbox = parse_bbox(bbox)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        ensure_cluster_grid()
+    except Exception as e:
+        db.session.rollback()
+        print(f"클러스터 색인 구성 오류: {str(e)}")
+        if cluster_grid.age() is None:
+            return jsonify({'error': f'클러스터 조회 중 오류가 발생했습니다: {str(e)}'}), 500
+    
+    clusters, total, truncated = cluster_grid.clusters(zoom, bbox, CLUSTER_MAX_COUNT)
+    return jsonify({
+        'zoom': zoom,
+        'bbox': list(bbox),
+        'cell_px': CLUSTER_CELL_PX,
+        'max_zoom': CLUSTER_MAX_ZOOM,
+        'clusters': clusters,
+        'total': total,
+        'truncated': truncated,
+        'snapshot_age': round(cluster_grid.age(), 1)
     })
 
 # 웹 관리자용 개별 디바이스 상세 조회 API
@@ -293,12 +651,7 @@ def get_web_device(device_id):
             COALESCE(r.now_time, d.created_at) AS last_updated,
             u.USER_ID as current_user_id
         FROM device_info d
-        LEFT JOIN device_realtime_log r ON d.DEVICE_CODE = r.DEVICE_CODE 
-            AND r.now_time = (
-                SELECT MAX(now_time) 
-                FROM device_realtime_log r2 
-                WHERE r2.DEVICE_CODE = d.DEVICE_CODE
-            )
+        LEFT JOIN device_latest_position r ON d.DEVICE_CODE = r.DEVICE_CODE
         LEFT JOIN device_use_log u ON d.DEVICE_CODE = u.DEVICE_CODE 
             AND u.end_time IS NULL 
             AND d.is_used = 1
@@ -314,6 +667,9 @@ def get_web_device(device_id):
     if r['is_used'] == 1:
         status = 'in_use'
     
+    # 최근 속도는 메모리 상태에서 가져옴 (이 워커가 받은 실시간 로그 기준)
+    state = device_states.get(r['DEVICE_CODE'])
+    
     return jsonify({
         'id': 1,
         'device_id': r['DEVICE_CODE'],
@@ -323,6 +679,7 @@ def get_web_device(device_id):
         'is_used': r['is_used'],
         'status': status,
         'current_user_id': r['current_user_id'],
+        'speed_kmh': round(state.speed_kmh, 2) if state is not None and state.speed_kmh is not None else None,
         'last_updated': r['last_updated'].isoformat() if r['last_updated'] else None
     })
 
@@ -339,12 +696,7 @@ def get_device(device_id):
             d.is_used,
             COALESCE(r.now_time, d.created_at) AS last_updated
         FROM device_info d
-        LEFT JOIN device_realtime_log r ON d.DEVICE_CODE = r.DEVICE_CODE 
-            AND r.now_time = (
-                SELECT MAX(now_time) 
-                FROM device_realtime_log r2 
-                WHERE r2.DEVICE_CODE = d.DEVICE_CODE
-            )
+        LEFT JOIN device_latest_position r ON d.DEVICE_CODE = r.DEVICE_CODE
         WHERE d.DEVICE_CODE = :device_code
         """
     )
@@ -367,9 +719,68 @@ def get_device(device_id):
         'last_updated': r['last_updated'].isoformat() if r['last_updated'] else None
     })
 
-# 신고 목록 조회 API
+# 신고 목록 페이지 크기
+REPORTS_DEFAULT_LIMIT = 50
+REPORTS_MAX_LIMIT = 500
+
+# 신고 유형 필터 -> report_case 조건 (목록의 report_type 매핑과 같은 기준)
+REPORT_TYPE_CONDITIONS = {
+    'helmet_multi': "(r.report_case IS NULL OR r.report_case NOT IN (1, 2))",
+    'helmet_single': "r.report_case = 1",
+    'no_helmet_multi': "r.report_case = 2"
+}
+
+# 신고 상태 필터 -> is_verified 조건 (1이 아니면 해결 대기 중)
+REPORT_STATUS_CONDITIONS = {
+    'resolved': "r.is_verified = 1",
+    'dismissed': "(r.is_verified IS NULL OR r.is_verified <> 1)"
+}
+
+# 신고 목록 조회 API (최신순, 사진 본문 제외)
 @app.route('/api/reports')
+@conditional_get('reports', 'users')
 def get_reports():
+    """before_id: 이 ID보다 오래된 신고부터 (키셋 페이지네이션), limit: 개수 (기본 50, 최대 500)
+    status: resolved/dismissed, type: helmet_multi/helmet_single/no_helmet_multi,
+    from/to: 신고 시각 범위 (YYYY-MM-DD 또는 YYYY-MM-DDTHH:MM, 날짜만 주면 to는 그날 끝까지)
+
+    다음 페이지가 있으면 X-Next-Before-Id 헤더로 다음 요청의 before_id를 알려준다.
+    사진은 has_image/image_url만 담고 본문은 /api/reports/<id>/image에서 받는다.
+    """
+    status_filter = request.args.get('status')
+    type_filter = request.args.get('type')
+    if status_filter and status_filter not in REPORT_STATUS_CONDITIONS:
+        return jsonify({'error': f"status는 {', '.join(REPORT_STATUS_CONDITIONS)} 중 하나여야 합니다."}), 400
+    if type_filter and type_filter not in REPORT_TYPE_CONDITIONS:
+        return jsonify({'error': f"type은 {', '.join(REPORT_TYPE_CONDITIONS)} 중 하나여야 합니다."}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', REPORTS_DEFAULT_LIMIT)), 1), REPORTS_MAX_LIMIT)
+        before_id = int(request.args['before_id']) if request.args.get('before_id') else None
+        date_from = datetime.fromisoformat(request.args['from']) if request.args.get('from') else None
+        date_to = None
+        if request.args.get('to'):
+            date_to = datetime.fromisoformat(request.args['to'])
+            if len(request.args['to']) == 10:
+                date_to += timedelta(days=1)
+    except ValueError:
+        return jsonify({'error': 'limit/before_id는 정수, from/to는 YYYY-MM-DD 또는 YYYY-MM-DDTHH:MM 형식이어야 합니다.'}), 400
+    
+    conditions = []
+    params = {'limit': limit + 1}
+    if before_id is not None:
+        conditions.append("r.id < :before_id")
+        params['before_id'] = before_id
+    if status_filter:
+        conditions.append(REPORT_STATUS_CONDITIONS[status_filter])
+    if type_filter:
+        conditions.append(REPORT_TYPE_CONDITIONS[type_filter])
+    if date_from is not None:
+        conditions.append("r.report_time >= :date_from")
+        params['date_from'] = date_from
+    if date_to is not None:
+        conditions.append("r.report_time < :date_to")
+        params['date_to'] = date_to
+    
     sql = text(
         """
         SELECT 
@@ -382,16 +793,24 @@ def get_reports():
             report_time,
             is_verified,
             report_case,
-            image,
+            r.has_image,
+            r.image_sha256,
+            r.image_width,
+            r.image_height,
+            r.attribution_status,
             u.name AS reported_user_name
         FROM report_log r
         LEFT JOIN user_info u ON r.REPORTED_USER_ID = u.USER_ID
-        ORDER BY report_time DESC
         """
+        + (" WHERE " + " AND ".join(conditions) if conditions else "")
+        + " ORDER BY r.id DESC LIMIT :limit"
     )
-    rows = db.session.execute(sql).mappings().all()
+    rows = db.session.execute(sql, params).mappings().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
     result = []
-    for idx, r in enumerate(rows, start=1):
+    for r in rows:
         status = 'dismissed' if r['is_verified'] == 0 else ('resolved' if r['is_verified'] == 1 else 'dismissed')
         
         # report_case 값에 따른 신고 유형 매핑
@@ -403,34 +822,111 @@ def get_reports():
         elif r['report_case'] == 2:
             report_type = 'no_helmet_multi'
         
-        # 이미지 데이터 처리
-        image_data = None
-        if r['image']:
-            # 이미지 데이터를 Base64로 인코딩
-            if isinstance(r['image'], bytes):
-                image_data = base64.b64encode(r['image']).decode('utf-8')
-            elif isinstance(r['image'], str):
-                # 이미 Base64 문자열인 경우
-                image_data = r['image']
-        
         result.append({
             'id': r['id'],  # 실제 데이터베이스 ID 사용
             'device_id': r['device_id'],
             'user_id': r['reporter_user_id'],
             'REPORTED_USER_ID': r['REPORTED_USER_ID'],
             'reported_user_name': r['reported_user_name'],
+            'attribution_status': r['attribution_status'],
             'report_type': report_type,
             'description': '',
-            'image_data': image_data,  # Base64 인코딩된 이미지 데이터
+            'has_image': bool(r['has_image']),
+            'image_url': url_for('get_report_image', report_id=r['id']) if r['has_image'] else None,
+            # 방향 보정된 썸네일 (목록 200px, 상세 800px), 원본은 image_url로 필요할 때만
+            'thumbnail_url': url_for('get_report_thumbnail', report_id=r['id'], size=THUMBNAIL_SIZES[0]) if r['has_image'] else None,
+            'preview_url': url_for('get_report_thumbnail', report_id=r['id'], size=THUMBNAIL_SIZES[-1]) if r['has_image'] else None,
+            'image_width': r['image_width'],
+            'image_height': r['image_height'],
             'latitude': float(r['latitude']) if r['latitude'] is not None else None,
             'longitude': float(r['longitude']) if r['longitude'] is not None else None,
             'report_date': r['report_time'].isoformat() if r['report_time'] else None,
             'status': status
         })
-    return jsonify(result)
+    
+    response = jsonify(result)
+    if has_more and result:
+        response.headers['X-Next-Before-Id'] = str(result[-1]['id'])
+    return response
+
+# 신고 사진은 등록 후 바뀌지 않으므로 브라우저가 오래 캐시하도록 설정
+REPORT_IMAGE_MAX_AGE = int(os.getenv('REPORT_IMAGE_MAX_AGE', 31536000))
+
+# 신고 사진 파일 저장소 (SHA-256 해시 이름, 같은 사진은 한 번만 저장)
+blob_store = BlobStore(os.getenv('BLOB_STORE_DIR'))
+if not blob_store.durable:
+    print(f"사진 저장소({blob_store.directory})가 임시 디렉터리입니다. 신고 사진은 DB(image)에도 함께 저장합니다.")
+
+# 신고 사진 썸네일 (원본 해시별 디스크 캐시, 신고 접수 시 백그라운드 스레드가 미리 생성)
+thumbnail_cache = ThumbnailCache(os.getenv('THUMBNAIL_DIR'))
+thumbnail_pool = ThumbnailWorkerPool(
+    thumbnail_cache, blob_store,
+    workers=int(os.getenv('THUMBNAIL_WORKERS', 2)),
+    max_queue=int(os.getenv('THUMBNAIL_QUEUE_SIZE', 1000))
+)
+
+# 신고 사진 조회 API
+@app.route('/api/reports/<int:report_id>/image')
+def get_report_image(report_id):
+    etag = f"report-{report_id}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        row = db.session.execute(
+            text("SELECT image_sha256, image FROM report_log WHERE id = :report_id"), {'report_id': report_id}
+        ).first()
+        data = None
+        if row is not None and row[0]:
+            data = blob_store.get(row[0])
+            if data is None:
+                print(f"신고 사진 파일 없음: report_id={report_id}, sha256={row[0]}")
+        elif row is not None:
+            # 아직 이관하지 않은 이전 데이터
+            data = decode_report_image(row[1])
+        if not data:
+            return jsonify({'error': '사진이 없습니다.'}), 404
+        response = Response(data, mimetype=image_mimetype(data))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f'private, max-age={REPORT_IMAGE_MAX_AGE}, immutable'
+    return response
+
+# 신고 사진 썸네일 조회 API (size: THUMBNAIL_SIZES 중 하나)
+@app.route('/api/reports/<int:report_id>/thumbnail/<int:size>')
+def get_report_thumbnail(report_id, size):
+    if size not in THUMBNAIL_SIZES:
+        return jsonify({'error': f"size는 {', '.join(map(str, THUMBNAIL_SIZES))} 중 하나여야 합니다."}), 400
+    
+    etag = f"report-{report_id}-{size}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        digest = db.session.execute(
+            text("SELECT image_sha256 FROM report_log WHERE id = :report_id"), {'report_id': report_id}
+        ).scalar()
+        data = thumbnail_cache.get(digest, size) if digest else None
+        if data is None and digest and thumbnails_available():
+            # 백그라운드 생성 전이거나 큐가 가득 차 빠진 경우 즉석 생성
+            try:
+                generate_thumbnails(thumbnail_cache, blob_store, digest)
+                data = thumbnail_cache.get(digest, size)
+            except Exception as e:
+                print(f"썸네일 생성 오류: report_id={report_id}, {str(e)}")
+        if data is None:
+            # 썸네일을 만들 수 없으면 (Pillow 미설치, 이관 전 사진) 원본으로 안내
+            return redirect(url_for('get_report_image', report_id=report_id))
+        response = Response(data, mimetype='image/jpeg')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f'private, max-age={REPORT_IMAGE_MAX_AGE}, immutable'
+    return response
+
+# 썸네일 생성 상태 조회 API (워커별)
+@app.route('/api/reports/thumbnail-stats')
+def get_thumbnail_stats():
+    return jsonify({'pid': os.getpid(), 'sizes': list(THUMBNAIL_SIZES), **thumbnail_pool.stats()})
 
 # 사용자 목록 조회 API
 @app.route('/api/users')
+@conditional_get('users', 'reports')
 def get_users():
     sql = text(
         """
@@ -494,8 +990,22 @@ def update_user(user_id):
         }
         print(f"SQL 실행 파라미터: {params}")
         
+        # 탈퇴 상태가 바뀌면 회원 수 카운터 반영
+        previous = db.session.execute(
+            text("SELECT is_delete, age FROM user_info WHERE USER_ID = :user_id FOR UPDATE"), {'user_id': user_id}
+        ).first()
+        
         result = db.session.execute(sql, params)
+        if previous is not None:
+            adjust_kpi(db.session, total_users=(is_delete == 0) - (previous[0] == 0))
         db.session.commit()
+        data_versions.bump('users')
+        # 나이 분포는 탈퇴하지 않은 회원만 집계
+        if previous is not None:
+            if is_delete:
+                age_column.remove(user_id)
+            else:
+                age_column.set(user_id, previous[1])
         
         print(f"업데이트 결과: rowcount={result.rowcount}")
         
@@ -512,9 +1022,16 @@ def update_user(user_id):
 @app.route('/api/users/<user_id>', methods=['DELETE'])
 def delete_user(user_id):
     try:
+        previous = db.session.execute(
+            text("SELECT is_delete FROM user_info WHERE USER_ID = :user_id FOR UPDATE"), {'user_id': user_id}
+        ).first()
         sql = text("DELETE FROM user_info WHERE USER_ID = :user_id")
         result = db.session.execute(sql, {'user_id': user_id})
+        if previous is not None and previous[0] == 0:
+            adjust_kpi(db.session, total_users=-1)
         db.session.commit()
+        data_versions.bump('users')
+        age_column.remove(user_id)
         
         if result.rowcount > 0:
             return jsonify({'message': '회원이 삭제되었습니다.'})
@@ -550,7 +1067,11 @@ def create_user():
             'sex': 'M',  # 기본값
             'is_delete': is_delete
         })
+        adjust_kpi(db.session, total_users=1 if is_delete == 0 else 0)
         db.session.commit()
+        data_versions.bump('users')
+        if is_delete == 0:
+            age_column.set(user_id, None)
         return jsonify({'message': '회원이 생성되었습니다.', 'user_id': user_id}), 201
     except Exception as e:
         db.session.rollback()
@@ -574,7 +1095,7 @@ def update_report_status(report_id):
         print(f"설정할 is_verified 값: {is_verified}")
         
         # 먼저 해당 report_id가 존재하는지 확인
-        check_sql = text("SELECT id, REPORTED_DEVICE_CODE FROM report_log WHERE id = :report_id")
+        check_sql = text("SELECT id, REPORTED_DEVICE_CODE, is_verified FROM report_log WHERE id = :report_id FOR UPDATE")
         check_result = db.session.execute(check_sql, {'report_id': report_id}).mappings().first()
         
         if not check_result:
@@ -594,7 +1115,10 @@ def update_report_status(report_id):
             'is_verified': is_verified,
             'report_id': report_id
         })
+        # 처리 대기(is_verified = 0) 신고 수 카운터 반영
+        adjust_kpi(db.session, pending_reports=(is_verified == 0) - (check_result['is_verified'] == 0))
         db.session.commit()
+        data_versions.bump('reports')
         
         print(f"업데이트된 행 수: {result.rowcount}")
         
@@ -607,9 +1131,98 @@ def update_report_status(report_id):
         print(f"신고 상태 업데이트 오류: {str(e)}")
         return jsonify({'error': f'상태 업데이트 중 오류가 발생했습니다: {str(e)}'}), 500
 
-# 통계 데이터 조회 API (디바이스, 사용자, 신고 통계)
-@app.route('/api/statistics')
-def get_statistics():
+# 지역 경계 인덱스 (기본 data/regions.geojson, 기기 지역은 위치가 바뀔 때 device_info.region에 저장)
+REGION_POLYGON_FILE = os.getenv('REGION_POLYGON_FILE')
+region_index = load_region_index(REGION_POLYGON_FILE)
+region_state = {'backfilled_pid': None}
+
+def backfill_device_regions():
+    """region이 비어 있는 기기(경계 도입 전 데이터, SQL로 직접 넣은 기기)의 지역을 채움 (워커별 한 번)"""
+    if region_state['backfilled_pid'] == os.getpid():
+        return 0
+    with db.engine.begin() as conn:
+        changed = assign_device_regions(conn, only_missing=True)
+    region_state['backfilled_pid'] = os.getpid()
+    if changed:
+        print(f"기기 지역 채움: {changed}대")
+    return changed
+
+# 기기 지역 전체 재계산 API (경계 파일 교체 후 실행)
+@app.route('/api/regions/reassign', methods=['POST'])
+def reassign_device_regions():
+    try:
+        changed = assign_device_regions(db.session)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"기기 지역 재계산 오류: {str(e)}")
+        return jsonify({'error': f'기기 지역 재계산 중 오류가 발생했습니다: {str(e)}'}), 500
+    statistics_cache.invalidate()
+    return jsonify({'changed': changed, 'index': region_index.stats()})
+
+# 배터리/나이 분포용 열 (워커별 메모리, 데이터 버전이 바뀌면 최대 HISTOGRAM_REFRESH_SECONDS마다 다시 구성)
+# 나이는 이 워커가 처리한 회원 가입/생성/수정/삭제를 바로 반영
+HISTOGRAM_REFRESH_SECONDS = float(os.getenv('HISTOGRAM_REFRESH_SECONDS', 60))
+battery_column = ValueColumn('battery')
+age_column = ValueColumn('age')
+HISTOGRAM_COLUMNS = (
+    (battery_column, 'devices', text("SELECT DEVICE_CODE, battery_level FROM device_info")),
+    (age_column, 'users', text("SELECT USER_ID, age FROM user_info WHERE is_delete = 0"))
+)
+
+def ensure_histogram_columns():
+    for column, version_name, sql in HISTOGRAM_COLUMNS:
+        age = column.age()
+        if age is not None and age < HISTOGRAM_REFRESH_SECONDS:
+            continue
+        version = data_versions.get(version_name)
+        if age is not None and version == column.version:
+            continue
+        started = time.monotonic()
+        rows = db.session.execute(sql).all()
+        column.rebuild([r[0] for r in rows], [r[1] for r in rows], version)
+        print(f"{column.name} 열 구성: {len(rows)}행, {(time.monotonic() - started) * 1000:.1f}ms")
+
+# 배터리/나이 분포 조회 API (구간 폭을 바꿔 조회)
+@app.route('/api/statistics/histograms')
+def get_statistics_histograms():
+    """battery_width: 배터리 구간 폭(%, 기본 10), age_width/age_min/age_max: 나이 구간 폭과 양 끝 (기본 10/20/70)"""
+    try:
+        battery_width = int(request.args.get('battery_width', 10))
+        age_width = int(request.args.get('age_width', 10))
+        age_min = int(request.args.get('age_min', 20))
+        age_max = int(request.args.get('age_max', 70))
+    except ValueError:
+        return jsonify({'error': '구간 값은 정수여야 합니다.'}), 400
+    if not 1 <= battery_width <= 100:
+        return jsonify({'error': 'battery_width는 1~100 사이여야 합니다.'}), 400
+    if not (1 <= age_width and 1 <= age_min < age_max <= 120):
+        return jsonify({'error': 'age_width는 1 이상, age_min/age_max는 1 <= age_min < age_max <= 120이어야 합니다.'}), 400
+    
+    try:
+        ensure_histogram_columns()
+    except Exception as e:
+        db.session.rollback()
+        print(f"분포 열 구성 오류: {str(e)}")
+        if battery_column.age() is None or age_column.age() is None:
+            return jsonify({'error': f'분포 조회 중 오류가 발생했습니다: {str(e)}'}), 500
+    
+    battery_bins, battery_missing = battery_histogram(battery_column, battery_width)
+    age_bins, age_missing = age_histogram(age_column, age_width, age_min, age_max)
+    return jsonify({
+        'battery_stats': battery_bins,
+        'battery_missing': battery_missing,
+        'age_stats': age_bins,
+        'age_missing': age_missing,
+        'snapshot_age': round(max(battery_column.age(), age_column.age()), 1)
+    })
+
+# 통계 스냅샷 설정 (워커별 캐시, 만료 후 첫 요청 하나만 다시 계산하고 나머지는 이전 스냅샷 사용)
+STATISTICS_MAX_AGE = float(os.getenv('STATISTICS_MAX_AGE', 5))
+statistics_cache = SingleFlightCache(max_age=STATISTICS_MAX_AGE, name='statistics')
+
+# 통계 스냅샷 생성 (모든 통계 쿼리를 한 곳에서 실행)
+def build_statistics_snapshot():
     # 디바이스 상태 통계
     device_status_sql = text("""
         SELECT 
@@ -623,39 +1236,9 @@ def get_statistics():
     """)
     device_status = db.session.execute(device_status_sql).mappings().all()
     
-    # 배터리 레벨 통계 (10% 단위로 그룹화)
-    battery_sql = text("""
-        SELECT 
-            CASE 
-                WHEN battery_level < 10 THEN '0-9%'
-                WHEN battery_level < 20 THEN '10-19%'
-                WHEN battery_level < 30 THEN '20-29%'
-                WHEN battery_level < 40 THEN '30-39%'
-                WHEN battery_level < 50 THEN '40-49%'
-                WHEN battery_level < 60 THEN '50-59%'
-                WHEN battery_level < 70 THEN '60-69%'
-                WHEN battery_level < 80 THEN '70-79%'
-                WHEN battery_level < 90 THEN '80-89%'
-                ELSE '90-100%'
-            END as battery_range,
-            COUNT(*) as count
-        FROM device_info 
-        GROUP BY 
-            CASE 
-                WHEN battery_level < 10 THEN '0-9%'
-                WHEN battery_level < 20 THEN '10-19%'
-                WHEN battery_level < 30 THEN '20-29%'
-                WHEN battery_level < 40 THEN '30-39%'
-                WHEN battery_level < 50 THEN '40-49%'
-                WHEN battery_level < 60 THEN '50-59%'
-                WHEN battery_level < 70 THEN '60-69%'
-                WHEN battery_level < 80 THEN '70-79%'
-                WHEN battery_level < 90 THEN '80-89%'
-                ELSE '90-100%'
-            END
-        ORDER BY battery_range
-    """)
-    battery_stats = db.session.execute(battery_sql).mappings().all()
+    # 배터리 레벨 통계 (10% 단위, 메모리 열에서 bincount로 집계)
+    ensure_histogram_columns()
+    battery_stats, battery_missing = battery_histogram(battery_column)
     
     # 성별 통계
     gender_sql = text("""
@@ -672,66 +1255,22 @@ def get_statistics():
     """)
     gender_stats = db.session.execute(gender_sql).mappings().all()
     
-    # 나이대별 통계
-    age_sql = text("""
-        SELECT 
-            CASE 
-                WHEN age < 20 THEN '10대'
-                WHEN age < 30 THEN '20대'
-                WHEN age < 40 THEN '30대'
-                WHEN age < 50 THEN '40대'
-                WHEN age < 60 THEN '50대'
-                WHEN age < 70 THEN '60대'
-                ELSE '70대 이상'
-            END as age_group,
-            COUNT(*) as count
-        FROM user_info 
-        WHERE is_delete = 0 AND age IS NOT NULL
-        GROUP BY 
-            CASE 
-                WHEN age < 20 THEN '10대'
-                WHEN age < 30 THEN '20대'
-                WHEN age < 40 THEN '30대'
-                WHEN age < 50 THEN '40대'
-                WHEN age < 60 THEN '50대'
-                WHEN age < 70 THEN '60대'
-                ELSE '70대 이상'
-            END
-        ORDER BY 
-            CASE age_group
-                WHEN '10대' THEN 1
-                WHEN '20대' THEN 2
-                WHEN '30대' THEN 3
-                WHEN '40대' THEN 4
-                WHEN '50대' THEN 5
-                WHEN '60대' THEN 6
-                ELSE 7
-            END
-    """)
-    age_stats = db.session.execute(age_sql).mappings().all()
+    # 나이대별 통계 (메모리 열에서 bincount로 집계)
+    age_stats, age_missing = age_histogram(age_column)
     
-    # 지역별 디바이스 통계 (대분류 기준)
+    # 지역별 디바이스 통계 (대분류 기준, 위치가 바뀔 때 저장해 둔 device_info.region으로 집계)
+    try:
+        backfill_device_regions()
+    except Exception as e:
+        print(f"기기 지역 채움 오류: {str(e)}")
     location_sql = text("""
-        SELECT 
-            CASE 
-                WHEN ST_X(location) BETWEEN 37.413 AND 37.715 AND ST_Y(location) BETWEEN 126.764 AND 127.135 THEN '서울시'
-                WHEN ST_X(location) BETWEEN 37.0 AND 38.5 AND ST_Y(location) BETWEEN 126.0 AND 128.0 THEN '경기도'
-                WHEN ST_X(location) BETWEEN 37.2 AND 37.8 AND ST_Y(location) BETWEEN 126.3 AND 127.0 THEN '인천시'
-                ELSE '기타 지역'
-            END as district,
-            COUNT(*) as count
+        SELECT COALESCE(region, :other_region) as district, COUNT(*) as count
         FROM device_info 
         WHERE location IS NOT NULL
-        GROUP BY 
-            CASE 
-                WHEN ST_X(location) BETWEEN 37.413 AND 37.715 AND ST_Y(location) BETWEEN 126.764 AND 127.135 THEN '서울시'
-                WHEN ST_X(location) BETWEEN 37.0 AND 38.5 AND ST_Y(location) BETWEEN 126.0 AND 128.0 THEN '경기도'
-                WHEN ST_X(location) BETWEEN 37.2 AND 37.8 AND ST_Y(location) BETWEEN 126.3 AND 127.0 THEN '인천시'
-                ELSE '기타 지역'
-            END
+        GROUP BY COALESCE(region, :other_region)
         ORDER BY count DESC
     """)
-    location_stats = db.session.execute(location_sql).mappings().all()
+    location_stats = db.session.execute(location_sql, {'other_region': REGION_OTHER}).mappings().all()
     
     # 신고 유형별 통계
     report_type_sql = text("""
@@ -753,18 +1292,22 @@ def get_statistics():
     """)
     report_type_stats = db.session.execute(report_type_sql).mappings().all()
     
-    total_devices = db.session.execute(text("SELECT COUNT(*) FROM device_info")).scalar()
-    available_devices = db.session.execute(text("SELECT COUNT(*) FROM device_info WHERE is_used = 0")).scalar()
-    low_battery_devices = db.session.execute(text("SELECT COUNT(*) FROM device_info WHERE battery_level <= 20")).scalar()
-    pending_reports = db.session.execute(text("SELECT COUNT(*) FROM report_log WHERE is_verified = 0")).scalar()
-    total_users = db.session.execute(text("SELECT COUNT(*) FROM user_info WHERE is_delete = 0")).scalar()
-    total_reports = db.session.execute(text("SELECT COUNT(*) FROM report_log")).scalar()
+    # 요약 개수는 KPI 카운터에서 조회
+    kpi = get_kpi_counters()
+    total_devices = kpi['total_devices']
+    available_devices = kpi['available_devices']
+    low_battery_devices = kpi['low_battery_devices']
+    pending_reports = kpi['pending_reports']
+    total_users = kpi['total_users']
+    total_reports = kpi['total_reports']
     
-    return jsonify({
+    snapshot = {
         'device_status': [dict(row) for row in device_status],
-        'battery_stats': [dict(row) for row in battery_stats],
+        'battery_stats': battery_stats,
+        'battery_missing': battery_missing,
         'gender_stats': [dict(row) for row in gender_stats],
-        'age_stats': [dict(row) for row in age_stats],
+        'age_stats': age_stats,
+        'age_missing': age_missing,
         'location_stats': [dict(row) for row in location_stats],
         'report_type_stats': [dict(row) for row in report_type_stats],
         'summary': {
@@ -777,8 +1320,297 @@ def get_statistics():
         'available_devices': int(available_devices or 0),
         'low_battery_devices': int(low_battery_devices or 0),
         'pending_reports': int(pending_reports or 0)
+    }
+    # 내용이 같으면 같은 ETag (워커가 달라도 동일)
+    content = json.dumps(snapshot, sort_keys=True, default=str, ensure_ascii=False)
+    etag = hashlib.sha1(content.encode('utf-8')).hexdigest()[:20]
+    snapshot['generated_at'] = datetime.now().isoformat()
+    return snapshot, etag
+
+# 통계 데이터 조회 API (디바이스, 사용자, 신고 통계)
+@app.route('/api/statistics')
+def get_statistics():
+    try:
+        (snapshot, etag), age = statistics_cache.get('statistics', build_statistics_snapshot)
+    except Exception as e:
+        db.session.rollback()
+        print(f"통계 스냅샷 생성 오류: {str(e)}")
+        return jsonify({'error': f'통계 조회 중 오류가 발생했습니다: {str(e)}'}), 500
+    
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify({**snapshot, 'snapshot_age': round(age, 2), 'max_age': STATISTICS_MAX_AGE})
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Snapshot-Age'] = f"{age:.2f}"
+    return response
+
+# 시계열 통계 조회 최대 구간 수 (hour 단위는 약 3개월)
+TIMESERIES_MAX_BUCKETS = 24 * 93
+
+# 기간별 주행/매출/신고 시계열 조회 API (ride_rollup 집계 테이블 사용)
+@app.route('/api/statistics/timeseries')
+def get_statistics_timeseries():
+    """start~end(미포함) 구간의 hour/day 단위 주행 수, 매출, 이동 거리, 활성 사용자 수, 신고 수
+
+    start/end: YYYY-MM-DD 또는 YYYY-MM-DDTHH:MM (기본: 최근 7일), granularity: hour/day (기본 day),
+    region: 지역 이름 (기본 전체)
+    """
+    granularity = request.args.get('granularity', 'day')
+    region = request.args.get('region', REGION_ALL)
+    if granularity not in ('hour', 'day'):
+        return jsonify({'error': 'granularity는 hour 또는 day여야 합니다.'}), 400
+    if region != REGION_ALL and region not in region_names():
+        return jsonify({'error': f"region은 {', '.join((REGION_ALL,) + region_names())} 중 하나여야 합니다."}), 400
+    
+    try:
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        # 시간대가 붙은 값(+09:00, Z)은 서버 로컬 시각으로 바꿔 기본값(naive)과 비교
+        end = parse_local_datetime(request.args['end']) if request.args.get('end') else today + timedelta(days=1)
+        start = parse_local_datetime(request.args['start']) if request.args.get('start') else end - timedelta(days=7)
+    except ValueError:
+        return jsonify({'error': 'start/end는 YYYY-MM-DD 또는 YYYY-MM-DDTHH:MM 형식이어야 합니다.'}), 400
+    if start >= end:
+        return jsonify({'error': 'start는 end보다 앞이어야 합니다.'}), 400
+    step = timedelta(hours=1) if granularity == 'hour' else timedelta(days=1)
+    if (end - start) / step > TIMESERIES_MAX_BUCKETS:
+        return jsonify({'error': f'조회 구간이 너무 깁니다 (최대 {TIMESERIES_MAX_BUCKETS}개 구간).'}), 400
+    
+    try:
+        series = query_rollups(db.session, granularity, start, end, region)
+        regions = query_region_totals(db.session, granularity, start, end) if region == REGION_ALL else None
+    except Exception as e:
+        db.session.rollback()
+        print(f"시계열 통계 조회 오류: {str(e)}")
+        return jsonify({'error': f'시계열 통계 조회 중 오류가 발생했습니다: {str(e)}'}), 500
+    
+    totals = {
+        key: sum(point[key] for point in series)
+        for key in ('ride_count', 'revenue', 'distance_m', 'report_count')
+    }
+    return jsonify({
+        'granularity': granularity,
+        'region': region,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'series': series,
+        'totals': totals,
+        'regions': regions
     })
 
+# 통계 스냅샷 캐시 상태 조회 API (워커별)
+@app.route('/api/statistics/cache', methods=['GET'])
+def get_statistics_cache_stats():
+    return jsonify({'pid': os.getpid(), 'max_age': STATISTICS_MAX_AGE, **statistics_cache.stats()})
+
+# 히트맵 설정
+HEATMAP_DEFAULT_CELL_M = 250
+HEATMAP_MIN_CELL_M = 50
+HEATMAP_MAX_CELL_M = 5000
+HEATMAP_MAX_DAYS = int(os.getenv('HEATMAP_MAX_DAYS', 31))                      # 조회 기간 최대 일수
+HEATMAP_MAX_CELLS = int(os.getenv('HEATMAP_MAX_CELLS', 20000))                  # 응답에 담을 최대 칸 수 (많은 순)
+HEATMAP_CHUNK_SIZE = int(os.getenv('HEATMAP_CHUNK_SIZE', 50000))                # 한 번에 읽어 집계할 로그 행 수
+HEATMAP_LIVE_MAX_AGE = float(os.getenv('HEATMAP_LIVE_MAX_AGE', 60))             # 현재 시각을 포함하는 기간의 캐시 유지(초)
+HEATMAP_PAST_MAX_AGE = float(os.getenv('HEATMAP_PAST_MAX_AGE', 3600))           # 지난 기간의 캐시 유지(초)
+heatmap_cache = SingleFlightCache(max_age=HEATMAP_LIVE_MAX_AGE, max_entries=32, name='heatmap')
+
+# 실시간 위치 로그 히트맵 API (재배치 수요 파악용)
+@app.route('/api/statistics/heatmap')
+def get_statistics_heatmap():
+    """from~to(미포함) 실시간 위치 로그를 cell 미터 격자로 집계
+
+    from/to: YYYY-MM-DD 또는 YYYY-MM-DDTHH:MM (기본: 최근 24시간), cell: 칸 크기(미터, 기본 250)
+    cells는 [칸 중심 위도, 칸 중심 경도, 로그 수] 목록 (로그 수 많은 순, Leaflet.heat 입력 형식)
+    """
+    try:
+        now = datetime.now().replace(second=0, microsecond=0)
+        # 시간대가 붙은 값(+09:00, Z)은 서버 로컬 시각으로 바꿔 datetime.now()와 비교
+        end = parse_local_datetime(request.args['to']) if request.args.get('to') else now + timedelta(minutes=1)
+        start = parse_local_datetime(request.args['from']) if request.args.get('from') else end - timedelta(days=1)
+        cell_m = int(request.args.get('cell', HEATMAP_DEFAULT_CELL_M))
+    except ValueError:
+        return jsonify({'error': 'from/to는 YYYY-MM-DD 또는 YYYY-MM-DDTHH:MM 형식, cell은 정수(미터)여야 합니다.'}), 400
+    if start >= end:
+        return jsonify({'error': 'from은 to보다 앞이어야 합니다.'}), 400
+    if end - start > timedelta(days=HEATMAP_MAX_DAYS):
+        return jsonify({'error': f'조회 기간은 최대 {HEATMAP_MAX_DAYS}일입니다.'}), 400
+    if not HEATMAP_MIN_CELL_M <= cell_m <= HEATMAP_MAX_CELL_M:
+        return jsonify({'error': f'cell은 {HEATMAP_MIN_CELL_M}~{HEATMAP_MAX_CELL_M} 사이여야 합니다.'}), 400
+    
+    # 이미 지난 기간은 로그가 더 쌓이지 않으므로 오래 캐시
+    max_age = HEATMAP_PAST_MAX_AGE if end <= datetime.now() else HEATMAP_LIVE_MAX_AGE
+    try:
+        heatmap, age = heatmap_cache.get(
+            (start, end, cell_m),
+            lambda: build_ping_heatmap(db.session, start, end, cell_m,
+                                       chunk_size=HEATMAP_CHUNK_SIZE, max_cells=HEATMAP_MAX_CELLS),
+            max_age=max_age
+        )
+    except Exception as e:
+        db.session.rollback()
+        print(f"히트맵 집계 오류: {str(e)}")
+        return jsonify({'error': f'히트맵 집계 중 오류가 발생했습니다: {str(e)}'}), 500
+    
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'cell_m': cell_m,
+        **heatmap,
+        'snapshot_age': round(age, 2)
+    })
+
+############################ 관리자 대시보드 실시간 스트림 ############################
+
+# 대시보드 스트림 설정
+DASHBOARD_STREAM_INTERVAL = float(os.getenv('DASHBOARD_STREAM_INTERVAL', 1.0))   # 변경분 확인 주기(초)
+DASHBOARD_KEEPALIVE_SECONDS = 15
+
+# 직전 상태 (워커별, 생산자 스레드에서만 갱신)
+dashboard_snapshot = {'devices': None, 'kpi': None, 'cursor': None, 'full_synced_at': 0.0}
+DASHBOARD_FULL_SYNC_SECONDS = 300   # 이 주기마다 전체 기기를 다시 읽어 삭제된 기기 등을 정리
+
+# 대시보드 변경분 계산 함수
+def collect_dashboard_events():
+    """직전 상태와 비교해 바뀐 기기(위치/배터리/상태)와 KPI를 이벤트로 반환
+
+    처음과 DASHBOARD_FULL_SYNC_SECONDS마다 전체를 읽고, 그 사이에는 since 커서 이후 바뀐 기기만 읽는다.
+    """
+    previous = dashboard_snapshot['devices']
+    full_sync = previous is None or time.time() - dashboard_snapshot['full_synced_at'] >= DASHBOARD_FULL_SYNC_SECONDS
+    
+    with app.app_context():
+        cursor = get_change_cursor()
+        if full_sync:
+            rows = query_web_devices()
+        else:
+            rows = query_changed_web_devices(parse_change_cursor(dashboard_snapshot['cursor']))
+        counters = get_kpi_counters()
+        latest_report_id = db.session.execute(text("SELECT MAX(id) FROM report_log")).scalar()
+    
+    devices = {} if full_sync else dict(previous)
+    for r in rows:
+        devices[r['DEVICE_CODE']] = serialize_web_device(r)
+    
+    kpi = {
+        'total_devices': counters['total_devices'],
+        'available_devices': counters['available_devices'],
+        'low_battery_devices': counters['low_battery_devices'],
+        'pending_reports': counters['pending_reports'],
+        'latest_report_id': latest_report_id
+    }
+    
+    events = []
+    if previous is not None:
+        if full_sync:
+            changed = [device for code, device in devices.items() if previous.get(code) != device]
+            removed = [code for code in previous if code not in devices]
+        else:
+            # 겹침 구간 때문에 다시 읽힌, 실제로는 바뀌지 않은 기기는 제외
+            changed = [devices[r['DEVICE_CODE']] for r in rows
+                       if previous.get(r['DEVICE_CODE']) != devices[r['DEVICE_CODE']]]
+            removed = []
+        if changed or removed:
+            events.append(('devices', {
+                'devices': changed,
+                'removed': removed,
+                # 지도 영역 필터에서 영역 밖으로 나간 기기를 지우기 위한 직전 위치 (구독자에게는 전달하지 않음)
+                '_previous': {
+                    code: (previous[code]['latitude'], previous[code]['longitude'])
+                    for code in [d['device_id'] for d in changed] + removed if code in previous
+                }
+            }))
+    if dashboard_snapshot['kpi'] is not None and kpi != dashboard_snapshot['kpi']:
+        events.append(('kpi', kpi))
+    
+    dashboard_snapshot['devices'] = devices
+    dashboard_snapshot['kpi'] = kpi
+    dashboard_snapshot['cursor'] = cursor
+    if full_sync:
+        dashboard_snapshot['full_synced_at'] = time.time()
+    return events
+
+dashboard_hub = EventHub(collect_dashboard_events, interval=DASHBOARD_STREAM_INTERVAL, name='dashboard-stream')
+
+# 구독자별 지도 영역 필터 생성 함수
+def make_dashboard_filter(bbox=None, include_devices=True):
+    """devices 이벤트를 지도 영역 안의 기기로 좁힘 (영역 밖으로 나간 기기는 removed로 전달)
+
+    include_devices=False면 devices 이벤트를 보내지 않는다 (클러스터를 표시 중인 축소 지도).
+    """
+    def in_bbox(lat, lng):
+        if bbox is None:
+            return True
+        if lat is None or lng is None:
+            return False
+        min_lat, min_lng, max_lat, max_lng = bbox
+        return min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
+    
+    def filter_event(event, data):
+        if event != 'devices':
+            return data
+        if not include_devices:
+            return None
+        previous = data['_previous']
+        devices = []
+        removed = []
+        for device in data['devices']:
+            if in_bbox(device['latitude'], device['longitude']):
+                devices.append(device)
+            elif device['device_id'] in previous and in_bbox(*previous[device['device_id']]):
+                removed.append(device['device_id'])
+        removed.extend(code for code in data['removed'] if in_bbox(*previous.get(code, (None, None))))
+        if not devices and not removed:
+            return None
+        return {'devices': devices, 'removed': removed}
+    
+    return filter_event
+
+# 대시보드 실시간 스트림 API (server-sent events)
+@app.route('/api/stream/dashboard')
+def stream_dashboard():
+    """기기 위치/배터리/상태 변경분(devices)과 KPI 변경(kpi)을 발생 시점에 전달
+
+    bbox=minLat,minLng,maxLat,maxLng를 주면 그 영역의 기기 변경분만 받고, devices=0이면 KPI만 받는다.
+    """
+    bbox = request.args.get('bbox')
+    if bbox:
+        try:
+            bbox = parse_bbox(bbox)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        bbox = None
+    
+    include_devices = request.args.get('devices', '1').lower() not in ('0', 'false', 'no')
+    subscription = dashboard_hub.subscribe(make_dashboard_filter(bbox, include_devices))
+    
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            yield format_sse('ready', {'pid': os.getpid(), 'interval': DASHBOARD_STREAM_INTERVAL})
+            while not subscription.closed:
+                item = subscription.get(timeout=DASHBOARD_KEEPALIVE_SECONDS)
+                if item is None:
+                    # 프록시가 유휴 연결을 끊지 않도록 주석 전송
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(*item)
+        finally:
+            dashboard_hub.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'   # nginx 응답 버퍼링 끄기
+    })
+
+# 대시보드 스트림 상태 조회 API (워커별)
+@app.route('/api/stream/dashboard/stats', methods=['GET'])
+def get_dashboard_stream_stats():
+    stats = dashboard_hub.stats()
+    stats['pid'] = os.getpid()
+    return jsonify(stats), 200
+
 ########################################### 앱 연결 매핑 API #############################################
 
 load_dotenv()
@@ -1032,8 +1864,11 @@ def register():
             'driver_license': data['driver_license'],
             'sign_up_date': datetime.now()
         })
+        adjust_kpi(db.session, total_users=1)
         
         db.session.commit()
+        data_versions.bump('users')
+        age_column.set(user_id, age)
         
         return jsonify({
             'message': '회원가입이 완료되었습니다.',
@@ -1305,6 +2140,9 @@ def update_user_info(user_id):
         
         result = db.session.execute(update_sql, params)
         db.session.commit()
+        data_versions.bump('users')
+        if result.rowcount > 0 and 'age' in params:
+            age_column.set(user_id, params['age'])
         
         if result.rowcount > 0:
             return jsonify({'message': '사용자 정보가 성공적으로 업데이트되었습니다.'}), 200
@@ -1321,8 +2159,22 @@ def update_user_info(user_id):
 # 사용 가능한 기기 목록 조회 API
 @app.route('/api/devices/available', methods=['GET'])
 def get_available_devices():
-    """사용 가능한 기기 목록 조회 API (is_used = 0인 기기들만)"""
+    """사용 가능한 기기 목록 조회 API (is_used = 0인 기기들만)
+
+    since=<커서>를 주면 그 이후 바뀐 기기만 {'devices', 'removed', 'cursor'} 형태로 반환한다.
+    전체 조회 응답의 커서는 X-Changes-Cursor 헤더로 전달한다.
+    """
     try:
+        since = request.args.get('since')
+        if since:
+            try:
+                since = parse_change_cursor(since)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return get_available_device_changes(since)
+        
+        cursor = get_change_cursor()
+        
         # 사용 가능한 기기들만 조회 (is_used = 0)
         devices_sql = text("""
             SELECT 
@@ -1333,12 +2185,7 @@ def get_available_devices():
                 d.device_type,
                 COALESCE(r.now_time, d.created_at) AS last_updated
             FROM device_info d
-            LEFT JOIN device_realtime_log r ON d.DEVICE_CODE = r.DEVICE_CODE 
-                AND r.now_time = (
-                    SELECT MAX(now_time) 
-                    FROM device_realtime_log r2 
-                    WHERE r2.DEVICE_CODE = d.DEVICE_CODE
-                )
+            LEFT JOIN device_latest_position r ON d.DEVICE_CODE = r.DEVICE_CODE
             WHERE d.is_used = 0 AND d.location IS NOT NULL AND d.battery_level > 0
             ORDER BY d.created_at DESC
         """)
@@ -1356,13 +2203,188 @@ def get_available_devices():
                 'created_at': row['last_updated'].isoformat() if row['last_updated'] else None
             })
         
-        return jsonify(result), 200
+        response = jsonify(result)
+        response.headers['X-Changes-Cursor'] = cursor
+        return response, 200
         
     except Exception as e:
         print(f"사용 가능한 기기 조회 오류: {str(e)}")
         return jsonify({'error': '기기 정보 조회 중 오류가 발생했습니다.'}), 500
 
 
+# 사용 가능한 기기 변경분 조회 (since 모드)
+def get_available_device_changes(since):
+    """since 이후 바뀐 기기 중 대여 가능한 기기는 devices, 대여 불가로 바뀐 기기는 removed로 반환"""
+    cursor = get_change_cursor()
+    changes_sql = text("""
+        SELECT 
+            d.DEVICE_CODE as device_id,
+            COALESCE(ST_Y(r.location), ST_Y(d.location)) AS latitude,
+            COALESCE(ST_X(r.location), ST_X(d.location)) AS longitude,
+            d.battery_level,
+            d.device_type,
+            COALESCE(r.now_time, d.created_at) AS last_updated,
+            (d.is_used = 0 AND d.location IS NOT NULL AND d.battery_level > 0) AS available
+        FROM device_info d
+        LEFT JOIN device_latest_position r ON d.DEVICE_CODE = r.DEVICE_CODE
+        WHERE """ + CHANGED_DEVICES_CONDITION)
+    rows = db.session.execute(changes_sql, {'since': since}).mappings().all()
+    
+    devices = []
+    removed = []
+    for row in rows:
+        if not row['available']:
+            removed.append(row['device_id'])
+            continue
+        devices.append({
+            'device_id': row['device_id'],
+            'latitude': float(row['latitude']) if row['latitude'] is not None else None,
+            'longitude': float(row['longitude']) if row['longitude'] is not None else None,
+            'battery_level': row['battery_level'],
+            'device_type': row['device_type'],
+            'created_at': row['last_updated'].isoformat() if row['last_updated'] else None
+        })
+    
+    response = jsonify({'devices': devices, 'removed': removed, 'cursor': cursor})
+    response.headers['X-Changes-Cursor'] = cursor
+    return response, 200
+
+# 대여 가능 기기 공간 색인 (주변 기기 검색용)
+# 대여 시작/종료, 상태 변경, 실시간 로그 수신 시 갱신하지만 워커마다 별도 색인이므로
+# 다른 워커에서 일어난 변경을 반영하도록 NEARBY_INDEX_TTL초마다 백그라운드 스레드에서 DB로 다시 구성
+# (구성 중 요청은 기존 색인을 사용하고, 구성 중에 들어온 갱신은 새 색인에 다시 적용됨)
+nearby_index = GridIndex(cell_size_m=float(os.getenv('NEARBY_INDEX_CELL_M', 250)))
+NEARBY_INDEX_TTL = float(os.getenv('NEARBY_INDEX_TTL', 30))
+NEARBY_MAX_RADIUS_M = 5000
+NEARBY_MAX_LIMIT = 100
+nearby_rebuild_lock = threading.RLock()
+nearby_rebuild_state = {'pid': None, 'thread': None}
+
+AVAILABLE_DEVICE_INDEX_SQL = """
+    SELECT 
+        d.DEVICE_CODE,
+        ST_X(COALESCE(r.location, d.location)) AS lat,
+        ST_Y(COALESCE(r.location, d.location)) AS lng,
+        d.battery_level,
+        d.device_type,
+        COALESCE(r.now_time, d.created_at) AS last_updated
+    FROM device_info d
+    LEFT JOIN device_latest_position r ON d.DEVICE_CODE = r.DEVICE_CODE
+    WHERE d.is_used = 0 AND d.location IS NOT NULL AND d.battery_level > 0
+"""
+
+def nearby_index_entry(row):
+    """조회 행을 색인 항목 (code, lat, lng, payload)으로 변환"""
+    return (row['DEVICE_CODE'], row['lat'], row['lng'], {
+        'battery_level': row['battery_level'],
+        'device_type': row['device_type'],
+        'last_updated': row['last_updated'].isoformat() if row['last_updated'] else None
+    })
+
+# 주변 기기 색인 전체 구성 함수
+def rebuild_nearby_index():
+    """대여 가능 기기 전체를 DB에서 읽어 색인을 새로 구성 (한 번에 하나만 실행)"""
+    with nearby_rebuild_lock:
+        nearby_index.begin_rebuild()
+        try:
+            rows = db.session.execute(text(AVAILABLE_DEVICE_INDEX_SQL)).mappings().all()
+        except Exception:
+            nearby_index.abort_rebuild()
+            raise
+        nearby_index.rebuild(nearby_index_entry(row) for row in rows)
+        return len(rows)
+
+# 주변 기기 색인 백그라운드 재구성 함수
+def rebuild_nearby_index_in_background():
+    with app.app_context():
+        try:
+            print(f"주변 기기 색인 구성: {rebuild_nearby_index()}대")
+        except Exception as e:
+            db.session.rollback()
+            print(f"주변 기기 색인 구성 오류: {str(e)}")
+
+# 주변 기기 색인 만료 확인 함수
+def ensure_nearby_index():
+    """색인이 없으면 바로 구성하고, NEARBY_INDEX_TTL이 지났으면 백그라운드 재구성을 시작 (기존 색인은 계속 사용)"""
+    age = nearby_index.age()
+    if age is None:
+        # 처음 구성할 때만 요청 스레드에서 구성 (동시 요청은 끝날 때까지 대기)
+        with nearby_rebuild_lock:
+            if nearby_index.age() is None:
+                print(f"주변 기기 색인 구성: {rebuild_nearby_index()}대")
+        return
+    if age < NEARBY_INDEX_TTL:
+        return
+    # 재구성 중이면 락을 잡고 있으므로 바로 반환
+    if not nearby_rebuild_lock.acquire(blocking=False):
+        return
+    try:
+        thread = nearby_rebuild_state['thread']
+        if nearby_rebuild_state['pid'] == os.getpid() and thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=rebuild_nearby_index_in_background, name='nearby-index-rebuild', daemon=True)
+        nearby_rebuild_state['pid'] = os.getpid()
+        nearby_rebuild_state['thread'] = thread
+        thread.start()
+    finally:
+        nearby_rebuild_lock.release()
+
+# 기기 1대 색인 갱신 함수
+def refresh_nearby_device(device_code):
+    """기기 1대의 대여 가능 여부와 위치를 DB에서 다시 읽어 색인에 반영 (커밋 이후 호출)"""
+    try:
+        row = db.session.execute(text(AVAILABLE_DEVICE_INDEX_SQL + " AND d.DEVICE_CODE = :device_code"),
+                                 {'device_code': device_code}).mappings().first()
+        if row and row['lat'] is not None and row['lng'] is not None:
+            nearby_index.upsert(*nearby_index_entry(row))
+        else:
+            nearby_index.remove(device_code)
+    except Exception as e:
+        db.session.rollback()
+        nearby_index.remove(device_code)
+        print(f"주변 기기 색인 갱신 오류: {str(e)}")
+
+
+# 주변 대여 가능 기기 조회 API
+@app.route('/api/devices/nearby', methods=['GET'])
+def get_nearby_devices():
+    """주변 대여 가능 기기 조회 API (메모리 공간 색인에서 반경 내 가까운 순으로 limit개)"""
+    try:
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        radius = request.args.get('radius', default=1000, type=float)
+        limit = request.args.get('limit', default=20, type=int)
+        
+        if lat is None or lng is None:
+            return jsonify({'error': 'lat, lng 파라미터가 필요합니다.'}), 400
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return jsonify({'error': '좌표 범위가 올바르지 않습니다.'}), 400
+        
+        radius = min(max(radius, 1.0), NEARBY_MAX_RADIUS_M)
+        limit = min(max(limit, 1), NEARBY_MAX_LIMIT)
+        
+        ensure_nearby_index()
+        
+        result = []
+        for distance, device_code, device_lat, device_lng, payload in nearby_index.nearest(lat, lng, radius, limit):
+            result.append({
+                'device_id': device_code,
+                'latitude': device_lat,
+                'longitude': device_lng,
+                'battery_level': payload['battery_level'],
+                'device_type': payload['device_type'],
+                'created_at': payload['last_updated'],
+                'distance_m': round(distance, 1)
+            })
+        
+        return jsonify(result), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"주변 기기 조회 오류: {str(e)}")
+        return jsonify({'error': '주변 기기 조회 중 오류가 발생했습니다.'}), 500
+
+
 # 기기 사용 상태 업데이트 API
 @app.route('/api/devices/<device_id>/status', methods=['PUT'])
 def update_device_status(device_id):
@@ -1370,6 +2392,14 @@ def update_device_status(device_id):
     try:
         data = request.get_json()
         is_used = data.get('is_used', 0)
+        # KPI 증감을 0/1 기준으로 계산하므로 true/false, "0"/"1"도 0/1로 맞추고 그 밖의 값은 거부
+        if isinstance(is_used, float) or is_used not in (0, 1, '0', '1'):
+            return jsonify({'error': 'is_used는 0 또는 1이어야 합니다.'}), 400
+        is_used = int(is_used)
+        
+        previous = db.session.execute(
+            text("SELECT is_used FROM device_info WHERE DEVICE_CODE = :device_code FOR UPDATE"), {'device_code': device_id}
+        ).first()
         
         # 기기 상태 업데이트
         update_sql = text("""
@@ -1382,7 +2412,11 @@ def update_device_status(device_id):
             'is_used': is_used,
             'device_code': device_id
         })
+        if previous is not None:
+            adjust_kpi(db.session, available_devices=(is_used == 0) - (previous[0] == 0))
         db.session.commit()
+        data_versions.bump('devices')
+        refresh_nearby_device(device_id)
         
         if result.rowcount > 0:
             status_text = "사용 중" if is_used == 1 else "사용 가능"
@@ -1415,7 +2449,7 @@ def start_device_rental():
         
         # 기기가 사용 가능한지 확인하고 위치 정보도 함께 가져오기
         device_check_sql = text("""
-            SELECT is_used, location FROM device_info WHERE DEVICE_CODE = :device_code
+            SELECT is_used, location FROM device_info WHERE DEVICE_CODE = :device_code FOR UPDATE
         """)
         device = db.session.execute(device_check_sql, {'device_code': device_code}).mappings().first()
         
@@ -1442,7 +2476,10 @@ def start_device_rental():
         """)
         
         db.session.execute(update_device_sql, {'device_code': device_code})
+        adjust_kpi(db.session, available_devices=-1 if device['is_used'] == 0 else 0)
         db.session.commit()
+        data_versions.bump('devices')
+        nearby_index.remove(device_code)
         
         return jsonify({
             'message': '기기 대여가 시작되었습니다.',
@@ -1454,16 +2491,297 @@ def start_device_rental():
         print(f"기기 대여 시작 오류: {str(e)}")
         return jsonify({'error': '기기 대여 시작 중 오류가 발생했습니다.'}), 500
 
-# 배터리 소모 계산 함수
-def calculate_battery_drain(device_code, time_minutes):
-    """배터리 소모량 계산 (시간 기반)"""
-    # 5초당 1% (1분당 12%) - app_last.py와 동일한 방식
-    time_drain = time_minutes * 12.0     # 5초당 1% = 1분당 12%
+# 배터리 소모 기준 - 5초당 1% (1분당 12%), app_last.py와 동일한 방식
+BATTERY_DRAIN_PER_MINUTE = 12.0
+# 직전 기록과의 간격이 이 범위(분)일 때만 사용 시간으로 인정 (약 5초 ~ 10분)
+BATTERY_DRAIN_MIN_GAP_MINUTES = 0.08
+BATTERY_DRAIN_MAX_GAP_MINUTES = 10.0
+# 배터리 구간 (이 폭의 구간이 바뀔 때만 기기 데이터 버전을 올림, 분포 기본 구간 폭과 같음)
+BATTERY_BUCKET_WIDTH = 10
+
+# 배터리 소모 계산식
+def battery_drain_sql(pings):
+    """기기별 배터리 소모량(%)과 새 소모 반영 시각을 device_info.battery_drained_until 기준으로 계산하는 SQL 식과 파라미터
+
+    pings: {device_code: [ts, ...]} (이번 배치의 기기별 기록 시각)
+    battery_drained_until(소모를 반영한 마지막 기록 시각)보다 뒤의 기록만 직전 기록과의 간격을 합산하므로
+    UPDATE가 잠근 행의 값으로 계산되어, 여러 워커가 같은 기기의 로그를 받아도 같은 구간을 두 번 소모하지 않는다.
+    """
+    min_gap = timedelta(minutes=BATTERY_DRAIN_MIN_GAP_MINUTES)
+    max_gap = timedelta(minutes=BATTERY_DRAIN_MAX_GAP_MINUTES)
+    device_sql = []
+    last_sql = []
+    params = {'drain_per_minute': BATTERY_DRAIN_PER_MINUTE}
+    for i, (device_code, times) in enumerate(pings.items()):
+        times = sorted(set(times))
+        # suffix[k]: times[k] 이후 배치 안 간격들의 사용 시간 합 (분)
+        suffix = [0.0] * len(times)
+        for k in range(len(times) - 2, -1, -1):
+            minutes = (times[k + 1] - times[k]).total_seconds() / 60
+            if BATTERY_DRAIN_MIN_GAP_MINUTES <= minutes <= BATTERY_DRAIN_MAX_GAP_MINUTES:
+                suffix[k] = suffix[k + 1] + minutes
+            else:
+                suffix[k] = suffix[k + 1]
+        
+        # 소모 반영 시각보다 뒤인 첫 기록 times[k]까지의 간격 + 그 뒤 배치 안 간격들
+        branches = [f"WHEN battery_drained_until IS NULL THEN :drain_s_{i}_0"]
+        for k, ts in enumerate(times):
+            branches.append(
+                f"WHEN battery_drained_until < :drain_t_{i}_{k} THEN "
+                f"IF(battery_drained_until BETWEEN :drain_lo_{i}_{k} AND :drain_hi_{i}_{k}, "
+                f"TIMESTAMPDIFF(MICROSECOND, battery_drained_until, :drain_t_{i}_{k}) / 60000000, 0) + :drain_s_{i}_{k}"
+            )
+            params[f'drain_t_{i}_{k}'] = ts
+            params[f'drain_lo_{i}_{k}'] = ts - max_gap
+            params[f'drain_hi_{i}_{k}'] = ts - min_gap
+            params[f'drain_s_{i}_{k}'] = suffix[k]
+        device_sql.append(f"WHEN :drain_code_{i} THEN CASE " + " ".join(branches) + " ELSE 0 END")
+        params[f'drain_code_{i}'] = device_code
+        params[f'drain_last_{i}'] = times[-1]
+        last_sql.append(f"WHEN :drain_code_{i} THEN :drain_last_{i}")
+    
+    drain_sql = "(CASE DEVICE_CODE " + " ".join(device_sql) + " ELSE 0 END) * :drain_per_minute"
+    # 소모 반영 시각은 앞으로만 이동 (더 오래된 기록이 늦게 도착해도 되돌리지 않음)
+    last_sql = "CASE DEVICE_CODE " + " ".join(last_sql) + " END"
+    drained_until_sql = f"GREATEST(COALESCE(battery_drained_until, {last_sql}), {last_sql})"
+    return drain_sql, drained_until_sql, params
+
+# 배치 수집 설정
+REALTIME_BATCH_MAX_SIZE = int(os.getenv('REALTIME_BATCH_MAX_SIZE', 1000))   # 요청당 최대 레코드 수
+REALTIME_INSERT_CHUNK_SIZE = int(os.getenv('REALTIME_INSERT_CHUNK_SIZE', 500))  # INSERT 문 하나에 담을 행 수
+REALTIME_MAX_AGE_SECONDS = int(os.getenv('REALTIME_MAX_AGE_SECONDS', MAX_AGE_SECONDS))                       # 이보다 오래된 로그는 거부
+REALTIME_MAX_FUTURE_SKEW_SECONDS = int(os.getenv('REALTIME_MAX_FUTURE_SKEW_SECONDS', MAX_FUTURE_SKEW_SECONDS))  # 이만큼 앞선 시각까지는 현재 시각으로 맞춤
+
+# 실시간 위치 로그 레코드 검증 함수 (시각 허용 범위는 환경 변수 설정 사용)
+def validate_realtime_record(record):
+    return normalize_realtime_record(
+        record,
+        max_age_seconds=REALTIME_MAX_AGE_SECONDS,
+        max_future_skew_seconds=REALTIME_MAX_FUTURE_SKEW_SECONDS
+    )
+
+# 기기별 텔레메트리 상태 (직전 시각/위치/속도) - 상세 조회의 속도 표시, 주변 기기 색인 갱신, 실시간 로그의 기기 확인용
+# 배터리 소모는 워커마다 다를 수 있는 이 상태가 아니라 DB(device_info.battery_drained_until)를 기준으로 계산
+device_states = DeviceStateTable()
+
+# 대여 종료 시 주행 궤적 축소(Douglas-Peucker) 허용 오차 (미터)
+TRAJECTORY_TOLERANCE_M = float(os.getenv('TRAJECTORY_TOLERANCE_M', 5))
+
+# 기기 상태 적재 함수
+def load_device_states():
+    """device_info + device_latest_position에서 전체 기기 상태를 읽어 메모리 테이블에 반영"""
+    rows = db.session.execute(
+        text("""
+            SELECT 
+                d.DEVICE_CODE,
+                p.now_time AS last_time,
+                ST_X(COALESCE(p.location, d.location)) AS lat,
+                ST_Y(COALESCE(p.location, d.location)) AS lng
+            FROM device_info d
+            LEFT JOIN device_latest_position p ON p.DEVICE_CODE = d.DEVICE_CODE
+        """)
+    ).all()
+    device_states.load(rows)
+    return rows
+
+# 실시간 위치 로그 일괄 저장 함수
+def ingest_realtime_batch(records):
+    """실시간 위치 로그 일괄 저장 (다중 행 INSERT + 조건부 배터리 UPDATE, 직전 기록 조회 없음)
+
+    records: [{device_code, user_id, lat, lng, ts}, ...]
+    반환값: 입력 순서와 같은 레코드별 상태 목록 (stored / rejected / failed)
+    """
+    statuses = [None] * len(records)
+    valid = []
+    
+    # 1) 레코드 형식 검증
+    for idx, record in enumerate(records):
+        normalized, error = validate_realtime_record(record)
+        if error:
+            statuses[idx] = {'index': idx, 'status': 'rejected', 'error': error}
+        else:
+            valid.append((idx,) + normalized)
+    
+    if not valid:
+        return statuses
+    
+    try:
+        # 2) 메모리 상태에 없는 기기만 존재 여부를 확인 (시작 시 전체 기기를 적재하므로 보통은 조회 없음)
+        unknown_codes = {r[1] for r in valid if r[1] not in device_states}
+        if unknown_codes:
+            found = {
+                row[0] for row in db.session.execute(
+                    text("SELECT DEVICE_CODE FROM device_info WHERE DEVICE_CODE IN :device_codes")
+                    .bindparams(bindparam('device_codes', expanding=True)),
+                    {'device_codes': sorted(unknown_codes)}
+                ).all()
+            }
+        else:
+            found = set()
+        
+        accepted = []
+        for r in valid:
+            if r[1] in unknown_codes and r[1] not in found:
+                statuses[r[0]] = {'index': r[0], 'status': 'rejected', 'error': '기기를 찾을 수 없습니다.'}
+            else:
+                accepted.append(r)
+        
+        if not accepted:
+            return statuses
+        
+        # 3) 배터리 소모를 조건부 UPDATE로 반영 (소모 구간은 잠근 행의 battery_drained_until 기준으로 DB가 계산)
+        #    배터리 부족 기준을 넘는 기기 -> 배터리 구간이 바뀌는 기기 -> 나머지 순으로 나눠 실행하고 영향 행 수로 건수를 얻음
+        #    먼저 실행된 UPDATE가 소모 반영 시각을 옮겨 두므로 뒤의 UPDATE에서는 같은 기기의 소모량이 0이 된다
+        pings = {}
+        for r in accepted:
+            pings.setdefault(r[1], []).append(r[5])
+        drain_sql, drained_until_sql, params = battery_drain_sql(pings)
+        new_level_sql = f"ROUND(GREATEST(battery_level - {drain_sql}, 0))"
+        params['drain_codes'] = sorted(pings)
+        params['low_battery_level'] = LOW_BATTERY_LEVEL
+        params['bucket_width'] = BATTERY_BUCKET_WIDTH
+        
+        battery_update_sql = (
+            f"UPDATE device_info SET battery_level = {new_level_sql}, battery_drained_until = {drained_until_sql} "
+            "WHERE DEVICE_CODE IN :drain_codes"
+        )
+        crossed = db.session.execute(
+            text(
+                battery_update_sql
+                + f" AND battery_level > :low_battery_level AND {new_level_sql} <= :low_battery_level"
+            ).bindparams(bindparam('drain_codes', expanding=True)),
+            params
+        ).rowcount
+        bucket_changed = db.session.execute(
+            text(
+                battery_update_sql
+                + f" AND FLOOR(battery_level / :bucket_width) <> FLOOR({new_level_sql} / :bucket_width)"
+            ).bindparams(bindparam('drain_codes', expanding=True)),
+            params
+        ).rowcount
+        db.session.execute(
+            text(battery_update_sql).bindparams(bindparam('drain_codes', expanding=True)),
+            params
+        )
+        adjust_kpi(db.session, low_battery_devices=crossed)
+        
+        # 4) 다중 행 INSERT (패킷 크기 제한을 위해 청크 단위)
+        for start in range(0, len(accepted), REALTIME_INSERT_CHUNK_SIZE):
+            chunk = accepted[start:start + REALTIME_INSERT_CHUNK_SIZE]
+            values_sql = []
+            params = {}
+            for i, (idx, device_code, user_id, lat, lng, ts) in enumerate(chunk):
+                values_sql.append(
+                    f"(:device_code_{i}, :user_id_{i}, "
+                    f"ST_GeomFromText(CONCAT('POINT(', :latitude_{i}, ' ', :longitude_{i}, ')'), 4326), :now_time_{i})"
+                )
+                params[f'device_code_{i}'] = device_code
+                params[f'user_id_{i}'] = user_id
+                params[f'latitude_{i}'] = lat
+                params[f'longitude_{i}'] = lng
+                params[f'now_time_{i}'] = ts
+            
+            insert_sql = text(
+                "INSERT INTO device_realtime_log (DEVICE_CODE, USER_ID, location, now_time) VALUES "
+                + ", ".join(values_sql)
+            )
+            db.session.execute(insert_sql, params)
+        
+        # 5) 기기별 마지막 위치 갱신 (배치 안에서 가장 최근 기록만, 더 오래된 기록으로는 덮어쓰지 않음)
+        latest = {}
+        for r in accepted:
+            if r[1] not in latest or r[5] >= latest[r[1]][5]:
+                latest[r[1]] = r
+        
+        values_sql = []
+        params = {}
+        for i, device_code in enumerate(sorted(latest)):
+            idx, device_code, user_id, lat, lng, ts = latest[device_code]
+            values_sql.append(
+                f"(:device_code_{i}, :user_id_{i}, "
+                f"ST_GeomFromText(CONCAT('POINT(', :latitude_{i}, ' ', :longitude_{i}, ')'), 4326), :now_time_{i})"
+            )
+            params[f'device_code_{i}'] = device_code
+            params[f'user_id_{i}'] = user_id
+            params[f'latitude_{i}'] = lat
+            params[f'longitude_{i}'] = lng
+            params[f'now_time_{i}'] = ts
+        
+        # 대입은 왼쪽부터 적용되므로 now_time은 마지막에 갱신
+        latest_position_sql = text(
+            "INSERT INTO device_latest_position (DEVICE_CODE, USER_ID, location, now_time) VALUES "
+            + ", ".join(values_sql)
+            + " ON DUPLICATE KEY UPDATE "
+            "location = IF(VALUES(now_time) >= now_time, VALUES(location), location), "
+            "USER_ID = IF(VALUES(now_time) >= now_time, VALUES(USER_ID), USER_ID), "
+            "now_time = GREATEST(now_time, VALUES(now_time))"
+        )
+        db.session.execute(latest_position_sql, params)
+        
+        db.session.commit()
+        # 위치만 바뀐 배치는 positions만 올림 (기기 버전을 보는 통계/분포 캐시는 상태나 배터리 구간이 바뀔 때만 다시 구성)
+        if crossed or bucket_changed:
+            data_versions.bump('devices', 'positions')
+        else:
+            data_versions.bump('positions')
+        
+        # 커밋이 끝난 뒤에만 메모리 상태 갱신 (롤백 시 상태가 앞서가지 않도록)
+        # 메모리 상태는 속도/위치 표시용이며 배터리 소모 계산에는 쓰지 않음
+        for idx, device_code, user_id, lat, lng, ts in sorted(accepted, key=lambda r: r[5]):
+            device_states.apply_ping(device_code, ts, lat, lng)
+        for device_code in latest:
+            state = device_states.get(device_code)
+            nearby_index.move(device_code, state.lat, state.lng)
+        
+        for r in accepted:
+            statuses[r[0]] = {'index': r[0], 'status': 'stored'}
+        
+        print(f"실시간 로그 일괄 저장 완료: {len(accepted)}건, 배터리 부족 전환 {crossed}대, 배터리 구간 변경 {bucket_changed}대")
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"실시간 로그 일괄 저장 오류: {str(e)}")
+        for r in valid:
+            if statuses[r[0]] is None:
+                statuses[r[0]] = {'index': r[0], 'status': 'failed', 'error': '저장 중 오류가 발생했습니다.'}
     
-    print(f"배터리 소모 계산: {device_code} - 시간: {time_minutes:.1f}분")
-    print(f"소모량: 시간 {time_drain:.1f}% (5초당 1%)")
+    return statuses
+
+# 쓰기 지연(write-behind) 모드 설정 - 켜면 요청은 큐에 넣고 바로 반환, 백그라운드 스레드가 일괄 저장
+REALTIME_WRITE_BEHIND = os.getenv('REALTIME_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+
+def flush_realtime_buffer(records):
+    """write-behind 큐에서 꺼낸 레코드를 일괄 저장 (백그라운드 스레드에서 호출)"""
+    with app.app_context():
+        return ingest_realtime_batch(records)
+
+realtime_write_behind = WriteBehindQueue(
+    flush_fn=flush_realtime_buffer,
+    max_size=int(os.getenv('REALTIME_QUEUE_MAX_SIZE', 20000)),
+    batch_size=int(os.getenv('REALTIME_FLUSH_BATCH_SIZE', 500)),
+    flush_interval=float(os.getenv('REALTIME_FLUSH_INTERVAL', 2.0)),
+    put_timeout=float(os.getenv('REALTIME_QUEUE_PUT_TIMEOUT', 0.5)),
+    name='realtime-log-writer'
+) if REALTIME_WRITE_BEHIND else None
+
+# write-behind 큐에 레코드 추가 (수신 시각을 기록해 두어 배터리 소모 계산이 flush 시점에 밀리지 않도록 함)
+def enqueue_realtime_record(record):
+    """레코드를 검증 후 큐에 추가, (상태, 오류 메시지) 반환"""
+    normalized, error = validate_realtime_record(record)
+    if error:
+        return 'rejected', error
     
-    return time_drain
+    device_code, user_id, lat, lng, ts = normalized
+    queued = realtime_write_behind.put({
+        'device_code': device_code,
+        'user_id': user_id,
+        'lat': lat,
+        'lng': lng,
+        'ts': ts
+    })
+    if not queued:
+        return 'busy', '서버가 혼잡합니다. 잠시 후 다시 전송해주세요.'
+    return 'queued', None
 
 # 실시간 위치 로그 전송 API
 @app.route('/api/device-rental/realtime-log', methods=['POST'])
@@ -1482,69 +2800,30 @@ def send_realtime_log():
         if not all([user_id, device_code, latitude, longitude]):
             return jsonify({'error': '필수 정보가 누락되었습니다.'}), 400
         
-        # 이전 위치와 시간 가져오기 (배터리 소모 계산용)
-        prev_position_sql = text("""
-            SELECT 
-                ST_X(location) as prev_lat,
-                ST_Y(location) as prev_lng,
-                now_time as prev_time
-            FROM device_realtime_log 
-            WHERE DEVICE_CODE = :device_code 
-            ORDER BY now_time DESC 
-            LIMIT 1
-        """)
-        
-        prev_pos = db.session.execute(prev_position_sql, {'device_code': device_code}).mappings().first()
-        
-        # 실시간 로그 저장 - app_last.py와 동일한 방식
-        realtime_log_sql = text("""
-            INSERT INTO device_realtime_log (DEVICE_CODE, USER_ID, location, now_time)
-            VALUES (:device_code, :user_id, ST_GeomFromText(CONCAT('POINT(', :latitude, ' ', :longitude, ')'), 4326), NOW())
-        """)
-        
-        db.session.execute(realtime_log_sql, {
+        record = {
             'device_code': device_code,
             'user_id': user_id,
-            'latitude': latitude,
-            'longitude': longitude
-        })
+            'lat': latitude,
+            'lng': longitude,
+            'ts': data.get('ts')
+        }
         
-        # 배터리 소모 계산 및 업데이트 - 안전한 시간 계산
-        if prev_pos:
-            # 시간 계산 (분 단위) - 시간대 통일
-            current_time = datetime.now()
-            prev_time = prev_pos['prev_time']
-            
-            # 시간대가 다를 경우를 대비한 안전한 계산
-            if prev_time.tzinfo is None:
-                prev_time = prev_time.replace(tzinfo=None)
-            if current_time.tzinfo is None:
-                current_time = current_time.replace(tzinfo=None)
-            
-            time_diff = (current_time - prev_time).total_seconds() / 60
-            
-            # 최소 5초, 최대 10분 간격으로 제한 (비정상적인 시간 차이 방지)
-            if 0.08 <= time_diff <= 10.0:  # 5초 ~ 10분
-                # 배터리 소모량 계산 (시간만 기반)
-                battery_drain = calculate_battery_drain(device_code, time_diff)
-                
-                # 배터리 레벨 업데이트
-                battery_update_sql = text("""
-                    UPDATE device_info 
-                    SET battery_level = GREATEST(battery_level - :drain, 0)
-                    WHERE DEVICE_CODE = :device_code
-                """)
-                
-                db.session.execute(battery_update_sql, {
-                    'drain': battery_drain,
-                    'device_code': device_code
-                })
-                
-                print(f"배터리 소모: {battery_drain:.1f}% (시간: {time_diff:.1f}분)")
-            else:
-                print(f"비정상적인 시간 차이 감지: {time_diff:.1f}분 - 배터리 소모 계산 건너뜀")
+        # write-behind 모드: 큐에 넣고 바로 반환
+        if realtime_write_behind is not None:
+            status, error = enqueue_realtime_record(record)
+            if status == 'rejected':
+                return jsonify({'error': error}), 400
+            if status == 'busy':
+                return jsonify({'error': error}), 503, {'Retry-After': '1'}
+            return jsonify({'message': '실시간 로그가 접수되었습니다.', 'queued': True}), 202
         
-        db.session.commit()
+        # 일괄 저장과 같은 경로로 저장 (실시간 로그, 마지막 위치, 배터리 소모를 한 트랜잭션으로 반영)
+        status = ingest_realtime_batch([record])[0]
+        
+        if status['status'] == 'rejected':
+            return jsonify({'error': status['error']}), 400
+        if status['status'] == 'failed':
+            return jsonify({'error': '실시간 로그 전송 중 오류가 발생했습니다.'}), 500
         
         print(f"실시간 로그 저장 완료: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
@@ -1555,6 +2834,68 @@ def send_realtime_log():
         print(f"실시간 로그 전송 오류: {str(e)}")
         return jsonify({'error': '실시간 로그 전송 중 오류가 발생했습니다.'}), 500
 
+# 실시간 위치 로그 일괄 전송 API (앱/시뮬레이터에서 버퍼링 후 주기적으로 전송)
+@app.route('/api/device-rental/realtime-log/batch', methods=['POST'])
+def send_realtime_log_batch():
+    """실시간 위치 로그 일괄 전송 API"""
+    try:
+        data = request.get_json()
+        records = data.get('records') if isinstance(data, dict) else data
+        
+        if not isinstance(records, list) or not records:
+            return jsonify({'error': '전송할 로그(records)가 없습니다.'}), 400
+        
+        if len(records) > REALTIME_BATCH_MAX_SIZE:
+            return jsonify({'error': f'한 번에 최대 {REALTIME_BATCH_MAX_SIZE}건까지 전송할 수 있습니다.'}), 413
+        
+        # write-behind 모드: 레코드별로 큐에 넣고 접수 결과 반환
+        if realtime_write_behind is not None:
+            statuses = []
+            for idx, record in enumerate(records):
+                status, error = enqueue_realtime_record(record)
+                statuses.append({'index': idx, 'status': status, 'error': error} if error else {'index': idx, 'status': status})
+            
+            queued = sum(1 for s in statuses if s['status'] == 'queued')
+            busy = sum(1 for s in statuses if s['status'] == 'busy')
+            headers = {'Retry-After': '1'} if busy else {}
+            return jsonify({
+                'message': f'실시간 로그 {queued}건이 접수되었습니다.',
+                'queued': queued,
+                'rejected': sum(1 for s in statuses if s['status'] == 'rejected'),
+                'busy': busy,
+                'results': statuses
+            }), 202, headers
+        
+        statuses = ingest_realtime_batch(records)
+        
+        stored = sum(1 for s in statuses if s['status'] == 'stored')
+        rejected = sum(1 for s in statuses if s['status'] == 'rejected')
+        failed = sum(1 for s in statuses if s['status'] == 'failed')
+        
+        return jsonify({
+            'message': f'실시간 로그 {stored}건이 저장되었습니다.',
+            'stored': stored,
+            'rejected': rejected,
+            'failed': failed,
+            'results': statuses
+        }), 200
+        
+    except Exception as e:
+        print(f"실시간 로그 일괄 전송 오류: {str(e)}")
+        return jsonify({'error': '실시간 로그 일괄 전송 중 오류가 발생했습니다.'}), 500
+
+# 실시간 로그 write-behind 큐 상태 조회 API (큐 깊이, flush 지연 시간)
+@app.route('/api/device-rental/realtime-log/queue', methods=['GET'])
+def get_realtime_queue_stats():
+    """실시간 로그 write-behind 큐 상태 조회 API"""
+    if realtime_write_behind is None:
+        return jsonify({'enabled': False}), 200
+    
+    stats = realtime_write_behind.stats()
+    stats['enabled'] = True
+    stats['pid'] = os.getpid()
+    return jsonify(stats), 200
+
 # 기기 대여 종료 API (요금 계산 및 거리 측정)   
 @app.route('/api/device-rental/end', methods=['POST'])
 def end_device_rental():
@@ -1575,7 +2916,8 @@ def end_device_rental():
         
         # 대여 기록 조회
         rental_check_sql = text("""
-            SELECT start_time, start_loc FROM device_use_log 
+            SELECT id, start_time, ST_X(start_loc) AS start_lat, ST_Y(start_loc) AS start_lng
+            FROM device_use_log 
             WHERE USER_ID = :user_id AND DEVICE_CODE = :device_code AND end_time IS NULL
         """)
         
@@ -1614,91 +2956,34 @@ def end_device_rental():
         print(f"사용 시간: {usage_minutes}분 {usage_seconds % 60}초")
         print(f"계산된 요금: {fee}원")
         
-        # 이동 거리 계산 (Haversine 공식 사용) - 좌표 순서 수정
-        start_latitude = db.session.execute(text("SELECT ST_X(start_loc) as latitude FROM device_use_log WHERE USER_ID = :user_id AND DEVICE_CODE = :device_code AND end_time IS NULL"), 
-                                          {'user_id': user_id, 'device_code': device_code}).scalar()
-        start_longitude = db.session.execute(text("SELECT ST_Y(start_loc) as longitude FROM device_use_log WHERE USER_ID = :user_id AND DEVICE_CODE = :device_code AND end_time IS NULL"), 
-                                           {'user_id': user_id, 'device_code': device_code}).scalar()
+        start_latitude = rental['start_lat']
+        start_longitude = rental['start_lng']
         
-        # 종료 위치를 device_realtime_log의 마지막 위치에서 가져오기
+        # 종료 위치를 기기의 마지막 실시간 위치에서 가져오기
         last_realtime_location = db.session.execute(text("""
             SELECT ST_X(location) as lat, ST_Y(location) as lng 
-            FROM device_realtime_log 
-            WHERE DEVICE_CODE = :device_code 
-            ORDER BY now_time DESC 
-            LIMIT 1
+            FROM device_latest_position 
+            WHERE DEVICE_CODE = :device_code
         """), {'device_code': device_code}).mappings().first()
         
         if last_realtime_location:
             end_latitude = last_realtime_location['lat']
             end_longitude = last_realtime_location['lng']
-            print(f"device_realtime_log 마지막 위치 사용: lat={end_latitude}, lng={end_longitude}")
         else:
-            print("경고: device_realtime_log에서 위치를 찾을 수 없습니다. 거리를 0으로 설정합니다.")
+            print("경고: device_realtime_log에서 위치를 찾을 수 없습니다.")
             end_latitude = None
             end_longitude = None
         
         print(f"시작 위치: lat={start_latitude}, lng={start_longitude}")
         print(f"종료 위치: lat={end_latitude}, lng={end_longitude}")
         
-        # 좌표 유효성 검사
-        if start_latitude is None or start_longitude is None:
-            print("경고: 시작 위치 좌표가 없습니다!")
-        if end_latitude is None or end_longitude is None:
-            print("경고: 종료 위치 좌표가 없습니다!")
+        # 이동 거리 계산 - 대여 시작 위치부터 주행 중 실시간 로그 전체 경로를 따라 적산
+        lat, lng, t = load_ride_points(db.session, device_code, user_id, rental['start_time'])
+        metrics = compute_ride_metrics(lat, lng, t, start_point=(start_latitude, start_longitude, 0.0))
+        moved_distance = metrics['distance_m'] / 1000
         
-        # 거리 계산 함수 (Haversine 공식) - app_last.py와 동일한 로직
-        def calculate_distance(lat1, lon1, lat2, lon2):
-            from math import radians, cos, sin, asin, sqrt
-            
-            print(f"거리 계산 입력: lat1={lat1}, lon1={lon1}, lat2={lat2}, lon2={lon2}")
-            
-            # 입력값 검증
-            if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
-                print("경고: 좌표에 None 값이 있습니다!")
-                return 0.0
-            
-            # 좌표 범위 검증
-            if not (-90 <= lat1 <= 90) or not (-90 <= lat2 <= 90):
-                print(f"경고: 위도 범위 오류 - lat1={lat1}, lat2={lat2}")
-                return 0.0
-            
-            if not (-180 <= lon1 <= 180) or not (-180 <= lon2 <= 180):
-                print(f"경고: 경도 범위 오류 - lon1={lon1}, lon2={lon2}")
-                return 0.0
-            
-            # 지구의 반지름 (km)
-            R = 6371
-            
-            # 위도, 경도를 라디안으로 변환
-            lat1_rad, lon1_rad, lat2_rad, lon2_rad = map(radians, [lat1, lon1, lat2, lon2])
-            
-            print(f"라디안 변환: lat1_rad={lat1_rad:.6f}, lon1_rad={lon1_rad:.6f}, lat2_rad={lat2_rad:.6f}, lon2_rad={lon2_rad:.6f}")
-            
-            # Haversine 공식
-            dlat = lat2_rad - lat1_rad
-            dlon = lon2_rad - lon1_rad
-            print(f"차이: dlat={dlat:.6f}, dlon={dlon:.6f}")
-            
-            a = sin(dlat/2)**2 + cos(lat1_rad) * cos(lat2_rad) * sin(dlon/2)**2
-            print(f"중간값: a={a:.6f}")
-            
-            c = 2 * asin(sqrt(a))
-            print(f"중간값: c={c:.6f}")
-            
-            distance = R * c
-            print(f"거리 계산 결과: {distance:.6f}km")
-            return distance
-        
-        # 거리 계산 (좌표 순서 수정: 시작/종료 위치 모두 올바른 순서로 가져옴)
-        if start_latitude is None or start_longitude is None or end_latitude is None or end_longitude is None:
-            print("경고: 좌표 정보가 없습니다. 거리를 0으로 설정합니다.")
-            moved_distance = 0.0
-        else:
-            moved_distance = calculate_distance(start_latitude, start_longitude, end_latitude, end_longitude)
-            print(f"이동 거리: {moved_distance:.2f}km")
-            
-            # 거리 제한 제거 - 모든 거리를 그대로 사용
+        print(f"이동 거리: {moved_distance:.2f}km (실시간 로그 {metrics['point_count']}점), "
+              f"최고 속도: {metrics['max_speed_kmh']:.1f}km/h, 정차 시간: {metrics['idle_seconds']:.0f}초")
         
         # 대여 종료 정보 업데이트 - device_realtime_log의 마지막 위치를 end_loc으로 설정
         end_rental_sql = text("""
@@ -1706,10 +2991,8 @@ def end_device_rental():
             SET end_time = NOW(),
                 end_loc = (
                     SELECT location 
-                    FROM device_realtime_log 
-                    WHERE DEVICE_CODE = :device_code 
-                    ORDER BY now_time DESC 
-                    LIMIT 1
+                    FROM device_latest_position 
+                    WHERE DEVICE_CODE = :device_code
                 ),
                 fee = :fee,
                 moved_distance = :moved_distance
@@ -1730,13 +3013,11 @@ def end_device_rental():
         # device_info 테이블의 location을 device_realtime_log의 마지막 위치로 업데이트하고 is_used를 0으로 변경
         update_device_sql = text("""
             UPDATE device_info 
-            SET location = (
+            SET location = COALESCE((
                 SELECT location 
-                FROM device_realtime_log 
-                WHERE DEVICE_CODE = :device_code 
-                ORDER BY now_time DESC 
-                LIMIT 1
-            ),
+                FROM device_latest_position 
+                WHERE DEVICE_CODE = :device_code
+            ), location),
                 is_used = 0 
             WHERE DEVICE_CODE = :device_code
         """)
@@ -1744,7 +3025,7 @@ def end_device_rental():
         print(f"기기 상태 업데이트 시도: device_code={device_code}")
         
         # 업데이트 전 device_info.location 확인
-        before_location = db.session.execute(text("SELECT ST_X(location) as lng, ST_Y(location) as lat FROM device_info WHERE DEVICE_CODE = :device_code"), 
+        before_location = db.session.execute(text("SELECT ST_X(location) as lng, ST_Y(location) as lat, is_used FROM device_info WHERE DEVICE_CODE = :device_code FOR UPDATE"), 
                                           {'device_code': device_code}).mappings().first()
         print(f"업데이트 전 device_info.location: {before_location}")
         
@@ -1766,14 +3047,44 @@ def end_device_rental():
         else:
             print(f"성공: device_code '{device_code}'의 is_used가 0으로 업데이트되었습니다.")
         
+        # 반납 위치 기준으로 기기 지역 갱신
+        assign_device_regions(db.session, [device_code])
+        
+        if before_location is not None and before_location['is_used'] != 0:
+            adjust_kpi(db.session, available_devices=1)
         db.session.commit()
+        data_versions.bump('devices')
         print("데이터베이스 커밋 완료")
+        refresh_nearby_device(device_code)
+        
+        # 주행 궤적 축소 저장 (실패해도 대여 종료는 유지, 누락분은 realtime_log_maintenance.py가 다시 처리)
+        trajectory = None
+        try:
+            trajectory = compress_ride_trajectory(db.session, rental['id'], lat, lng, t, TRAJECTORY_TOLERANCE_M)
+            db.session.commit()
+            print(f"주행 궤적 저장: {trajectory['raw_point_count']}점 -> {trajectory['point_count']}점 "
+                  f"(허용 오차 {TRAJECTORY_TOLERANCE_M:g}m, 압축률 {trajectory['compression_ratio']}x)")
+        except Exception as e:
+            db.session.rollback()
+            print(f"주행 궤적 저장 오류: {str(e)}")
+        
+        # 시간대별 주행/매출 집계 반영 (실패해도 대여 종료는 유지, 누락분은 rollup_maintenance.py rebuild가 다시 계산)
+        try:
+            record_ride(db.session, rental['id'])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"주행 집계 반영 오류: {str(e)}")
         
         return jsonify({
             'message': '기기 대여가 종료되었습니다.',
             'usage_minutes': usage_minutes,
             'fee': fee,
-            'moved_distance': round(moved_distance, 2)
+            'moved_distance': round(moved_distance, 2),
+            'max_speed_kmh': round(metrics['max_speed_kmh'], 1),
+            'avg_speed_kmh': round(metrics['avg_speed_kmh'], 1),
+            'idle_seconds': int(metrics['idle_seconds']),
+            'trajectory': trajectory
         }), 200
         
     except Exception as e:
@@ -1782,6 +3093,40 @@ def end_device_rental():
         return jsonify({'error': '기기 대여 종료 중 오류가 발생했습니다.'}), 500
 
 
+# 주행 궤적 조회 API (대여 종료 시 축소 저장된 궤적으로 주행 재생)
+@app.route('/api/rides/<int:use_log_id>/trajectory', methods=['GET'])
+def get_ride_trajectory(use_log_id):
+    """주행 궤적 조회 API"""
+    try:
+        trajectory = load_ride_trajectory(db.session, use_log_id)
+        if not trajectory:
+            return jsonify({'error': '저장된 주행 궤적이 없습니다.'}), 404
+
+        start_time = trajectory['start_time']
+        end_time = trajectory['end_time']
+        return jsonify({
+            'use_log_id': trajectory['USE_LOG_ID'],
+            'device_code': trajectory['DEVICE_CODE'],
+            'user_id': trajectory['USER_ID'],
+            'start_time': start_time.isoformat() if start_time else None,
+            'end_time': end_time.isoformat() if end_time else None,
+            'method': trajectory['method'],
+            'tolerance': trajectory['tolerance'],
+            'raw_point_count': trajectory['raw_point_count'],
+            'point_count': trajectory['point_count'],
+            'compression_ratio': round(trajectory['raw_point_count'] / trajectory['point_count'], 2)
+            if trajectory['point_count'] else None,
+            'polyline': trajectory['polyline'],
+            'points': [
+                {'latitude': lat, 'longitude': lng, 'offset_seconds': offset}
+                for lat, lng, offset in trajectory['points']
+            ]
+        }), 200
+
+    except Exception as e:
+        print(f"주행 궤적 조회 오류: {str(e)}")
+        return jsonify({'error': '주행 궤적 조회 중 오류가 발생했습니다.'}), 500
+
 # 기기 대여 상태 확인 API
 @app.route('/api/device-rental/status/<device_code>', methods=['GET'])
 def get_device_rental_status(device_code):
@@ -1823,6 +3168,66 @@ def get_device_rental_status(device_code):
 
 ################################# 신고 기능 API ####################################
 
+# 신고 대상 추정 설정
+REPORT_TIME_WINDOW_SECONDS = 300    # 신고 시각 전후 탐색 범위 (±5분)
+REPORT_TIME_WEIGHT = 10             # 시간 차 1초를 거리 10m로 환산해 점수에 더함
+REPORT_RADIUS_M = float(os.getenv('REPORT_RADIUS_M', 1000))
+REPORT_CANDIDATE_LIMIT = 5
+REPORT_PING_BUFFER = os.getenv('REPORT_PING_BUFFER', 'true').lower() in ('1', 'true', 'yes')
+
+# 최근 실시간 로그 읽기 함수 (RecentPingBuffer 백그라운드 스레드에서 호출)
+def fetch_recent_realtime_logs(after_id, since_time, limit):
+    """device_realtime_log를 id 순서로 읽기 (after_id가 없으면 since_time 이후부터)"""
+    if after_id is None:
+        condition = "now_time >= :since_time"
+    else:
+        condition = "id > :after_id"
+    with app.app_context():
+        rows = db.session.execute(text(f"""
+            SELECT id, DEVICE_CODE, USER_ID, ST_X(location) AS lat, ST_Y(location) AS lng, now_time
+            FROM device_realtime_log
+            WHERE {condition}
+            ORDER BY id
+            LIMIT :limit
+        """), {'after_id': after_id, 'since_time': since_time, 'limit': limit}).all()
+        return [tuple(row) for row in rows]
+
+# 실시간 로그 읽기 위치 조회 (DB 시각, 열려 있는 가장 오래된 쓰기 트랜잭션의 시작 시각, MAX(id))
+# 변경분 커서와 같은 방식으로 innodb_trx를 읽고, 권한이 없으면 시작 시각 없이 반환 (버퍼가 정해진 시간만큼 겹쳐 읽음)
+REALTIME_LOG_POSITION_SQL = text("""
+    SELECT NOW(6),
+           (SELECT MIN(trx_started) FROM information_schema.innodb_trx
+            WHERE trx_mysql_thread_id != CONNECTION_ID() AND trx_autocommit_non_locking = 0),
+           (SELECT MAX(id) FROM device_realtime_log)
+""")
+realtime_log_position_state = {'use_innodb_trx': True}
+
+def fetch_realtime_log_position():
+    with app.app_context():
+        if realtime_log_position_state['use_innodb_trx']:
+            try:
+                now, oldest_trx, max_id = db.session.execute(REALTIME_LOG_POSITION_SQL).one()
+                # trx_started는 초 단위이므로 변경분 커서와 같이 더 겹쳐서 사용
+                if oldest_trx is None:
+                    return now, now, max_id
+                return now, oldest_trx - timedelta(seconds=CHANGE_FEED_OVERLAP_SECONDS), max_id
+            except Exception as e:
+                db.session.rollback()
+                realtime_log_position_state['use_innodb_trx'] = False
+                print(f"innodb_trx 조회 불가, 실시간 로그 버퍼를 정해진 시간만큼 겹쳐서 읽음: {str(e)}")
+        now, max_id = db.session.execute(text("SELECT NOW(6), MAX(id) FROM device_realtime_log")).one()
+        return now, None, max_id
+
+# 최근 15분 실시간 로그 링 버퍼 (신고 대상 추정을 DB 조회 없이 처리, 그보다 오래된 신고는 DB 조회)
+recent_pings = RecentPingBuffer(
+    fetch_recent_realtime_logs,
+    position_fn=fetch_realtime_log_position,
+    window_seconds=int(os.getenv('REPORT_PING_WINDOW', 900)),
+    tail_interval=float(os.getenv('REPORT_PING_TAIL_INTERVAL', 1.0)),
+    max_overlap_seconds=float(os.getenv('REPORT_PING_MAX_OVERLAP_SECONDS', 60)),
+    idle_seconds=float(os.getenv('REPORT_PING_IDLE_SECONDS', 600))
+) if REPORT_PING_BUFFER else None
+
 # 수동 신고 처리 API (헬멧 미착용 감지 시)
 @app.route('/api/report/manual-submit', methods=['POST'])
 def manual_submit_report():
@@ -1845,15 +3250,12 @@ def manual_submit_report():
         # report_case 결정
         report_case = 0 if violation_type == 'total_nohelmet_multi' else 1
         
-        # device_realtime_log에서 가장 가까운 사용자 찾기 (신고자 제외)
-        reported_user_id, reported_device_code = find_closest_user(
-            reporter_location['latitude'], 
-            reporter_location['longitude'], 
-            report_time,
-            reporter_user_id  # 신고자 ID 추가
-        )
-        
-        print(f"신고 대상: user_id={reported_user_id}, device_code={reported_device_code}")
+        # 사진은 파일 저장소에 한 번만 디코딩해 저장하고 DB에는 해시와 크기만 기록
+        # (이미지로 읽을 수 없는 값은 잃지 않도록 기존처럼 image 컬럼에 보관)
+        stored_image = store_report_image(blob_store, image_data) if image_data else None
+        image_sha256, image_width, image_height = stored_image or (None, None, None)
+        # 저장소가 임시 디렉터리면 파일이 지워질 수 있으므로 DB에도 보관
+        legacy_image = image_data if image_data and (stored_image is None or not blob_store.durable) else None
         
         # report_log 테이블에 저장
         report_sql = text("""
@@ -1865,41 +3267,67 @@ def manual_submit_report():
                 reporter_loc, 
                 reported_loc,
                 image, 
+                image_sha256,
+                image_width,
+                image_height,
+                has_image,
                 report_case,
-                is_verified
+                is_verified,
+                attribution_status,
+                attribution_updated_at
             ) VALUES (
                 :reporter_user_id,
-                :reported_user_id,
-                :reported_device_code,
+                NULL,
+                NULL,
                 :report_time,
                 ST_GeomFromText(CONCAT('POINT(', :reporter_lat, ' ', :reporter_lng, ')'), 4326),
-                ST_GeomFromText(CONCAT('POINT(', :reported_lat, ' ', :reported_lng, ')'), 4326),
+                ST_GeomFromText(CONCAT('POINT(', :reporter_lat, ' ', :reporter_lng, ')'), 4326),
                 :image_data,
+                :image_sha256,
+                :image_width,
+                :image_height,
+                :has_image,
                 :report_case,
-                FALSE
+                FALSE,
+                :attribution_status,
+                NOW()
             )
         """)
         
-        db.session.execute(report_sql, {
+        # 신고 대상은 백그라운드에서 추정하므로 우선 신고자 위치를 대상 위치로 저장
+        result = db.session.execute(report_sql, {
             'reporter_user_id': reporter_user_id,
-            'reported_user_id': reported_user_id,
-            'reported_device_code': reported_device_code,
             'report_time': report_time,
             'reporter_lat': reporter_location['latitude'],
             'reporter_lng': reporter_location['longitude'],
-            'reported_lat': reporter_location['latitude'],  # 같은 위치로 가정
-            'reported_lng': reporter_location['longitude'],
-            'image_data': image_data,
-            'report_case': report_case
+            'image_data': legacy_image,
+            'image_sha256': image_sha256,
+            'image_width': image_width,
+            'image_height': image_height,
+            'has_image': bool(image_sha256 or legacy_image),
+            'report_case': report_case,
+            'attribution_status': ATTRIBUTION_PENDING
         })
+        report_id = result.lastrowid
+        adjust_kpi(db.session, total_reports=1, pending_reports=1)
         
         db.session.commit()
-        print("수동 신고 저장 완료")
+        data_versions.bump('reports')
+        print(f"수동 신고 저장 완료 (id={report_id}, 신고 대상 추정 대기)")
+        
+        # 신고 대상 추정은 큐에 넣고 바로 응답 (큐가 가득 차면 sweep이 DB에서 다시 찾아 처리)
+        if not attribution_queue.submit(report_id):
+            print(f"신고 대상 추정 큐가 가득 참 (id={report_id}), 다음 sweep에서 처리")
+        
+        # 썸네일은 백그라운드에서 미리 생성 (응답을 기다리게 하지 않음)
+        if image_sha256:
+            thumbnail_pool.submit(image_sha256)
         
         return jsonify({
             'message': '수동 신고가 성공적으로 저장되었습니다.',
-            'reported_user_id': reported_user_id,
-            'reported_device_code': reported_device_code
+            'report_id': report_id,
+            'attribution_status': ATTRIBUTION_PENDING,
+            'attribution_url': url_for('get_report_attribution', report_id=report_id)
         }), 200
         
     except Exception as e:
@@ -1907,52 +3335,292 @@ def manual_submit_report():
         print(f"수동 신고 처리 오류: {str(e)}")
         return jsonify({'error': '수동 신고 처리 중 오류가 발생했습니다.'}), 500
 
-# 가장 가까운 사용자 찾기 함수 (신고자 제외)
-def find_closest_user(reporter_lat, reporter_lng, report_time, reporter_user_id):
-    """device_realtime_log에서 가장 가까운 사용자 찾기 (신고자 제외)"""
+# 신고 대상 후보 찾기 함수 (신고자 제외)
+def find_report_candidates(reporter_lat, reporter_lng, report_time, reporter_user_id, limit=REPORT_CANDIDATE_LIMIT):
+    """신고 시각 ±5분, 반경 REPORT_RADIUS_M 안의 주행 기록으로 후보 점수 계산 (점수가 낮을수록 유력)
+
+    최근 로그는 메모리 링 버퍼에서, 버퍼 범위를 벗어난 신고 시각은 device_realtime_log에서 조회한다.
+    반환값: (후보 목록, 조회 위치 'memory' 또는 'db')
+    """
     try:
-        # 시간과 위치를 기반으로 가장 가까운 사용자 찾기 (신고자 제외)
-        closest_user_sql = text("""
-            SELECT 
-                USER_ID,
-                DEVICE_CODE,
-                ST_Y(location) as lat,
-                ST_X(location) as lng,
-                now_time,
-                (
-                    ST_Distance_Sphere(
-                        ST_GeomFromText(CONCAT('POINT(', :reporter_lat, ' ', :reporter_lng, ')'), 4326),
-                        location
-                    ) + 
-                    ABS(TIMESTAMPDIFF(SECOND, :report_time, now_time)) * 10
-                ) as distance_score
-            FROM device_realtime_log 
-            WHERE now_time BETWEEN 
-                DATE_SUB(:report_time, INTERVAL 5 MINUTE) AND 
-                DATE_ADD(:report_time, INTERVAL 5 MINUTE)
-            AND USER_ID != :reporter_user_id  -- 신고자 제외
-            ORDER BY distance_score ASC
-            LIMIT 1
+        reporter_lat = float(reporter_lat)
+        reporter_lng = float(reporter_lng)
+        report_dt = parse_client_timestamp(report_time)
+        window_start = report_dt - timedelta(seconds=REPORT_TIME_WINDOW_SECONDS)
+        
+        if recent_pings is not None:
+            recent_pings.ensure_started()
+            if recent_pings.covers(window_start):
+                candidates = recent_pings.candidates(
+                    reporter_lat, reporter_lng, report_dt,
+                    time_window_seconds=REPORT_TIME_WINDOW_SECONDS,
+                    radius_m=REPORT_RADIUS_M,
+                    exclude_user=reporter_user_id,
+                    limit=limit,
+                    time_weight=REPORT_TIME_WEIGHT
+                )
+                return candidates, 'memory'
+        
+        # 버퍼에 없는 시각이면 DB에서 사용자/기기별 최저 점수 조회
+        candidates_sql = text("""
+            SELECT USER_ID, DEVICE_CODE, lat, lng, now_time, distance_m, time_diff_seconds, score
+            FROM (
+                SELECT 
+                    USER_ID,
+                    DEVICE_CODE,
+                    lat,
+                    lng,
+                    now_time,
+                    distance_m,
+                    time_diff_seconds,
+                    distance_m + time_diff_seconds * :time_weight AS score,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY USER_ID, DEVICE_CODE
+                        ORDER BY distance_m + time_diff_seconds * :time_weight
+                    ) AS rn
+                FROM (
+                    SELECT 
+                        USER_ID,
+                        DEVICE_CODE,
+                        ST_X(location) AS lat,
+                        ST_Y(location) AS lng,
+                        now_time,
+                        ST_Distance_Sphere(
+                            ST_GeomFromText(CONCAT('POINT(', :reporter_lat, ' ', :reporter_lng, ')'), 4326),
+                            location
+                        ) AS distance_m,
+                        ABS(TIMESTAMPDIFF(SECOND, :report_time, now_time)) AS time_diff_seconds
+                    FROM device_realtime_log 
+                    WHERE now_time BETWEEN :window_start AND :window_end
+                    AND USER_ID != :reporter_user_id  -- 신고자 제외
+                ) logs
+                WHERE distance_m <= :radius_m
+            ) ranked
+            WHERE rn = 1
+            ORDER BY score ASC
+            LIMIT :limit
         """)
         
-        result = db.session.execute(closest_user_sql, {
+        rows = db.session.execute(candidates_sql, {
             'reporter_lat': reporter_lat,
             'reporter_lng': reporter_lng,
-            'report_time': report_time,
-            'reporter_user_id': reporter_user_id  # 신고자 ID 추가
-        }).mappings().first()
-        
-        if result:
-            print(f"가장 가까운 사용자: {result['USER_ID']}, 기기: {result['DEVICE_CODE']}")
-            return result['USER_ID'], result['DEVICE_CODE']
-        else:
+            'report_time': report_dt,
+            'window_start': window_start,
+            'window_end': report_dt + timedelta(seconds=REPORT_TIME_WINDOW_SECONDS),
+            'reporter_user_id': reporter_user_id,
+            'radius_m': REPORT_RADIUS_M,
+            'time_weight': REPORT_TIME_WEIGHT,
+            'limit': limit
+        }).mappings().all()
+        
+        candidates = [{
+            'user_id': row['USER_ID'],
+            'device_code': row['DEVICE_CODE'],
+            'latitude': float(row['lat']),
+            'longitude': float(row['lng']),
+            'now_time': row['now_time'],
+            'distance_m': float(row['distance_m']),
+            'time_diff_seconds': float(row['time_diff_seconds']),
+            'score': float(row['score'])
+        } for row in rows]
+        
+        if not candidates:
             print("가까운 사용자를 찾을 수 없음 (신고자 제외)")
-            return None, None
+        return candidates, 'db'
             
     except Exception as e:
-        print(f"가장 가까운 사용자 찾기 오류: {str(e)}")
-        return None, None
+        db.session.rollback()
+        print(f"신고 대상 후보 찾기 오류: {str(e)}")
+        return [], 'error'
+
+# 신고 대상 추정용 링 버퍼 상태 조회 API (워커별)
+@app.route('/api/report/recent-pings', methods=['GET'])
+def get_recent_pings_stats():
+    """신고 대상 추정용 최근 실시간 로그 버퍼 상태 조회 API"""
+    if recent_pings is None:
+        return jsonify({'enabled': False}), 200
+    stats = recent_pings.stats()
+    stats['enabled'] = True
+    stats['pid'] = os.getpid()
+    return jsonify(stats), 200
+
+
+
+# 신고 대상 추정 작업 설정 (신고 접수 응답 후 백그라운드 스레드에서 처리)
+ATTRIBUTION_PENDING = 'pending'       # 추정 대기/진행 중
+ATTRIBUTION_RESOLVED = 'resolved'     # 신고 대상 확정
+ATTRIBUTION_UNMATCHED = 'unmatched'   # 주변에 후보 없음
+ATTRIBUTION_FAILED = 'failed'         # 재시도를 모두 실패
+ATTRIBUTION_RETRY_DELAYS = (2, 10, 60)                                            # 조회 실패 시 재시도 간격(초)
+ATTRIBUTION_STALE_SECONDS = int(os.getenv('ATTRIBUTION_STALE_SECONDS', 120))      # 이 시간 동안 진행 없는 pending 신고는 sweep이 다시 처리
+ATTRIBUTION_POLL_SECONDS = 2                                                      # pending일 때 결과 조회 API가 권하는 재조회 간격(초)
+
+# 후보 목록 JSON 변환 함수
+def serialize_report_candidates(candidates):
+    return [{
+        'user_id': c['user_id'],
+        'device_code': c['device_code'],
+        'distance_m': round(c['distance_m'], 1),
+        'time_diff_seconds': round(c['time_diff_seconds'], 1),
+        'score': round(c['score'], 1),
+        'now_time': c['now_time'].isoformat() if c['now_time'] else None
+    } for c in candidates]
+
+# 신고 1건의 대상 추정 함수 (attribution_queue 스레드에서 호출)
+def resolve_report_attribution(report_id, attempt):
+    """pending 신고의 후보를 찾아 REPORTED_USER_ID/REPORTED_DEVICE_CODE/reported_loc 저장
+
+    조회 오류면 False를 반환해 재시도하고, 이미 처리된 신고(다른 워커가 먼저 처리)는 그대로 끝낸다.
+    """
+    with app.app_context():
+        report = db.session.execute(text("""
+            SELECT REPORTER_USER_ID, report_time, ST_X(reporter_loc) AS lat, ST_Y(reporter_loc) AS lng,
+                   attribution_status
+            FROM report_log
+            WHERE id = :report_id
+        """), {'report_id': report_id}).mappings().first()
+        if report is None or report['attribution_status'] != ATTRIBUTION_PENDING:
+            return True
+        
+        # 시도 횟수 기록 (진행 중인 신고를 다른 워커의 sweep이 다시 잡지 않도록 시각 갱신)
+        db.session.execute(text("""
+            UPDATE report_log
+            SET attribution_attempts = :attempt, attribution_updated_at = NOW()
+            WHERE id = :report_id AND attribution_status = :pending
+        """), {'attempt': attempt, 'report_id': report_id, 'pending': ATTRIBUTION_PENDING})
+        db.session.commit()
+        
+        candidates, source = find_report_candidates(
+            report['lat'], report['lng'], report['report_time'], report['REPORTER_USER_ID']
+        )
+        if source == 'error':
+            return False
+        top = candidates[0] if candidates else None
+        
+        # 신고 대상의 가장 가까운 주행 위치 (후보가 없으면 접수 때 저장한 신고자 위치 유지)
+        result = db.session.execute(text("""
+            UPDATE report_log
+            SET REPORTED_USER_ID = :reported_user_id,
+                REPORTED_DEVICE_CODE = :reported_device_code,
+                reported_loc = COALESCE(
+                    ST_GeomFromText(CONCAT('POINT(', :reported_lat, ' ', :reported_lng, ')'), 4326),
+                    reported_loc
+                ),
+                attribution_status = :status,
+                attribution_candidates = :candidates,
+                attribution_updated_at = NOW()
+            WHERE id = :report_id AND attribution_status = :pending
+        """), {
+            'reported_user_id': top['user_id'] if top else None,
+            'reported_device_code': top['device_code'] if top else None,
+            'reported_lat': top['latitude'] if top else None,
+            'reported_lng': top['longitude'] if top else None,
+            'status': ATTRIBUTION_RESOLVED if top else ATTRIBUTION_UNMATCHED,
+            'candidates': json.dumps(serialize_report_candidates(candidates)),
+            'report_id': report_id,
+            'pending': ATTRIBUTION_PENDING
+        })
+        db.session.commit()
+        if result.rowcount == 0:
+            return True
+        data_versions.bump('reports')
+        print(f"신고 대상: id={report_id}, user_id={top['user_id'] if top else None}, "
+              f"device_code={top['device_code'] if top else None} (후보 {len(candidates)}명, 조회: {source})")
+        
+        # 시간대별 집계 반영 (실패해도 신고는 유지, 누락분은 rollup_maintenance.py rebuild가 다시 계산)
+        try:
+            record_report(
+                db.session, report['report_time'],
+                top['latitude'] if top else report['lat'],
+                top['longitude'] if top else report['lng']
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"신고 집계 반영 오류: {str(e)}")
+        return True
 
+# 재시도를 모두 실패한 신고 처리 함수
+def fail_report_attribution(report_id, attempt):
+    with app.app_context():
+        result = db.session.execute(text("""
+            UPDATE report_log
+            SET attribution_status = :failed, attribution_attempts = :attempt, attribution_updated_at = NOW()
+            WHERE id = :report_id AND attribution_status = :pending
+        """), {'failed': ATTRIBUTION_FAILED, 'attempt': attempt, 'report_id': report_id, 'pending': ATTRIBUTION_PENDING})
+        db.session.commit()
+        if result.rowcount:
+            data_versions.bump('reports')
+            print(f"신고 대상 추정 실패: id={report_id} ({attempt}회 시도)")
+
+# 처리가 멈춘 pending 신고 조회 함수 (워커 재시작, 큐 가득 참 등)
+def find_stale_report_attributions():
+    with app.app_context():
+        rows = db.session.execute(text("""
+            SELECT id, attribution_attempts
+            FROM report_log
+            WHERE attribution_status = :pending
+            AND attribution_updated_at < NOW() - INTERVAL :stale_seconds SECOND
+            ORDER BY id
+            LIMIT 500
+        """), {'pending': ATTRIBUTION_PENDING, 'stale_seconds': ATTRIBUTION_STALE_SECONDS}).all()
+        return [(row[0], row[1]) for row in rows]
+
+# 신고 대상 추정 큐 (워커 프로세스별 스레드, 실패하면 ATTRIBUTION_RETRY_DELAYS 간격으로 재시도)
+attribution_queue = RetryQueue(
+    resolve_report_attribution,
+    give_up_fn=fail_report_attribution,
+    sweep_fn=find_stale_report_attributions,
+    workers=int(os.getenv('ATTRIBUTION_WORKERS', 2)),
+    retry_delays=ATTRIBUTION_RETRY_DELAYS,
+    sweep_interval=float(os.getenv('ATTRIBUTION_SWEEP_INTERVAL', 30)),
+    name='report-attribution'
+)
+
+# 신고 대상 추정 결과 조회 API
+@app.route('/api/report/<int:report_id>/attribution', methods=['GET'])
+def get_report_attribution(report_id):
+    """신고 대상 추정 상태와 결과 (pending, resolved, unmatched, failed)
+
+    요청 스레드를 붙잡지 않도록 기다리지 않고 바로 응답한다. pending이면 Retry-After초 뒤 다시 조회한다.
+    """
+    # 이 워커에서 아직 큐가 시작되지 않았어도 sweep이 멈춘 신고를 처리하도록 시작
+    attribution_queue.ensure_started()
+    row = db.session.execute(text("""
+        SELECT REPORTED_USER_ID, REPORTED_DEVICE_CODE, attribution_status, attribution_attempts,
+               attribution_candidates
+        FROM report_log
+        WHERE id = :report_id
+    """), {'report_id': report_id}).mappings().first()
+    if row is None:
+        return jsonify({'error': '신고를 찾을 수 없습니다.'}), 404
+    
+    candidates = row['attribution_candidates']
+    if isinstance(candidates, (str, bytes)):
+        candidates = json.loads(candidates)
+    return jsonify({
+        'report_id': report_id,
+        'attribution_status': row['attribution_status'],
+        'attempts': row['attribution_attempts'],
+        'reported_user_id': row['REPORTED_USER_ID'],
+        'reported_device_code': row['REPORTED_DEVICE_CODE'],
+        'candidates': candidates or []
+    }), 200, ({'Retry-After': str(ATTRIBUTION_POLL_SECONDS)} if row['attribution_status'] == ATTRIBUTION_PENDING else {})
+
+# 신고 대상 추정 큐 상태 조회 API (워커별)
+@app.route('/api/report/attribution-stats', methods=['GET'])
+def get_report_attribution_stats():
+    """신고 대상 추정 큐 상태와 상태별 신고 수"""
+    counts = db.session.execute(text("""
+        SELECT attribution_status, COUNT(*) FROM report_log
+        WHERE attribution_status != :resolved
+        GROUP BY attribution_status
+    """), {'resolved': ATTRIBUTION_RESOLVED}).all()
+    return jsonify({
+        'pid': os.getpid(),
+        **attribution_queue.stats(),
+        'reports': {status: count for status, count in counts}
+    }), 200
 
 
 ########################################################### 챗봇을 위한 엔드포인트
@@ -2191,6 +3859,45 @@ def get_chatbot_status():
 
 #####################################################################################
 
+############################ 프로세스 내부 상태 초기화 #########################
+
+# 워커 시작 시 메모리 상태 적재 (워커 프로세스별 한 번)
+warm_state = {'pid': None}
+warm_lock = threading.Lock()
+
+def warm_in_memory_state():
+    """메모리 상태(기기별 텔레메트리, 주변 기기 색인)를 DB에서 적재
+
+    import 시에는 실행하지 않는다 (시뮬레이터, 관리 스크립트도 app을 import함).
+    gunicorn은 gunicorn.conf.py의 post_worker_init에서, 그 밖에는 첫 요청에서 호출된다.
+    """
+    if warm_state['pid'] == os.getpid():
+        return
+    with warm_lock:
+        if warm_state['pid'] == os.getpid():
+            return
+        warm_state['pid'] = os.getpid()
+        with app.app_context():
+            try:
+                load_device_states()
+                print(f"기기 상태 적재 완료: {len(device_states)}대")
+            except Exception as e:
+                db.session.rollback()
+                print(f"기기 상태 적재 오류: {str(e)}")
+            try:
+                print(f"주변 기기 색인 구성 완료: {rebuild_nearby_index()}대")
+            except Exception as e:
+                db.session.rollback()
+                print(f"주변 기기 색인 구성 오류: {str(e)}")
+
+@app.before_request
+def warm_in_memory_state_on_first_request():
+    if warm_state['pid'] != os.getpid():
+        warm_in_memory_state()
+
+if os.getenv('WARM_STATE_ON_START', 'false').lower() in ('1', 'true', 'yes'):
+    warm_in_memory_state()
+
 if __name__ == '__main__':
     initialize_documents()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,405 @@
+import argparse
+import gzip
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# 성능 비교용 벤치마크 스크립트 (DB 없이 합성 데이터로 응답 크기/직렬화 시간 측정)
+#
+#   python benchmarks.py viewport                       # 전체 기기 vs 지도 영역(bbox) 응답 비교 (1만/10만 대)
+#   python benchmarks.py viewport --sizes 10000 100000 1000000
+#   python benchmarks.py changes                        # 1초 폴링 시 전체 재전송 vs since 커서 변경분 (1분 누적)
+#   python benchmarks.py clusters                       # 축소 지도(줌 11/13)에서 기기 전체 vs 서버 클러스터 응답 비교
+#   python benchmarks.py snapshot                       # 지도 응답 JSON vs 열 단위 바이너리 스냅샷 (직렬화 시간/크기/할당량)
+#   python benchmarks.py heatmap                        # 실시간 로그 히트맵 청크 집계 (로그 수별 처리 시간/최대 메모리)
+#   python benchmarks.py histograms                     # 배터리 분포: CASE/GROUP BY SQL(SQLite 메모리 DB) vs 메모리 열 bincount
+
+# 합성 기기 분포 범위 (수도권)
+FLEET_BOUNDS = (37.40, 126.75, 37.70, 127.20)
+
+# 관리자 지도 화면 (서울시청 중심, 1280x800 화면에서 줌 15 정도 = 약 3.4km x 2.1km)
+VIEWPORT_BBOX = (37.5570, 126.9590, 37.5760, 126.9970)
+
+
+def make_fleet(size, seed=42):
+    """/api/web/devices 응답과 같은 형태의 합성 기기 목록 생성"""
+    rng = random.Random(seed)
+    min_lat, min_lng, max_lat, max_lng = FLEET_BOUNDS
+    now = datetime.now().isoformat()
+    devices = []
+    for i in range(size):
+        is_used = 1 if rng.random() < 0.2 else 0
+        devices.append({
+            'id': i + 1,
+            'device_id': f"{i % 2}{i:09d}",
+            'device_type': '킥보드' if i % 2 == 0 else '자전거',
+            'latitude': round(rng.uniform(min_lat, max_lat), 6),
+            'longitude': round(rng.uniform(min_lng, max_lng), 6),
+            'battery_level': rng.randint(0, 100),
+            'is_used': is_used,
+            'status': 'in_use' if is_used else 'available',
+            'current_user_id': f"user{rng.randint(1, 5000)}" if is_used else None,
+            'last_updated': now
+        })
+    return devices
+
+
+def measure_payload(body, repeat=3):
+    """JSON 직렬화 시간(ms, 최솟값)과 원본/gzip 크기(bytes)"""
+    best = None
+    encoded = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encoded = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(encoded), len(gzip.compress(encoded, compresslevel=6))
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def bench_viewport(sizes):
+    """전체 기기 응답(per_page=전체)과 지도 영역 응답 비교"""
+    min_lat, min_lng, max_lat, max_lng = VIEWPORT_BBOX
+    print(f"지도 영역: {VIEWPORT_BBOX}")
+    print(f"{'기기 수':>10} | {'모드':<8} | {'기기':>8} | {'JSON':>9} | {'gzip':>9} | {'직렬화':>9}")
+    print('-' * 68)
+
+    for size in sizes:
+        fleet = make_fleet(size)
+        full_body = {
+            'devices': fleet,
+            'pagination': {'page': 1, 'per_page': size, 'total': size, 'pages': 1}
+        }
+        visible = [
+            d for d in fleet
+            if min_lat <= d['latitude'] <= max_lat and min_lng <= d['longitude'] <= max_lng
+        ]
+        viewport_body = {
+            'devices': [{k: v for k, v in d.items() if k != 'id'} for d in visible],
+            'bbox': list(VIEWPORT_BBOX),
+            'count': len(visible),
+            'truncated': False
+        }
+
+        for mode, body, count in (('full', full_body, size), ('bbox', viewport_body, len(visible))):
+            elapsed, raw_size, gzip_size = measure_payload(body)
+            print(f"{size:>10,} | {mode:<8} | {count:>8,} | {format_bytes(raw_size):>9} | "
+                  f"{format_bytes(gzip_size):>9} | {elapsed:>7.1f}ms")
+        print('-' * 68)
+
+
+def bench_changes(sizes, moving_ratio, seconds):
+    """매초 moving_ratio 비율의 기기가 움직일 때 1분 동안 전송량 비교 (전체 목록 vs since 변경분)"""
+    print(f"초당 변경 기기 비율: {moving_ratio:.1%}, 폴링 {seconds}회 (1초 간격)")
+    print(f"{'기기 수':>10} | {'모드':<8} | {'요청당 기기':>10} | {'누적 JSON':>10} | {'누적 gzip':>10}")
+    print('-' * 62)
+
+    rng = random.Random(7)
+    for size in sizes:
+        fleet = make_fleet(size)
+        full_body = {
+            'devices': fleet,
+            'pagination': {'page': 1, 'per_page': size, 'total': size, 'pages': 1},
+            'cursor': datetime.now().isoformat(timespec='microseconds')
+        }
+        _, full_raw, full_gzip = measure_payload(full_body, repeat=1)
+
+        changed_count = max(int(size * moving_ratio), 1)
+        changes_raw = 0
+        changes_gzip = 0
+        for _ in range(seconds):
+            changed = rng.sample(fleet, changed_count)
+            for device in changed:
+                device['latitude'] = round(device['latitude'] + rng.uniform(-0.0001, 0.0001), 6)
+                device['longitude'] = round(device['longitude'] + rng.uniform(-0.0001, 0.0001), 6)
+            body = {
+                'devices': [{k: v for k, v in d.items() if k != 'id'} for d in changed],
+                'removed': [],
+                'count': changed_count,
+                'cursor': datetime.now().isoformat(timespec='microseconds')
+            }
+            _, raw_size, gzip_size = measure_payload(body, repeat=1)
+            changes_raw += raw_size
+            changes_gzip += gzip_size
+
+        print(f"{size:>10,} | {'full':<8} | {size:>10,} | {format_bytes(full_raw * seconds):>10} | "
+              f"{format_bytes(full_gzip * seconds):>10}")
+        print(f"{size:>10,} | {'since':<8} | {changed_count:>10,} | {format_bytes(changes_raw):>10} | "
+              f"{format_bytes(changes_gzip):>10}")
+        print('-' * 62)
+
+
+def bench_clusters(sizes, zooms):
+    """축소된 지도 화면(FLEET_BOUNDS 전체)에서 기기 목록 응답과 클러스터 응답 비교"""
+    from spatial_index import ClusterGrid
+
+    print(f"지도 영역: {FLEET_BOUNDS}")
+    print(f"{'기기 수':>10} | {'모드':<10} | {'마커':>8} | {'JSON':>9} | {'gzip':>9} | {'집계':>9} | {'조회':>8}")
+    print('-' * 80)
+
+    for size in sizes:
+        fleet = make_fleet(size)
+        full_body = {'devices': [{k: v for k, v in d.items() if k != 'id'} for d in fleet], 'count': size}
+        _, raw_size, gzip_size = measure_payload(full_body, repeat=1)
+        print(f"{size:>10,} | {'bbox':<10} | {size:>8,} | {format_bytes(raw_size):>9} | "
+              f"{format_bytes(gzip_size):>9} | {'-':>9} | {'-':>8}")
+
+        grid = ClusterGrid()
+        grid.rebuild(
+            [d['device_id'] for d in fleet],
+            [d['latitude'] for d in fleet],
+            [d['longitude'] for d in fleet],
+            [d['is_used'] for d in fleet],
+            [d['battery_level'] for d in fleet]
+        )
+        for zoom in zooms:
+            started = time.perf_counter()
+            grid.clusters(zoom, FLEET_BOUNDS)
+            aggregate_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            clusters, total, truncated = grid.clusters(zoom, FLEET_BOUNDS)
+            query_ms = (time.perf_counter() - started) * 1000
+            body = {'zoom': zoom, 'clusters': clusters, 'total': total, 'truncated': truncated}
+            _, raw_size, gzip_size = measure_payload(body, repeat=1)
+            print(f"{size:>10,} | {'zoom ' + str(zoom):<10} | {len(clusters):>8,} | {format_bytes(raw_size):>9} | "
+                  f"{format_bytes(gzip_size):>9} | {aggregate_ms:>7.1f}ms | {query_ms:>6.1f}ms")
+        print('-' * 80)
+
+
+def make_device_rows(size, seed=42):
+    """WEB_DEVICES_SQL 결과와 같은 순서의 행 튜플 목록 생성"""
+    rng = random.Random(seed)
+    min_lat, min_lng, max_lat, max_lng = FLEET_BOUNDS
+    now = datetime.now().replace(microsecond=0)
+    rows = []
+    for i in range(size):
+        is_used = 1 if rng.random() < 0.2 else 0
+        rows.append((
+            f"{i % 2}{i:09d}",
+            '킥보드' if i % 2 == 0 else '자전거',
+            rng.uniform(min_lat, max_lat),
+            rng.uniform(min_lng, max_lng),
+            rng.randint(0, 100),
+            is_used,
+            now - timedelta(seconds=rng.randint(0, 3600)),
+            f"user{rng.randint(1, 5000)}" if is_used else None
+        ))
+    return rows
+
+
+def encode_rows_json(rows):
+    """현재 JSON 응답과 같은 방식 (기기별 dict 생성 후 직렬화)"""
+    devices = []
+    for code, device_type, lat, lng, battery, is_used, updated, user_id in rows:
+        devices.append({
+            'device_id': code,
+            'device_type': device_type or '킥보드',
+            'latitude': float(lat) if lat is not None else None,
+            'longitude': float(lng) if lng is not None else None,
+            'battery_level': battery,
+            'is_used': is_used,
+            'status': 'in_use' if is_used == 1 else 'available',
+            'current_user_id': user_id,
+            'last_updated': updated.isoformat() if updated else None
+        })
+    body = {'devices': devices, 'count': len(devices), 'truncated': False, 'cursor': datetime.now().isoformat()}
+    return json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+
+def measure_encoder(encode, rows, repeat=5):
+    """(최소 시간 ms, 결과 바이트, 최대 할당량 bytes)"""
+    best = None
+    encoded = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encoded = encode(rows)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    encode(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, encoded, peak
+
+
+def bench_snapshot(sizes):
+    """지도 영역 응답을 JSON과 바이너리 스냅샷으로 직렬화할 때 시간/크기/할당량 비교"""
+    from fleet_snapshot import encode_fleet_snapshot
+
+    cursor = datetime.now().isoformat(timespec='microseconds')
+    encoders = (
+        ('json', encode_rows_json),
+        ('binary', lambda rows: encode_fleet_snapshot(rows, cursor))
+    )
+    print(f"{'기기 수':>10} | {'형식':<8} | {'크기':>9} | {'gzip':>9} | {'직렬화':>9} | {'최대 할당':>10}")
+    print('-' * 70)
+    for size in sizes:
+        rows = make_device_rows(size)
+        for name, encode in encoders:
+            elapsed, encoded, peak = measure_encoder(encode, rows)
+            print(f"{size:>10,} | {name:<8} | {format_bytes(len(encoded)):>9} | "
+                  f"{format_bytes(len(gzip.compress(encoded, compresslevel=6))):>9} | "
+                  f"{elapsed:>7.2f}ms | {format_bytes(peak):>10}")
+        print('-' * 70)
+
+
+def bench_heatmap(sizes, cell_m, chunk_size):
+    """합성 실시간 로그를 청크 단위로 만들어 히트맵 집계 (DB 읽기 제외, 집계 시간과 최대 할당량)"""
+    import numpy as np
+    from heatmap import HeatmapGrid, merge_counts
+
+    grid = HeatmapGrid(cell_m)
+    min_lat, min_lng, max_lat, max_lng = FLEET_BOUNDS
+    print(f"{'로그 수':>12} | {'청크':>8} | {'칸 수':>8} | {'집계 시간':>10} | {'처리량':>12} | {'최대 할당':>10}")
+    print('-' * 78)
+    for size in sizes:
+        rng = np.random.default_rng(42)
+        ids = np.empty(0, dtype=np.int64)
+        counts = np.empty(0, dtype=np.int64)
+        elapsed = 0.0
+        tracemalloc.start()
+        for start in range(0, size, chunk_size):
+            n = min(chunk_size, size - start)
+            # 수요가 몰리는 지점 주변에 점이 모이도록 정규분포 + 균등분포 혼합
+            lat = np.where(rng.random(n) < 0.7, rng.normal(37.55, 0.03, n), rng.uniform(min_lat, max_lat, n))
+            lng = np.where(rng.random(n) < 0.7, rng.normal(126.98, 0.04, n), rng.uniform(min_lng, max_lng, n))
+            started = time.perf_counter()
+            chunk_ids, chunk_counts = grid.bin(lat, lng)
+            ids, counts = merge_counts(ids, counts, chunk_ids, chunk_counts)
+            elapsed += time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert int(counts.sum()) == size
+        print(f"{size:>12,} | {chunk_size:>8,} | {len(ids):>8,} | {elapsed * 1000:>8.0f}ms | "
+              f"{size / elapsed / 1e6:>8.1f}M/s | {format_bytes(peak):>10}")
+
+
+# 기존 통계 API의 배터리 분포 SQL (CASE 식을 SELECT/GROUP BY에서 반복)
+BATTERY_CASE_SQL = """
+    SELECT
+        CASE
+            WHEN battery_level < 10 THEN '0-9%'
+            WHEN battery_level < 20 THEN '10-19%'
+            WHEN battery_level < 30 THEN '20-29%'
+            WHEN battery_level < 40 THEN '30-39%'
+            WHEN battery_level < 50 THEN '40-49%'
+            WHEN battery_level < 60 THEN '50-59%'
+            WHEN battery_level < 70 THEN '60-69%'
+            WHEN battery_level < 80 THEN '70-79%'
+            WHEN battery_level < 90 THEN '80-89%'
+            ELSE '90-100%'
+        END as battery_range,
+        COUNT(*) as count
+    FROM device_info
+    GROUP BY
+        CASE
+            WHEN battery_level < 10 THEN '0-9%'
+            WHEN battery_level < 20 THEN '10-19%'
+            WHEN battery_level < 30 THEN '20-29%'
+            WHEN battery_level < 40 THEN '30-39%'
+            WHEN battery_level < 50 THEN '40-49%'
+            WHEN battery_level < 60 THEN '50-59%'
+            WHEN battery_level < 70 THEN '60-69%'
+            WHEN battery_level < 80 THEN '70-79%'
+            WHEN battery_level < 90 THEN '80-89%'
+            ELSE '90-100%'
+        END
+    ORDER BY battery_range
+"""
+
+
+def bench_histograms(sizes, repeat=5):
+    """배터리 분포를 SQL(CASE/GROUP BY)과 메모리 열 bincount로 계산할 때 시간 비교
+
+    MySQL 없이 돌리기 위해 SQL 쪽은 SQLite 메모리 DB로 측정한다 (네트워크 왕복 제외, 실제 차이는 더 큼).
+    """
+    import sqlite3
+    from histograms import ValueColumn, battery_histogram
+
+    print(f"{'기기 수':>10} | {'방식':<16} | {'1회 시간':>10} | {'결과':>6}")
+    print('-' * 56)
+    for size in sizes:
+        rng = random.Random(42)
+        levels = [rng.randint(0, 100) for _ in range(size)]
+
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE device_info (DEVICE_CODE TEXT PRIMARY KEY, battery_level INTEGER)")
+        conn.executemany("INSERT INTO device_info VALUES (?, ?)", ((f"D{i:09d}", v) for i, v in enumerate(levels)))
+        column = ValueColumn('battery')
+        column.rebuild([f"D{i:09d}" for i in range(size)], levels)
+
+        def run_sql():
+            return conn.execute(BATTERY_CASE_SQL).fetchall()
+
+        cases = (
+            ('sql (sqlite)', run_sql),
+            ('bincount 10%', lambda: battery_histogram(column, 10)[0]),
+            ('bincount 5%', lambda: battery_histogram(column, 5)[0])
+        )
+        expected = {label: count for label, count in run_sql()}
+        for name, fn in cases:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                result = fn()
+            elapsed = (time.perf_counter() - started) / repeat * 1000
+            if name == 'bincount 10%':
+                assert {b['battery_range']: b['count'] for b in result if b['count']} == expected
+            print(f"{size:>10,} | {name:<16} | {elapsed:>8.2f}ms | {len(result):>6}")
+        conn.close()
+        print('-' * 56)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='관리자 페이지 성능 비교 벤치마크')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p_viewport = subparsers.add_parser('viewport', help='전체 기기 vs 지도 영역(bbox) 응답 크기 비교')
+    p_viewport.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='기기 수 (기본 10000 100000)')
+
+    p_changes = subparsers.add_parser('changes', help='1초 폴링 시 전체 목록 vs since 변경분 전송량 비교')
+    p_changes.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='기기 수 (기본 10000 100000)')
+    p_changes.add_argument('--moving-ratio', type=float, default=0.001, help='초당 변경 기기 비율 (기본 0.001)')
+    p_changes.add_argument('--seconds', type=int, default=60, help='폴링 횟수 (기본 60)')
+
+    p_clusters = subparsers.add_parser('clusters', help='축소 지도에서 기기 목록 vs 서버 클러스터 응답 비교')
+    p_clusters.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='기기 수 (기본 10000 100000)')
+    p_clusters.add_argument('--zooms', type=int, nargs='+', default=[11, 13], help='줌 레벨 (기본 11 13)')
+
+    p_snapshot = subparsers.add_parser('snapshot', help='지도 응답 JSON vs 바이너리 스냅샷 직렬화 비교')
+    p_snapshot.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 100000], help='기기 수 (기본 1000 5000 100000)')
+
+    p_heatmap = subparsers.add_parser('heatmap', help='실시간 로그 히트맵 청크 집계 시간/메모리 측정')
+    p_heatmap.add_argument('--sizes', type=int, nargs='+', default=[1000000, 10000000], help='로그 수 (기본 1000000 10000000)')
+    p_heatmap.add_argument('--cell', type=int, default=250, help='칸 크기(미터) (기본 250)')
+    p_heatmap.add_argument('--chunk-size', type=int, default=50000, help='청크 행 수 (기본 50000)')
+
+    p_histograms = subparsers.add_parser('histograms', help='배터리 분포 SQL vs 메모리 열 bincount 비교')
+    p_histograms.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='기기 수 (기본 10000 100000 1000000)')
+
+    args = parser.parse_args()
+
+    if args.command == 'viewport':
+        bench_viewport(args.sizes)
+    elif args.command == 'changes':
+        bench_changes(args.sizes, args.moving_ratio, args.seconds)
+    elif args.command == 'clusters':
+        bench_clusters(args.sizes, args.zooms)
+    elif args.command == 'snapshot':
+        bench_snapshot(args.sizes)
+    elif args.command == 'heatmap':
+        bench_heatmap(args.sizes, args.cell, args.chunk_size)
+    elif args.command == 'histograms':
+        bench_histograms(args.sizes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import tempfile
+import uuid
+
+# 기본 저장 위치 (앱 디렉터리 아래, 재부팅/임시 파일 정리에 지워지지 않음)
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'storage', 'blobs')
+
+# 재부팅이나 정리 작업으로 지워질 수 있는 위치 (systemd PrivateTmp면 프로세스마다 다른 디렉터리이기도 함)
+VOLATILE_DIRECTORIES = ('/tmp', '/var/tmp', '/dev/shm', '/run')
+
+
+def is_volatile_path(path):
+    """임시 디렉터리 아래 경로인지"""
+    path = os.path.realpath(path)
+    roots = {os.path.realpath(tempfile.gettempdir())} | {os.path.realpath(root) for root in VOLATILE_DIRECTORIES}
+    return any(path == root or path.startswith(root + os.sep) for root in roots)
+
+
+class BlobStore:
+    """SHA-256 해시를 이름으로 하는 로컬 파일 저장소 (같은 내용은 한 번만 저장)
+
+    파일은 {directory}/{해시 앞 2자}/{해시 다음 2자}/{해시} 경로에 둔다.
+    쓰기는 임시 파일에 쓴 뒤 os.replace로 옮기므로 읽는 쪽이 쓰다 만 파일을 보지 않고,
+    같은 내용을 여러 워커가 동시에 저장해도 결과는 같은 파일 하나다.
+    서버가 여러 대면 공유 디렉터리(NFS 등)를 지정해야 한다.
+    사진 원본의 유일한 사본이 되므로 임시 디렉터리는 durable이 False가 된다 (DB 사본을 지우지 않음).
+    """
+
+    def __init__(self, directory=None):
+        self.directory = os.path.abspath(directory or DEFAULT_DIRECTORY)
+        self.durable = not is_volatile_path(self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, digest):
+        if len(digest) != 64 or any(c not in '0123456789abcdef' for c in digest):
+            raise ValueError(f"잘못된 해시: {digest}")
+        return os.path.join(self.directory, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, data):
+        """data를 저장하고 (해시, 새로 저장했는지) 반환"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest, False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return digest, True
+
+    def verify(self, digest):
+        """저장된 파일을 다시 읽어 내용이 해시와 같은지 확인"""
+        data = self.get(digest)
+        return data is not None and hashlib.sha256(data).hexdigest() == digest
+
+    def get(self, digest):
+        """저장된 바이트 (없으면 None)"""
+        try:
+            with open(self.path(digest), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
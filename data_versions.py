@@ -0,0 +1,49 @@
+import os
+import tempfile
+import uuid
+
+
+class DataVersions:
+    """데이터 종류(테이블)별 버전 - gunicorn 워커와 시뮬레이터가 함께 보도록 디렉터리의 파일로 공유
+
+    bump(name)은 파일을 새 내용으로 원자적으로 교체(os.replace)하므로 inode/mtime이 바뀌고,
+    get(name)은 os.stat만 호출해 (inode, mtime_ns)를 버전으로 돌려준다 (DB 조회 없음).
+    같은 서버의 프로세스끼리만 공유되므로 서버가 여러 대면 공유 디렉터리를 지정해야 한다.
+    """
+
+    def __init__(self, directory=None, names=()):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'manager_page_data_versions')
+        os.makedirs(self.directory, exist_ok=True)
+        for name in names:
+            if not os.path.exists(self._path(name)):
+                self.bump(name)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.version")
+
+    def bump(self, *names):
+        """데이터가 바뀌었음을 기록 (커밋 이후에 호출)"""
+        for name in names:
+            path = self._path(name)
+            tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}"
+            try:
+                with open(tmp_path, 'w') as f:
+                    f.write(uuid.uuid4().hex)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"[data-versions] {name} 버전 갱신 실패: {str(e)}")
+
+    def get(self, name):
+        """현재 버전 문자열 (파일이 없으면 새로 만든다)"""
+        try:
+            st = os.stat(self._path(name))
+        except FileNotFoundError:
+            self.bump(name)
+            try:
+                st = os.stat(self._path(name))
+            except OSError:
+                return 'missing'
+        return f"{st.st_ino:x}-{st.st_mtime_ns:x}"
+
+    def get_many(self, names):
+        return {name: self.get(name) for name in names}
@@ -0,0 +1,68 @@
+import threading
+
+from geo import haversine_m
+
+
+class DeviceState:
+    """기기 1대의 최근 텔레메트리 상태 (기기 수만큼 생성되므로 __slots__로 메모리 절약)"""
+
+    __slots__ = ('device_code', 'last_time', 'lat', 'lng', 'speed_kmh')
+
+    def __init__(self, device_code, last_time=None, lat=None, lng=None):
+        self.device_code = device_code
+        self.last_time = last_time
+        self.lat = lat
+        self.lng = lng
+        self.speed_kmh = None
+
+
+class DeviceStateTable:
+    """프로세스 메모리에 유지하는 기기별 상태 테이블
+
+    시작 시 DB에서 한 번 적재(load)하고, 실시간 로그 수신 때마다 갱신한다.
+    gunicorn 워커마다 별도의 테이블을 가지므로 다른 워커가 받은 로그는 반영되지 않는다.
+    속도/위치 표시용이며, 배터리 소모처럼 워커 간에 일치해야 하는 계산은 DB 값을 기준으로 한다.
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, device_code):
+        return device_code in self._states
+
+    def load(self, rows):
+        """(device_code, last_time, lat, lng) 행들로 상태를 채움 (기존 항목은 덮어씀)"""
+        with self._lock:
+            for device_code, last_time, lat, lng in rows:
+                self._states[device_code] = DeviceState(
+                    device_code,
+                    last_time,
+                    float(lat) if lat is not None else None,
+                    float(lng) if lng is not None else None
+                )
+
+    def get(self, device_code):
+        return self._states.get(device_code)
+
+    def apply_ping(self, device_code, ts, lat, lng):
+        """실시간 위치 반영 (이전 위치와의 거리/시간으로 속도 계산, 더 오래된 기록은 무시)"""
+        with self._lock:
+            state = self._states.get(device_code)
+            if state is None:
+                state = DeviceState(device_code)
+                self._states[device_code] = state
+            elif state.last_time is not None and ts < state.last_time:
+                return state
+
+            if state.last_time is not None and state.lat is not None and state.lng is not None:
+                seconds = (ts - state.last_time).total_seconds()
+                if seconds > 0:
+                    state.speed_kmh = haversine_m(state.lat, state.lng, lat, lng) / seconds * 3.6
+            state.last_time = ts
+            state.lat = lat
+            state.lng = lng
+            return state
@@ -0,0 +1,136 @@
+import json
+import os
+import queue
+import threading
+import time
+
+
+def format_sse(event, data, event_id=None):
+    """server-sent events 형식의 메시지 문자열 생성"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    lines.extend(f"data: {line}" for line in payload.splitlines() or [''])
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    """구독자 1명의 이벤트 큐 (filter_fn(event, data)가 None을 반환하면 그 이벤트는 받지 않음)"""
+
+    def __init__(self, filter_fn=None, max_queue=100):
+        self.filter_fn = filter_fn
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.closed = False
+
+    def offer(self, event, data):
+        if self.filter_fn is not None:
+            data = self.filter_fn(event, data)
+            if data is None:
+                return True
+        try:
+            self.queue.put_nowait((event, data))
+            return True
+        except queue.Full:
+            return False
+
+    def get(self, timeout):
+        """다음 이벤트 (timeout초 동안 없으면 None)"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """워커당 생산자 스레드 1개가 변경분을 만들고 모든 구독자에게 나눠주는 이벤트 허브
+
+    생산자 스레드는 구독자가 있을 때만 interval초마다 produce_fn()을 호출해 [(event, data), ...]를 받는다.
+    구독자 수와 관계없이 DB 조회는 워커당 한 번이며, 큐가 가득 찬 (느린) 구독자는 연결을 끊어
+    클라이언트가 재접속하면서 전체 상태를 다시 받게 한다.
+    """
+
+    def __init__(self, produce_fn, interval=1.0, max_queue=100, name='event-hub'):
+        self.produce_fn = produce_fn
+        self.interval = interval
+        self.max_queue = max_queue
+        self.name = name
+
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._sequence = 0
+        self._produce_errors = 0
+        self._last_produce_ms = None
+
+    # 생산자 스레드 시작 (fork 이후 자식 프로세스에서도 다시 시작되도록 pid 확인)
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                self._subscribers = set()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def subscribe(self, filter_fn=None):
+        self._ensure_started()
+        subscription = Subscription(filter_fn, self.max_queue)
+        with self._lock:
+            self._subscribers.add(subscription)
+        self._wakeup.set()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.closed = True
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event, data):
+        """모든 구독자에게 이벤트 전달, 전달 받지 못한 구독자는 연결 종료"""
+        with self._lock:
+            self._sequence += 1
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if not subscription.offer(event, data):
+                print(f"[{self.name}] 구독자 큐가 가득 차 연결 종료")
+                self.unsubscribe(subscription)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                has_subscribers = bool(self._subscribers)
+            if not has_subscribers:
+                # 구독자가 없으면 DB를 조회하지 않고 대기
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            started = time.monotonic()
+            try:
+                for event, data in self.produce_fn():
+                    self.publish(event, data)
+            except Exception as e:
+                self._produce_errors += 1
+                print(f"[{self.name}] 이벤트 생성 오류: {str(e)}")
+            elapsed = time.monotonic() - started
+            self._last_produce_ms = elapsed * 1000
+            time.sleep(max(self.interval - elapsed, 0.05))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self._sequence,
+                'produce_errors': self._produce_errors,
+                'last_produce_ms': round(self._last_produce_ms, 2) if self._last_produce_ms is not None else None,
+                'running': self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+            }
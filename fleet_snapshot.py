@@ -0,0 +1,119 @@
+import math
+import struct
+
+import numpy as np
+
+# 지도용 기기 스냅샷 바이너리 형식 (열 단위, little-endian)
+#
+#   헤더 24바이트: magic 'FLT1', version u8, flags u8 (bit0: truncated), 예약 u16,
+#                  기기 수 u32, removed 수 u32, 기준 시각 f64 (epoch 초)
+#   문자열 표 5개: cursor, 기기 코드, 기기 종류 사전, 사용자 사전, removed 기기 코드
+#                  (각각 항목 수 u32, 바이트 수 u32, '\0'으로 이은 UTF-8)
+#   4바이트 정렬 후 열: 위도 i32, 경도 i32 (x 1e6, 없으면 INT32_MIN), 갱신 시각 i32 (기준 시각 기준 초),
+#                       사용자 번호 u32 (없으면 0xFFFFFFFF), 종류 번호 u16, 배터리 u8 (없으면 255), 사용 중 u8
+#
+# 브라우저에서는 static/js/fleet_snapshot.js의 decodeFleetSnapshot()으로 TypedArray 그대로 읽는다.
+
+FORMAT_MAGIC = b'FLT1'
+FORMAT_VERSION = 1
+MIME_TYPE = 'application/x-fleet-snapshot'
+
+FLAG_TRUNCATED = 1
+NULL_COORD = -2 ** 31
+NULL_TIME = -2 ** 31
+NO_USER = 0xFFFFFFFF
+NO_BATTERY = 255
+
+_HEADER = struct.Struct('<4sBBHIId')
+_TABLE_HEADER = struct.Struct('<II')
+
+
+def _pack_table(strings):
+    blob = '\0'.join(strings).encode('utf-8')
+    return _TABLE_HEADER.pack(len(strings), len(blob)) + blob
+
+
+def _unpack_table(data, offset):
+    count, size = _TABLE_HEADER.unpack_from(data, offset)
+    offset += _TABLE_HEADER.size
+    strings = bytes(data[offset:offset + size]).decode('utf-8').split('\0') if count else []
+    return strings, offset + size
+
+
+def encode_fleet_snapshot(rows, cursor='', removed=(), truncated=False, default_type='킥보드'):
+    """기기 행 목록을 바이너리 스냅샷으로 변환
+
+    rows: (DEVICE_CODE, device_type, latitude, longitude, battery_level, is_used, last_updated, current_user_id)
+    순서의 튜플 목록 (WEB_DEVICES_SQL 컬럼 순서), 기기별 dict를 만들지 않고 열 배열로 바로 채운다.
+    """
+    count = len(rows)
+    if count:
+        codes, types, lats, lngs, batteries, used, updated, users = zip(*rows)
+    else:
+        codes = types = lats = lngs = batteries = used = updated = users = ()
+
+    lat = np.fromiter((NULL_COORD if v is None else round(float(v) * 1e6) for v in lats), dtype='<i4', count=count)
+    lng = np.fromiter((NULL_COORD if v is None else round(float(v) * 1e6) for v in lngs), dtype='<i4', count=count)
+    battery = np.fromiter((NO_BATTERY if v is None else min(max(int(v), 0), 100) for v in batteries),
+                          dtype='u1', count=count)
+    is_used = np.fromiter((1 if v == 1 else 0 for v in used), dtype='u1', count=count)
+
+    timestamps = [None if v is None else v.timestamp() for v in updated]
+    known = [v for v in timestamps if v is not None]
+    base_time = float(math.floor(min(known))) if known else 0.0
+    updated_offset = np.fromiter((NULL_TIME if v is None else int(v - base_time) for v in timestamps),
+                                 dtype='<i4', count=count)
+
+    # 기기 종류와 사용자는 사전 번호로 저장 (반복되는 문자열 제거)
+    type_table = {}
+    type_index = np.fromiter((type_table.setdefault(v or default_type, len(type_table)) for v in types),
+                             dtype='<u2', count=count)
+    user_table = {}
+    user_index = np.fromiter((NO_USER if v is None else user_table.setdefault(v, len(user_table)) for v in users),
+                             dtype='<u4', count=count)
+
+    flags = FLAG_TRUNCATED if truncated else 0
+    parts = [
+        _HEADER.pack(FORMAT_MAGIC, FORMAT_VERSION, flags, 0, count, len(removed), base_time),
+        _pack_table([cursor] if cursor else []),
+        _pack_table(codes),
+        _pack_table(list(type_table)),
+        _pack_table(list(user_table)),
+        _pack_table(list(removed))
+    ]
+    size = sum(len(p) for p in parts)
+    parts.append(b'\0' * (-size % 4))
+    parts.extend(column.tobytes() for column in (lat, lng, updated_offset, user_index, type_index, battery, is_used))
+    return b''.join(parts)
+
+
+def decode_fleet_snapshot(data):
+    """encode_fleet_snapshot 결과를 열 배열 dict로 변환 (검증/벤치마크용, 브라우저는 JS 디코더 사용)"""
+    magic, version, flags, _, count, removed_count, base_time = _HEADER.unpack_from(data, 0)
+    if magic != FORMAT_MAGIC or version != FORMAT_VERSION:
+        raise ValueError('지원하지 않는 스냅샷 형식입니다.')
+    offset = _HEADER.size
+    cursor, offset = _unpack_table(data, offset)
+    codes, offset = _unpack_table(data, offset)
+    type_table, offset = _unpack_table(data, offset)
+    user_table, offset = _unpack_table(data, offset)
+    removed, offset = _unpack_table(data, offset)
+    offset += -offset % 4
+
+    columns = {}
+    for name, dtype in (('lat', '<i4'), ('lng', '<i4'), ('updated', '<i4'), ('user', '<u4'),
+                        ('type', '<u2'), ('battery', 'u1'), ('is_used', 'u1')):
+        column = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        columns[name] = column
+        offset += column.nbytes
+
+    return {
+        'cursor': cursor[0] if cursor else None,
+        'truncated': bool(flags & FLAG_TRUNCATED),
+        'base_time': base_time,
+        'codes': codes,
+        'types': type_table,
+        'users': user_table,
+        'removed': removed,
+        **columns
+    }
@@ -0,0 +1,18 @@
+import sys
+
+# gunicorn 설정 (작업 디렉터리의 이 파일을 gunicorn이 자동으로 읽음, 명령행 옵션이 우선)
+
+
+def post_worker_init(worker):
+    """워커가 app을 불러온 직후 메모리 상태 적재 (첫 요청이 적재를 기다리지 않도록)"""
+    module = sys.modules.get('app')
+    if module is not None:
+        module.warm_in_memory_state()
+
+
+def worker_exit(server, worker):
+    """워커 종료(kill -HUP 재시작 포함) 시 write-behind 큐에 남은 실시간 로그 저장"""
+    module = sys.modules.get('app')
+    queue = getattr(module, 'realtime_write_behind', None)
+    if queue is not None:
+        queue.stop()
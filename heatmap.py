@@ -0,0 +1,111 @@
+import math
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+from spatial_index import METERS_PER_DEGREE
+
+# 실시간 위치 로그(device_realtime_log) 격자 히트맵
+#
+# 기간을 시간 구간(slice)으로 나눠 구간마다 서버 커서로 chunk_size행씩 읽고,
+# 청크마다 격자 칸 번호를 계산해 np.unique로 칸별 개수를 센 뒤 누적 (칸 번호, 개수) 배열과 합친다.
+# 메모리는 청크 크기 + 점이 있는 칸 수에만 비례하므로 기간 안의 로그 수와 관계없다.
+
+# 칸 번호 = (행 + 오프셋) * 폭 + (열 + 오프셋), 50m 칸이어도 전 지구 범위가 int64 안에 들어감
+CELL_OFFSET = 1 << 22
+CELL_SPAN = 1 << 23
+
+
+class HeatmapGrid:
+    """cell_m 미터 격자 (경도 방향 칸 크기는 ref_lat 기준, spatial_index.GridIndex와 같은 방식)"""
+
+    def __init__(self, cell_m=250.0, ref_lat=37.5):
+        self.cell_m = cell_m
+        self.lat_step = cell_m / METERS_PER_DEGREE
+        self.lng_step = self.lat_step / math.cos(math.radians(ref_lat))
+
+    def cell_ids(self, lat, lng):
+        rows = np.floor(lat / self.lat_step).astype(np.int64)
+        cols = np.floor(lng / self.lng_step).astype(np.int64)
+        return (rows + CELL_OFFSET) * CELL_SPAN + (cols + CELL_OFFSET)
+
+    def cell_centers(self, ids):
+        """칸 번호 -> (칸 중심 위도, 칸 중심 경도) 배열"""
+        rows = ids // CELL_SPAN - CELL_OFFSET
+        cols = ids % CELL_SPAN - CELL_OFFSET
+        return (rows + 0.5) * self.lat_step, (cols + 0.5) * self.lng_step
+
+    def bin(self, lat, lng):
+        """점 배열을 칸별 개수로 집계, (정렬된 칸 번호, 개수) 반환"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        valid = np.isfinite(lat) & np.isfinite(lng)
+        if not valid.all():
+            lat = lat[valid]
+            lng = lng[valid]
+        return np.unique(self.cell_ids(lat, lng), return_counts=True)
+
+
+def merge_counts(ids_a, counts_a, ids_b, counts_b):
+    """(칸 번호, 개수) 두 쌍을 합침"""
+    if len(ids_a) == 0:
+        return ids_b, counts_b
+    if len(ids_b) == 0:
+        return ids_a, counts_a
+    ids, inverse = np.unique(np.concatenate((ids_a, ids_b)), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate((counts_a, counts_b)), minlength=len(ids))
+    return ids, counts.astype(np.int64)
+
+
+def build_ping_heatmap(session, start, end, cell_m, chunk_size=50000, slice_seconds=6 * 3600, max_cells=20000):
+    """[start, end) 실시간 로그의 격자별 점 개수
+
+    반환값: {'points', 'cells': [[위도, 경도, 개수], ...] (개수 많은 순), 'cell_count', 'max_count', 'truncated'}
+    """
+    grid = HeatmapGrid(cell_m)
+    ids = np.empty(0, dtype=np.int64)
+    counts = np.empty(0, dtype=np.int64)
+    points = 0
+
+    sql = text("""
+        SELECT ST_X(location), ST_Y(location)
+        FROM device_realtime_log
+        WHERE now_time >= :start AND now_time < :end
+    """)
+    slice_start = start
+    while slice_start < end:
+        slice_end = min(slice_start + timedelta(seconds=slice_seconds), end)
+        result = session.execute(
+            sql.execution_options(stream_results=True, max_row_buffer=chunk_size),
+            {'start': slice_start, 'end': slice_end}
+        )
+        for rows in result.partitions(chunk_size):
+            chunk = np.asarray(rows, dtype=np.float64).reshape(-1, 2)
+            chunk_ids, chunk_counts = grid.bin(chunk[:, 0], chunk[:, 1])
+            ids, counts = merge_counts(ids, counts, chunk_ids, chunk_counts)
+            points += len(chunk)
+        slice_start = slice_end
+
+    cell_count = len(ids)
+    truncated = cell_count > max_cells
+    if truncated:
+        # 점이 많은 칸부터 max_cells개만
+        top = np.argpartition(counts, -max_cells)[-max_cells:]
+        ids = ids[top]
+        counts = counts[top]
+    order = np.argsort(counts, kind='stable')[::-1]
+    ids = ids[order]
+    counts = counts[order]
+    lat, lng = grid.cell_centers(ids)
+
+    return {
+        'points': points,
+        'cells': [
+            [round(float(a), 6), round(float(b), 6), int(c)]
+            for a, b, c in zip(lat, lng, counts)
+        ],
+        'cell_count': cell_count,
+        'max_count': int(counts[0]) if len(counts) else 0,
+        'truncated': truncated
+    }
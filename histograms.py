@@ -0,0 +1,140 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+# 배터리/나이 분포 히스토그램 (통계 화면용)
+#
+# 기기별 배터리, 회원별 나이를 키 -> 위치 사전 + uint8 배열로 들고 있다가
+# np.bincount로 값(0~254)별 개수를 한 번 세고, 요청한 구간 폭에 맞춰 np.add.reduceat으로 묶는다.
+# 구간 폭을 바꿔도 SQL을 새로 만들 필요가 없고, 계산 비용은 행 수 + 값 종류(256)에만 비례한다.
+
+# 값이 없는 행 (배터리 미설정, 나이 미입력, 삭제된 회원)
+NULL_VALUE = 255
+MAX_VALUE = NULL_VALUE - 1
+
+
+class ValueColumn:
+    """키별 0~254 정수 값 열 (uint8 배열, 없는 값은 NULL_VALUE)"""
+
+    def __init__(self, name, capacity=1024):
+        self.name = name
+        self._positions = {}   # key -> 배열 위치
+        self._keys = []        # 배열 위치 -> key
+        self._values = np.full(capacity, NULL_VALUE, dtype=np.uint8)
+        self._lock = threading.Lock()
+        self.built_at = None
+        self.version = None
+
+    def __len__(self):
+        return len(self._positions)
+
+    @staticmethod
+    def _to_value(value):
+        if value is None:
+            return NULL_VALUE
+        value = float(value)
+        if math.isnan(value):
+            return NULL_VALUE
+        return int(min(max(round(value), 0), MAX_VALUE))
+
+    def rebuild(self, keys, values, version=None):
+        """전체 값을 새로 채움 (DB 조회 결과로 주기적으로 호출)"""
+        keys = list(keys)
+        positions = {key: i for i, key in enumerate(keys)}
+        array = np.full(max(len(positions), 1024), NULL_VALUE, dtype=np.uint8)
+        for i, value in enumerate(values):
+            array[i] = self._to_value(value)
+        with self._lock:
+            self._positions = positions
+            self._keys = keys
+            self._values = array
+            self.built_at = time.monotonic()
+            self.version = version
+
+    def set(self, key, value):
+        """한 키의 값 갱신 (없는 키는 추가, value가 None이면 값 없음으로 표시)"""
+        value = self._to_value(value)
+        with self._lock:
+            pos = self._positions.get(key)
+            if pos is None:
+                pos = len(self._positions)
+                if pos >= len(self._values):
+                    grown = np.full(len(self._values) * 2, NULL_VALUE, dtype=np.uint8)
+                    grown[:len(self._values)] = self._values
+                    self._values = grown
+                self._positions[key] = pos
+                self._keys.append(key)
+            self._values[pos] = value
+
+    def remove(self, key):
+        """한 키를 열에서 뺌 (마지막 위치의 값을 빈 자리로 옮김)"""
+        with self._lock:
+            pos = self._positions.pop(key, None)
+            if pos is None:
+                return
+            last = len(self._keys) - 1
+            if pos != last:
+                moved = self._keys[last]
+                self._keys[pos] = moved
+                self._positions[moved] = pos
+                self._values[pos] = self._values[last]
+            self._keys.pop()
+            self._values[last] = NULL_VALUE
+
+    def age(self):
+        return None if self.built_at is None else time.monotonic() - self.built_at
+
+    def value_counts(self):
+        """값(0~254)별 개수 배열과 값 없는 행 수"""
+        with self._lock:
+            values = self._values[:len(self._positions)].copy()
+        counts = np.bincount(values, minlength=NULL_VALUE + 1)
+        return counts[:NULL_VALUE], int(counts[NULL_VALUE])
+
+
+def bin_value_counts(value_counts, edges):
+    """값별 개수를 edges 구간([edges[i], edges[i+1]))으로 묶음, 마지막 구간은 나머지 값 전체"""
+    starts = np.asarray(edges, dtype=np.int64)
+    return np.add.reduceat(value_counts, starts)
+
+
+def battery_histogram(column, width=10, max_level=100):
+    """배터리 구간별 기기 수 [{'battery_range': '0-9%', 'count': n}, ...] (100% 이상은 마지막 구간에 포함)"""
+    value_counts, missing = column.value_counts()
+    over = int(value_counts[max_level + 1:].sum())
+    value_counts = value_counts[:max_level + 1].copy()
+    value_counts[max_level] += over   # 잘못 보고된 100% 초과 값도 기기 수에서 빠지지 않도록
+    edges = list(range(0, max_level + 1, width))
+    if len(edges) > 1 and edges[-1] == max_level:
+        edges.pop()   # 100%만 담긴 구간은 만들지 않음
+    counts = bin_value_counts(value_counts, edges)
+    bins = []
+    for i, lo in enumerate(edges):
+        hi = edges[i + 1] - 1 if i + 1 < len(edges) else max_level
+        bins.append({'battery_range': f"{lo}-{hi}%", 'count': int(counts[i])})
+    return bins, missing
+
+
+def age_histogram(column, width=10, min_age=20, max_age=70):
+    """나이대별 회원 수 [{'age_group': '20대', 'count': n}, ...]
+
+    min_age 미만, max_age 이상은 한 구간으로 묶는다. 10살 단위면 '10대' ~ '70대 이상', 아니면 '20-24세' 형식.
+    """
+    value_counts, missing = column.value_counts()
+    edges = [0] + list(range(min_age, max_age, width)) + [max_age]
+    counts = bin_value_counts(value_counts, edges)
+    decades = width == 10 and min_age % 10 == 0 and max_age % 10 == 0
+
+    bins = []
+    for i, lo in enumerate(edges):
+        if i == 0:
+            label = f"{min_age - 10}대" if decades else f"{min_age}세 미만"
+        elif i == len(edges) - 1:
+            label = f"{max_age}대 이상" if decades else f"{max_age}세 이상"
+        else:
+            hi = edges[i + 1]
+            label = f"{lo}대" if decades else f"{lo}-{hi - 1}세"
+        bins.append({'age_group': label, 'count': int(counts[i])})
+    return bins, missing
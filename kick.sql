@@ -43,15 +43,85 @@ CREATE TABLE device_use_log (
 );
 
 -- 실시간 기기 사용 로그 수집 테이블
+-- 일 단위 RANGE 파티션 (분할 테이블은 외래키를 가질 수 없어 FK 대신 인덱스만 둠)
+-- 파티션 생성/보존 기간 관리/과거 데이터 이관은 realtime_log_maintenance.py 참고
 CREATE TABLE device_realtime_log (
+    id BIGINT NOT NULL AUTO_INCREMENT,
     DEVICE_CODE VARCHAR(50) NOT NULL,
     USER_ID varchar(50) NOT NULL,
     location POINT NOT NULL,
     now_time DATETIME NOT NULL,
-	FOREIGN KEY (USER_ID) REFERENCES device_use_log(USER_ID),
-    FOREIGN KEY (DEVICE_CODE) REFERENCES device_use_log(DEVICE_CODE)
+    PRIMARY KEY (id, now_time),
+    KEY idx_realtime_device_time (DEVICE_CODE, now_time),   -- 기기별 주행 경로, 대여 종료
+    KEY idx_realtime_user_time (USER_ID, now_time),         -- 사용자별 주행 경로
+    KEY idx_realtime_time (now_time)                        -- 신고 대상 탐색(find_closest_user) 시간 범위
+)
+PARTITION BY RANGE (TO_DAYS(now_time)) (
+    PARTITION p_initial VALUES LESS THAN (TO_DAYS('2025-01-01')),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
 );
 
+-- 주행별 축소 궤적 테이블 (원본 실시간 로그가 보존 기간을 지나 삭제된 뒤에도 경로 재생/분석용으로 유지)
+CREATE TABLE ride_trajectory (
+    USE_LOG_ID INT NOT NULL,
+    DEVICE_CODE VARCHAR(50) NOT NULL,
+    USER_ID VARCHAR(50),
+    start_time DATETIME,
+    end_time DATETIME,
+    method VARCHAR(20) NOT NULL,            -- downsample: 시간 간격 축소, douglas_peucker: 허용 오차 기반 축소
+    tolerance DOUBLE,                       -- downsample은 초, douglas_peucker는 미터 단위
+    raw_point_count INT NOT NULL,
+    point_count INT NOT NULL,
+    polyline MEDIUMTEXT NOT NULL,           -- encoded polyline (정밀도 1e-6, 위도/경도 순)
+    time_offsets MEDIUMTEXT NOT NULL,       -- start_time 기준 초 단위 오프셋 (차분 인코딩)
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (USE_LOG_ID),
+    KEY idx_trajectory_device_time (DEVICE_CODE, start_time),
+    FOREIGN KEY (USE_LOG_ID) REFERENCES device_use_log(id)
+);
+
+-- 기기별 마지막 위치 테이블 (실시간 로그 수신 시마다 갱신, 기기당 1행)
+CREATE TABLE device_latest_position (
+    DEVICE_CODE VARCHAR(50) NOT NULL,
+    USER_ID VARCHAR(50),
+    location POINT NOT NULL,
+    now_time DATETIME NOT NULL,
+    PRIMARY KEY (DEVICE_CODE),
+    FOREIGN KEY (DEVICE_CODE) REFERENCES device_info(DEVICE_CODE)
+);
+
+-- 기존 실시간 로그로부터 마지막 위치 채우기 (기존 DB에 테이블을 추가할 때 1회 실행)
+INSERT INTO device_latest_position (DEVICE_CODE, USER_ID, location, now_time)
+SELECT DEVICE_CODE, USER_ID, location, now_time
+FROM (
+    SELECT DEVICE_CODE, USER_ID, location, now_time,
+           ROW_NUMBER() OVER (PARTITION BY DEVICE_CODE ORDER BY now_time DESC) AS rn
+    FROM device_realtime_log
+) latest
+WHERE rn = 1;
+
+-- 실시간 로그가 없는 기기도 등록 위치로 1행씩 채움 (지도 영역 조회가 이 테이블만 보도록)
+-- 기기를 새로 등록할 때도 device_latest_position에 같은 위치로 1행을 함께 넣어야 지도에 표시됨
+INSERT INTO device_latest_position (DEVICE_CODE, USER_ID, location, now_time)
+SELECT d.DEVICE_CODE, NULL, d.location, d.created_at
+FROM device_info d
+LEFT JOIN device_latest_position p ON p.DEVICE_CODE = d.DEVICE_CODE
+WHERE p.DEVICE_CODE IS NULL AND d.location IS NOT NULL;
+
+-- 지도 영역(bbox) 조회용 공간 인덱스 (SPATIAL INDEX는 NOT NULL + SRID가 지정된 컬럼에만 만들 수 있음)
+ALTER TABLE device_latest_position
+    MODIFY location POINT NOT NULL SRID 4326,
+    ADD SPATIAL INDEX sidx_latest_location (location);
+
+-- 변경분 조회(since 커서)용 갱신 시각 (값이 실제로 바뀐 UPDATE/ON DUPLICATE KEY UPDATE마다 DB가 자동 갱신)
+-- device_info: 배터리/사용 상태 변경, device_latest_position: 위치 변경
+ALTER TABLE device_info
+    ADD COLUMN updated_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_device_updated (updated_at);
+ALTER TABLE device_latest_position
+    ADD COLUMN updated_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_latest_updated (updated_at);
+
 -- 신고 기록 테이블 (REPORT_LOG)
 CREATE TABLE report_log (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -74,4 +144,75 @@ CREATE TABLE manager_info (
     manager_pw VARCHAR(255) NOT NULL,
     position VARCHAR(50) NOT NULL,
     PRIMARY KEY (manager_id)
-);
\ No newline at end of file
+);
+-- 대시보드 KPI 카운터 (대여 시작/종료, 배터리 부족 진입, 신고 접수/처리, 회원 가입/탈퇴 시 같은 트랜잭션에서 증감)
+-- 값은 앱이 주기적으로 실제 COUNT와 맞추므로 처음에는 비어 있어도 됨
+CREATE TABLE kpi_counter (
+    name VARCHAR(32) PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)
+);
+-- 주행/매출/신고 시간대별 집계 (granularity: hour/day, region: 지역 이름 또는 '전체')
+-- 대여 종료/신고 접수 시 앱이 증가시키고, rollup_maintenance.py가 원본 테이블에서 하루 단위로 다시 계산
+CREATE TABLE ride_rollup (
+    granularity ENUM('hour', 'day') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    region VARCHAR(20) NOT NULL,
+    ride_count INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    distance_m BIGINT NOT NULL DEFAULT 0,
+    active_users INT NOT NULL DEFAULT 0,
+    report_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, region),
+    KEY idx_rollup_bucket (bucket_start)
+);
+
+-- 구간별 활성 사용자 (ride_rollup.active_users 중복 없이 세기용)
+CREATE TABLE ride_rollup_user (
+    granularity ENUM('hour', 'day') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    region VARCHAR(20) NOT NULL,
+    USER_ID VARCHAR(50) NOT NULL,
+    PRIMARY KEY (granularity, bucket_start, region, USER_ID),
+    KEY idx_rollup_user_bucket (bucket_start)
+);
+
+-- 하루 단위 집계 재계산용 인덱스
+ALTER TABLE device_use_log ADD INDEX idx_use_log_end_time (end_time);
+ALTER TABLE report_log ADD INDEX idx_report_time (report_time);
+
+-- 기기 지역 (data/regions.geojson 경계 기준, 위치가 바뀔 때 앱이 저장), 지역별 통계는 이 컬럼으로 GROUP BY
+-- 기존 기기는 앱이 통계 조회 시 비어 있는 행부터 채움
+ALTER TABLE device_info
+    ADD COLUMN region VARCHAR(20) NULL,
+    ADD INDEX idx_device_region (region);
+
+-- 신고 목록 상태 필터 + 최신순(id) 키셋 페이지네이션용 인덱스
+ALTER TABLE report_log ADD INDEX idx_report_status_id (is_verified, id);
+
+-- 신고 사진 파일 저장소 이관 (사진 바이트는 BLOB_STORE_DIR의 SHA-256 이름 파일, DB에는 해시와 크기만)
+-- 기존 image 컬럼은 report_image_migration.py로 이관한 뒤 비워짐 (읽을 수 없는 값만 남음)
+ALTER TABLE report_log
+    ADD COLUMN image_sha256 CHAR(64) NULL,
+    ADD COLUMN image_width INT NULL,
+    ADD COLUMN image_height INT NULL;
+
+-- 신고 대상 비동기 추정 (접수 시 pending으로 저장, 백그라운드 스레드가 REPORTED_USER_ID/REPORTED_DEVICE_CODE를 채움)
+-- 기존 신고는 접수 시 이미 추정했으므로 resolved
+ALTER TABLE report_log
+    ADD COLUMN attribution_status VARCHAR(16) NOT NULL DEFAULT 'resolved',
+    ADD COLUMN attribution_attempts INT NOT NULL DEFAULT 0,
+    ADD COLUMN attribution_updated_at DATETIME NULL,
+    ADD COLUMN attribution_candidates JSON NULL,
+    ADD INDEX idx_report_attribution (attribution_status, attribution_updated_at);
+
+-- 신고 목록의 사진 유무 (목록 조회가 LONGTEXT image 컬럼을 읽지 않도록 접수 시 저장)
+ALTER TABLE report_log ADD COLUMN has_image TINYINT(1) NOT NULL DEFAULT 0;
+UPDATE report_log SET has_image = 1 WHERE image_sha256 IS NOT NULL OR image IS NOT NULL;
+
+-- 실시간 로그 배터리 소모를 반영한 마지막 기록 시각 (배터리 UPDATE가 잠근 행의 이 값 이후 구간만 소모)
+-- 기존 기기는 마지막 위치 시각으로 채움
+ALTER TABLE device_info ADD COLUMN battery_drained_until DATETIME(6) NULL;
+UPDATE device_info d
+JOIN device_latest_position p ON p.DEVICE_CODE = d.DEVICE_CODE
+SET d.battery_drained_until = p.now_time;
@@ -0,0 +1,80 @@
+from sqlalchemy import text, bindparam
+
+# 대시보드 KPI 카운터 (kpi_counter 테이블, 이름별 한 행)
+#
+# 각 쓰기 API가 같은 트랜잭션 안에서 adjust_kpi()로 증감하고, 조회는 read_kpi()로 6행만 읽는다.
+# reconcile_kpi()가 주기적으로 실제 COUNT와 맞춰 누락/중복 반영을 바로잡는다.
+
+KPI_NAMES = (
+    'total_devices',
+    'available_devices',
+    'low_battery_devices',
+    'pending_reports',
+    'total_users',
+    'total_reports'
+)
+
+# 카운터별 실제 값 (정합성 맞추기용, 통계 API와 같은 조건)
+KPI_COUNT_SQL = {
+    'total_devices': "SELECT COUNT(*) FROM device_info",
+    'available_devices': "SELECT COUNT(*) FROM device_info WHERE is_used = 0",
+    'low_battery_devices': "SELECT COUNT(*) FROM device_info WHERE battery_level <= :low_battery_level",
+    'pending_reports': "SELECT COUNT(*) FROM report_log WHERE is_verified = 0",
+    'total_users': "SELECT COUNT(*) FROM user_info WHERE is_delete = 0",
+    'total_reports': "SELECT COUNT(*) FROM report_log"
+}
+
+
+def adjust_kpi(session, **deltas):
+    """카운터 증감 (커밋은 호출하는 쪽에서, 행 잠금 시간을 줄이도록 커밋 직전에 호출)"""
+    deltas = {name: int(delta) for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    unknown = set(deltas) - set(KPI_NAMES)
+    if unknown:
+        raise ValueError(f"알 수 없는 KPI: {', '.join(sorted(unknown))}")
+
+    case_sql = []
+    params = {}
+    for i, (name, delta) in enumerate(sorted(deltas.items())):
+        case_sql.append(f"WHEN :name_{i} THEN :delta_{i}")
+        params[f'name_{i}'] = name
+        params[f'delta_{i}'] = delta
+    params['names'] = sorted(deltas)
+    sql = text(
+        "UPDATE kpi_counter SET value = value + CASE name "
+        + " ".join(case_sql)
+        + " ELSE 0 END WHERE name IN :names"
+    ).bindparams(bindparam('names', expanding=True))
+    session.execute(sql, params)
+
+
+def read_kpi(session):
+    """카운터 값 dict (아직 없는 카운터는 빠짐)"""
+    rows = session.execute(text("SELECT name, value FROM kpi_counter")).all()
+    return {name: int(value) for name, value in rows if name in KPI_NAMES}
+
+
+def reconcile_kpi(session, low_battery_level=20):
+    """카운터를 실제 COUNT 값으로 덮어쓰고 {이름: (이전 값, 실제 값)} 중 차이가 난 항목 반환 (커밋은 호출하는 쪽에서)
+
+    카운터 행을 먼저 FOR UPDATE로 잠근 뒤 COUNT를 읽으므로, 진행 중이던 쓰기 트랜잭션은
+    이미 커밋되어 COUNT에 포함되거나 잠금이 풀린 뒤 증감하게 되어 이중 반영되지 않는다.
+    """
+    session.execute(text(
+        "INSERT IGNORE INTO kpi_counter (name, value) VALUES "
+        + ", ".join(f"('{name}', 0)" for name in KPI_NAMES)
+    ))
+    before = {
+        name: int(value)
+        for name, value in session.execute(text("SELECT name, value FROM kpi_counter FOR UPDATE")).all()
+    }
+
+    actual = {}
+    for name in KPI_NAMES:
+        actual[name] = int(session.execute(text(KPI_COUNT_SQL[name]), {'low_battery_level': low_battery_level}).scalar() or 0)
+
+    drift = {name: (before.get(name), value) for name, value in actual.items() if before.get(name) != value}
+    for name, (_, value) in drift.items():
+        session.execute(text("UPDATE kpi_counter SET value = :value WHERE name = :name"), {'name': name, 'value': value})
+    return drift
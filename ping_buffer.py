@@ -0,0 +1,265 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from geo import haversine_m
+from spatial_index import METERS_PER_DEGREE
+
+
+class RecentPingBuffer:
+    """최근 window_seconds초 동안의 실시간 위치를 시간 구간 x 격자 칸으로 묶어 두는 링 버퍼
+
+    실시간 로그는 어느 워커에서든 저장될 수 있으므로 직접 넣지 않고, 백그라운드 스레드가
+    fetch_fn으로 device_realtime_log를 id 순서로 이어 읽어(tail) 채운다.
+    스레드는 ensure_started()가 처음 불릴 때 시작하고, idle_seconds초 동안 다시 불리지 않으면
+    버퍼를 비우고 멈춘다 (신고가 없는 워커가 계속 DB를 읽지 않도록).
+
+    먼저 커밋된 큰 id 뒤에 늦게 커밋된 작은 id를 놓치지 않도록, 매 tail마다 position_fn으로 읽은
+    (DB 시각, MAX(id))를 기록해 두고 "아직 열려 있는 가장 오래된 쓰기 트랜잭션의 시작 시각(horizon)
+    이전에 기록된 MAX(id)"부터 겹쳐 읽는다 (id로 중복을 거름). 그 id까지는 horizon 전에 발급되었고
+    horizon 전에 시작한 트랜잭션은 모두 끝났으므로 빠짐없이 읽은 상태가 된다.
+    열린 트랜잭션이 없으면 직전 tail의 MAX(id)부터 읽어 겹치지 않는다.
+    horizon을 알 수 없거나 max_overlap_seconds보다 오래 열린 트랜잭션이 있으면 max_overlap_seconds 전
+    기록을 기준으로 하므로, 그보다 오래 열려 있다가 커밋된 쓰기 트랜잭션의 로그는 놓칠 수 있다.
+
+    fetch_fn(after_id, since_time, limit) -> [(id, device_code, user_id, lat, lng, now_time), ...] (id 오름차순)
+    position_fn() -> (DB 현재 시각, horizon 또는 None(알 수 없음), 테이블의 현재 MAX(id))
+    MAX(id)가 읽은 최대 id보다 작아지면(테이블 교체 등으로 id가 다시 시작됨) 버퍼를 비우고 window_seconds만큼 다시 적재한다.
+    position_fn이 없으면 이 프로세스 시계와 읽은 최대 id로 max_overlap_seconds만큼 겹쳐 읽는다.
+    """
+
+    def __init__(self, fetch_fn, position_fn=None, window_seconds=900, slice_seconds=60, cell_size_m=250.0,
+                 tail_interval=1.0, max_overlap_seconds=60.0, fetch_limit=5000, idle_seconds=600.0,
+                 name='recent-pings'):
+        self.fetch_fn = fetch_fn
+        self.position_fn = position_fn
+        self.window_seconds = window_seconds
+        self.slice_seconds = slice_seconds
+        self.cell_size_m = cell_size_m
+        self.tail_interval = tail_interval
+        self.max_overlap_seconds = max_overlap_seconds
+        self.fetch_limit = fetch_limit
+        self.idle_seconds = idle_seconds
+        self.name = name
+
+        self.lat_step = cell_size_m / METERS_PER_DEGREE
+        # 현재 구간을 쓰는 동안에도 window 전체를 보존하도록 한 칸 여유
+        self._slot_count = int(math.ceil(window_seconds / slice_seconds)) + 1
+        self._slots = [None] * self._slot_count   # [slice_id, {cell: [ping, ...]}, set(id)]
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self._watermark = None      # 읽은 최대 id
+        self._safe_id = None        # 이 id까지는 빠짐없이 읽음 (다음 tail은 이 id 다음부터)
+        self._id_marks = deque()    # (DB 시각, 그 시각의 MAX(id)) - 오래된 순
+        self._ready_since = None    # 이 시각 이후 로그는 빠짐없이 보유
+        self._last_tail_at = None   # 마지막으로 tail에 성공한 시각 (monotonic)
+        self._last_used_at = None   # 마지막 ensure_started() 호출 시각 (monotonic)
+        self._ping_count = 0
+        self._tail_errors = 0
+
+    # 백그라운드 스레드 시작 (fork 이후 자식 프로세스에서도 다시 시작되도록 pid 확인)
+    def ensure_started(self):
+        # 유휴 종료 판단과 겹치지 않도록 항상 _start_lock 안에서 확인 (신고 처리 때만 호출됨)
+        with self._start_lock:
+            self._last_used_at = time.monotonic()
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # 부모 프로세스에서 채운 내용은 이어받지 않고 새로 적재
+                self._reset()
+            self._stop_event.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _reset(self):
+        with self._lock:
+            self._slots = [None] * self._slot_count
+            self._watermark = None
+            self._safe_id = None
+            self._id_marks.clear()
+            self._ready_since = None
+            self._last_tail_at = None
+            self._ping_count = 0
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._start_lock:
+                if time.monotonic() - self._last_used_at > self.idle_seconds:
+                    # 멈춘 뒤에는 버퍼가 낡으므로 비우고, 다음 ensure_started()에서 새로 적재
+                    self._thread = None
+                    self._reset()
+                    print(f"[{self.name}] {self.idle_seconds:.0f}초 동안 사용하지 않아 중지")
+                    return
+            try:
+                self.tail()
+            except Exception as e:
+                self._tail_errors += 1
+                print(f"[{self.name}] 실시간 로그 읽기 오류: {str(e)}")
+            self._stop_event.wait(self.tail_interval)
+
+    def _slice_id(self, ts):
+        return int(ts.timestamp() // self.slice_seconds)
+
+    def _lng_step(self, row):
+        # 경도 방향 칸 크기는 행(위도 띠) 중앙 위도 기준
+        row_lat = (row + 0.5) * self.lat_step
+        return self.lat_step / max(math.cos(math.radians(row_lat)), 1e-6)
+
+    def _cell(self, lat, lng):
+        row = int(math.floor(lat / self.lat_step))
+        return (row, int(math.floor(lng / self._lng_step(row))))
+
+    def _add_locked(self, ping_id, device_code, user_id, lat, lng, ts):
+        slice_id = self._slice_id(ts)
+        newest = self._slice_id(datetime.now())
+        if slice_id <= newest - self._slot_count or slice_id > newest + 1:
+            return False
+
+        index = slice_id % self._slot_count
+        slot = self._slots[index]
+        if slot is None or slot[0] != slice_id:
+            if slot is not None:
+                if slot[0] > slice_id:
+                    return False
+                self._ping_count -= len(slot[2])
+            slot = [slice_id, {}, set()]
+            self._slots[index] = slot
+        if ping_id in slot[2]:
+            return False
+
+        slot[2].add(ping_id)
+        slot[1].setdefault(self._cell(lat, lng), []).append((ts, lat, lng, user_id, device_code))
+        self._ping_count += 1
+        return True
+
+    def tail(self):
+        """device_realtime_log에서 새 로그를 읽어 버퍼에 반영, 추가한 건수 반환"""
+        if self.position_fn is not None:
+            db_now, horizon, max_id = self.position_fn()
+            if self._watermark is not None and (max_id is None or max_id < self._watermark):
+                # 이어 읽던 id 범위가 사라졌으므로 (id > 워터마크 조건으로는 새 로그를 못 읽음) 처음부터 다시 적재
+                print(f"[{self.name}] 실시간 로그 id가 줄어듦 ({self._watermark} -> {max_id}), 버퍼를 다시 적재합니다.")
+                self._reset()
+        else:
+            db_now, horizon, max_id = datetime.now(), None, self._watermark
+        oldest_allowed = db_now - timedelta(seconds=self.max_overlap_seconds)
+        horizon = oldest_allowed if horizon is None else max(horizon, oldest_allowed)
+
+        now = datetime.now()
+        if self._watermark is None or self._safe_id is None:
+            # 처음 적재하거나 아직 빠짐없이 읽은 id가 정해지지 않았으면 시각 기준으로 창 전체를 읽음
+            since = now - timedelta(seconds=self.window_seconds)
+            after_id = None
+        else:
+            since = None
+            after_id = self._safe_id
+
+        added = 0
+        while True:
+            rows = self.fetch_fn(after_id, since, self.fetch_limit)
+            with self._lock:
+                for ping_id, device_code, user_id, lat, lng, ts in rows:
+                    if lat is None or lng is None or ts is None:
+                        continue
+                    if self._add_locked(ping_id, device_code, user_id, float(lat), float(lng), ts):
+                        added += 1
+                    if self._watermark is None or ping_id > self._watermark:
+                        self._watermark = ping_id
+            if len(rows) < self.fetch_limit:
+                break
+            after_id = rows[-1][0]
+            since = None
+
+        with self._lock:
+            # 이번 tail 전에 읽은 MAX(id)를 기록하고, horizon 이전 기록 중 가장 최근 것을 다음 시작점으로 삼음
+            if max_id is not None:
+                self._id_marks.append((db_now, max_id))
+            while self._id_marks and self._id_marks[0][0] <= horizon:
+                marked_id = self._id_marks.popleft()[1]
+                self._safe_id = marked_id if self._safe_id is None else max(self._safe_id, marked_id)
+            if self._ready_since is None:
+                self._ready_since = now - timedelta(seconds=self.window_seconds)
+            self._last_tail_at = time.monotonic()
+        return added
+
+    def covers(self, start_time, max_lag=10.0):
+        """start_time 이후 로그를 빠짐없이 갖고 있고 최근 max_lag초 안에 갱신됐는지 여부"""
+        if self._ready_since is None or self._last_tail_at is None:
+            return False
+        if time.monotonic() - self._last_tail_at > max_lag:
+            return False
+        oldest = datetime.now() - timedelta(seconds=self.window_seconds - self.slice_seconds)
+        return start_time >= max(self._ready_since, oldest)
+
+    def candidates(self, lat, lng, at, time_window_seconds=300, radius_m=1000.0,
+                   exclude_user=None, limit=5, time_weight=10.0):
+        """at 전후 time_window_seconds초, 반경 radius_m 안의 로그로 후보 점수 계산
+
+        점수 = 거리(m) + 시간 차(초) x time_weight, 작을수록 유력하며 사용자/기기별 최저 점수만 남긴다.
+        """
+        start = at - timedelta(seconds=time_window_seconds)
+        end = at + timedelta(seconds=time_window_seconds)
+        lat_span = radius_m / METERS_PER_DEGREE
+        # 반경 안에서 극에 가장 가까운 위도 기준으로 경도 범위를 넉넉히 잡음
+        lng_span = lat_span / max(math.cos(math.radians(min(abs(lat) + lat_span, 90.0))), 1e-6)
+        min_row = int(math.floor((lat - lat_span) / self.lat_step))
+        max_row = int(math.floor((lat + lat_span) / self.lat_step))
+
+        best = {}
+        with self._lock:
+            for slice_id in range(self._slice_id(start), self._slice_id(end) + 1):
+                slot = self._slots[slice_id % self._slot_count]
+                if slot is None or slot[0] != slice_id:
+                    continue
+                cells = slot[1]
+                for row in range(min_row, max_row + 1):
+                    lng_step = self._lng_step(row)
+                    min_col = int(math.floor((lng - lng_span) / lng_step))
+                    max_col = int(math.floor((lng + lng_span) / lng_step))
+                    for col in range(min_col, max_col + 1):
+                        for ts, p_lat, p_lng, user_id, device_code in cells.get((row, col), ()):
+                            if ts < start or ts > end or user_id == exclude_user:
+                                continue
+                            distance = haversine_m(lat, lng, p_lat, p_lng)
+                            if distance > radius_m:
+                                continue
+                            time_diff = abs((ts - at).total_seconds())
+                            score = distance + time_diff * time_weight
+                            key = (user_id, device_code)
+                            if key not in best or score < best[key]['score']:
+                                best[key] = {
+                                    'user_id': user_id,
+                                    'device_code': device_code,
+                                    'latitude': p_lat,
+                                    'longitude': p_lng,
+                                    'now_time': ts,
+                                    'distance_m': distance,
+                                    'time_diff_seconds': time_diff,
+                                    'score': score
+                                }
+
+        return sorted(best.values(), key=lambda c: c['score'])[:limit]
+
+    def stats(self):
+        """버퍼 상태 (모니터링용)"""
+        with self._lock:
+            return {
+                'pings': self._ping_count,
+                'watermark': self._watermark,
+                'safe_id': self._safe_id,
+                'ready_since': self._ready_since.isoformat() if self._ready_since else None,
+                'last_tail_age': round(time.monotonic() - self._last_tail_at, 2) if self._last_tail_at else None,
+                'tail_errors': self._tail_errors,
+                'running': self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+            }
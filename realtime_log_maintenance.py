@@ -0,0 +1,322 @@
+import argparse
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from app import app, db, TRAJECTORY_TOLERANCE_M
+from realtime_records import MAX_AGE_SECONDS
+from ride_metrics import load_ride_points
+from trajectory import downsample_by_time, save_ride_trajectory, simplify_douglas_peucker
+
+# device_realtime_log 수명 주기 관리 스크립트
+#
+#   python realtime_log_maintenance.py run          # 파티션 생성 + 궤적 축소 + 보존 기간 지난 파티션 삭제 (매일 cron)
+#   python realtime_log_maintenance.py partitions   # 앞으로 N일치 일 단위 파티션 생성
+#   python realtime_log_maintenance.py downsample   # N일 지난 주행의 실시간 로그를 주행별 궤적으로 축소
+#   python realtime_log_maintenance.py retention    # 보존 기간이 지난 일 단위 파티션 삭제
+#   python realtime_log_maintenance.py backfill     # 기존(파티션 없는) 테이블을 파티션 테이블로 이관 후 과거 주행 축소
+
+TABLE_NAME = 'device_realtime_log'
+FUTURE_PARTITION = 'p_future'
+# 이관 시 교체 직전 MAX(id)와 새 테이블 시작 id 사이 여유 (교체하는 동안 기존 테이블에 들어오는 로그 수보다 충분히 크게)
+BACKFILL_ID_GAP = 100000
+
+PARTITIONED_TABLE_DDL = """
+    CREATE TABLE {table} (
+        id BIGINT NOT NULL AUTO_INCREMENT,
+        DEVICE_CODE VARCHAR(50) NOT NULL,
+        USER_ID varchar(50) NOT NULL,
+        location POINT NOT NULL,
+        now_time DATETIME NOT NULL,
+        PRIMARY KEY (id, now_time),
+        KEY idx_realtime_device_time (DEVICE_CODE, now_time),
+        KEY idx_realtime_user_time (USER_ID, now_time),
+        KEY idx_realtime_time (now_time)
+    )
+    PARTITION BY RANGE (TO_DAYS(now_time)) (
+        PARTITION p_initial VALUES LESS THAN ({initial_bound}),
+        PARTITION p_future VALUES LESS THAN MAXVALUE
+    )
+"""
+
+
+def to_days(day):
+    """MySQL TO_DAYS()와 같은 값 계산"""
+    return day.toordinal() + 365
+
+
+def from_days(days):
+    """TO_DAYS 값을 날짜로 변환"""
+    return date.fromordinal(days - 365)
+
+
+def partition_name(day):
+    return f"p{day.strftime('%Y%m%d')}"
+
+
+def get_partitions(table=TABLE_NAME):
+    """파티션 목록 조회 [(파티션 이름, 상한 TO_DAYS 값 또는 MAXVALUE이면 None)]"""
+    rows = db.session.execute(text("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """), {'table': table}).all()
+    return [(name, None if desc == 'MAXVALUE' else int(desc)) for name, desc in rows]
+
+
+def ensure_partitions(days_ahead=7, table=TABLE_NAME, start_day=None):
+    """start_day(기본 오늘)부터 days_ahead일 뒤까지 일 단위 파티션 생성 (p_future를 분할)"""
+    partitions = get_partitions(table)
+    if not partitions:
+        print(f"{table}은 파티션 테이블이 아닙니다. backfill 명령으로 먼저 이관하세요.")
+        return []
+
+    bounds = [bound for _, bound in partitions if bound is not None]
+    first_day = start_day or date.today()
+    if bounds:
+        # 마지막 파티션 상한 날짜부터 이어서 생성
+        first_day = max(first_day, from_days(max(bounds)))
+
+    end_day = date.today() + timedelta(days=days_ahead)
+    new_days = []
+    day = first_day
+    while day <= end_day:
+        new_days.append(day)
+        day += timedelta(days=1)
+
+    if not new_days:
+        print("추가할 파티션이 없습니다.")
+        return []
+
+    definitions = ", ".join(
+        f"PARTITION {partition_name(d)} VALUES LESS THAN ({to_days(d + timedelta(days=1))})"
+        for d in new_days
+    )
+    db.session.execute(text(
+        f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO "
+        f"({definitions}, PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE)"
+    ))
+    print(f"{table}: 파티션 {len(new_days)}개 생성 ({partition_name(new_days[0])} ~ {partition_name(new_days[-1])})")
+    return [partition_name(d) for d in new_days]
+
+
+def drop_expired_partitions(retention_days, dry_run=False):
+    """보존 기간(retention_days)보다 오래된 데이터만 담은 파티션 삭제"""
+    cutoff = to_days(date.today() - timedelta(days=retention_days))
+    expired = [name for name, bound in get_partitions() if bound is not None and bound <= cutoff]
+
+    if not expired:
+        print("삭제할 파티션이 없습니다.")
+        return []
+
+    if dry_run:
+        print(f"[dry-run] 삭제 대상 파티션: {', '.join(expired)}")
+        return expired
+
+    db.session.execute(text(f"ALTER TABLE {TABLE_NAME} DROP PARTITION {', '.join(expired)}"))
+    print(f"보존 기간({retention_days}일) 지난 파티션 {len(expired)}개 삭제: {', '.join(expired)}")
+    return expired
+
+
+def downsample_old_rides(older_than_days, interval_seconds=30, batch_size=200,
+                         method='douglas_peucker', tolerance_m=TRAJECTORY_TOLERANCE_M):
+    """older_than_days일 지난 주행 중 궤적이 없는 주행을 축소해 저장
+
+    method: douglas_peucker (허용 오차 tolerance_m 미터) 또는 downsample (interval_seconds초 간격)
+    대여 종료 시 궤적을 저장하지 못한 주행과 이 기능 도입 전 주행이 대상이다.
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    last_id = 0
+    ride_count = 0
+    raw_total = 0
+    kept_total = 0
+
+    while True:
+        rides = db.session.execute(text("""
+            SELECT u.id, u.USER_ID, u.DEVICE_CODE, u.start_time, u.end_time
+            FROM device_use_log u
+            LEFT JOIN ride_trajectory t ON t.USE_LOG_ID = u.id
+            WHERE u.id > :last_id
+              AND u.end_time IS NOT NULL
+              AND u.end_time < :cutoff
+              AND t.USE_LOG_ID IS NULL
+            ORDER BY u.id
+            LIMIT :batch_size
+        """), {'last_id': last_id, 'cutoff': cutoff, 'batch_size': batch_size}).mappings().all()
+
+        if not rides:
+            break
+
+        for ride in rides:
+            lat, lng, t = load_ride_points(db.session, ride['DEVICE_CODE'], ride['USER_ID'],
+                                           ride['start_time'], ride['end_time'])
+            if method == 'downsample':
+                keep = downsample_by_time(t, interval_seconds)
+                tolerance = interval_seconds
+            else:
+                keep = simplify_douglas_peucker(lat, lng, tolerance_m)
+                tolerance = tolerance_m
+            save_ride_trajectory(db.session, ride['id'], lat[keep], lng[keep], t[keep], method, tolerance, len(t))
+            raw_total += len(t)
+            kept_total += len(keep)
+
+        db.session.commit()
+        ride_count += len(rides)
+        last_id = rides[-1]['id']
+        print(f"주행 {ride_count}건 축소 완료 (마지막 id={last_id})")
+
+    ratio = (raw_total / kept_total) if kept_total else 0
+    print(f"궤적 축소 완료: 주행 {ride_count}건, 원본 {raw_total}점 -> {kept_total}점 (압축률 {ratio:.1f}x)")
+    return ride_count
+
+
+def backfill(days_ahead=7, older_than_days=7, interval_seconds=30,
+             method='douglas_peucker', tolerance_m=TRAJECTORY_TOLERANCE_M):
+    """기존(파티션 없는) device_realtime_log를 파티션 테이블로 이관하고 과거 주행 궤적 생성
+
+    id 컬럼이 있으면 id를 그대로 옮긴다 (RecentPingBuffer 등 id로 이어 읽는 쪽이 이관 후에도 이어서 읽도록).
+    복사 시작 시점의 MAX(id)까지 복사하고, 테이블을 바꾼 뒤 그보다 큰 id를 기존 테이블에서 이어 붙인다.
+    id가 없는 예전 테이블은 늦게 들어온 로그를 구분할 수 없으므로 앱이 받는 가장 오래된 시각
+    (MAX_AGE_SECONDS) 이후 로그를 (기기, 사용자, 시각)이 같은 행이 없는 것만 다시 옮긴다.
+    """
+    if get_partitions():
+        print(f"{TABLE_NAME}은 이미 파티션 테이블입니다. 과거 주행 축소만 진행합니다.")
+        downsample_old_rides(older_than_days, interval_seconds, method=method, tolerance_m=tolerance_m)
+        return
+
+    new_table = f"{TABLE_NAME}_partitioned"
+    old_table = f"{TABLE_NAME}_old"
+    has_id = 'id' in {row[0] for row in db.session.execute(text(f"SHOW COLUMNS FROM {TABLE_NAME}")).all()}
+
+    # 1) 날짜 범위 복사를 위해 기존 테이블에 시간 인덱스 추가 (하루 단위 복사가 전체 스캔이 되지 않도록)
+    index_names = {row[2] for row in db.session.execute(text(f"SHOW INDEX FROM {TABLE_NAME}")).all()}
+    if 'idx_backfill_time' not in index_names:
+        print("기존 테이블에 now_time 인덱스 추가 중...")
+        db.session.execute(text(f"ALTER TABLE {TABLE_NAME} ADD INDEX idx_backfill_time (now_time)"))
+
+    # 2) 복사 기준점: 진행 중인 쓰기 트랜잭션이 끝난 뒤 MAX(id)를 읽어 그 이하 id는 모두 커밋된 상태로 만듦
+    #    (READ 잠금은 쓰기 트랜잭션이 끝날 때까지 기다리고, 인덱스로 바로 읽은 뒤 즉시 해제)
+    copy_started_at = db.session.execute(text("SELECT NOW()")).scalar()
+    max_id = None
+    if has_id:
+        db.session.execute(text(f"LOCK TABLES {TABLE_NAME} READ"))
+        try:
+            max_id = db.session.execute(text(f"SELECT MAX(id) FROM {TABLE_NAME}")).scalar()
+        finally:
+            db.session.execute(text("UNLOCK TABLES"))
+    min_time, max_time, total = db.session.execute(
+        text(f"SELECT MIN(now_time), MAX(now_time), COUNT(*) FROM {TABLE_NAME}")
+    ).first()
+    first_day = min_time.date() if min_time else date.today()
+    # 미래 시각 보정 범위(최대 1분)로 오늘 이후 날짜가 생길 수 있으므로 오늘과 MAX(now_time) 중 늦은 날까지
+    last_day = max(date.today(), max_time.date()) if max_time else date.today()
+    print(f"이관 대상: 약 {total}건 ({min_time} ~ {max_time}, 기준 id={max_id})")
+
+    # 3) 파티션 테이블 생성
+    db.session.execute(text(f"DROP TABLE IF EXISTS {new_table}"))
+    db.session.execute(text(PARTITIONED_TABLE_DDL.format(table=new_table, initial_bound=to_days(first_day))))
+    ensure_partitions(days_ahead, table=new_table, start_day=first_day)
+
+    # 4) 하루 단위로 복사 (날짜 범위는 복사 대상이 빠지지 않도록 넓게 잡고, 실제 대상은 id로 제한)
+    columns = "id, DEVICE_CODE, USER_ID, location, now_time" if has_id else "DEVICE_CODE, USER_ID, location, now_time"
+    copied = 0
+    day = first_day
+    while day <= last_day:
+        result = db.session.execute(text(f"""
+            INSERT INTO {new_table} ({columns})
+            SELECT {columns}
+            FROM {TABLE_NAME}
+            WHERE now_time >= :day_start AND now_time < :day_end
+        """ + (" AND id <= :max_id" if has_id else "")), {
+            'day_start': datetime.combine(day, datetime.min.time()),
+            'day_end': datetime.combine(day + timedelta(days=1), datetime.min.time()),
+            'max_id': max_id or 0
+        })
+        db.session.commit()
+        copied += result.rowcount
+        print(f"{day}: {result.rowcount}건 복사 (누적 {copied}/{total})")
+        day += timedelta(days=1)
+
+    # 5) 테이블 교체 후 복사 도중 들어온 로그 이어 붙이기
+    if has_id:
+        # 교체 직후 새 테이블에 들어오는 로그가 기존 테이블의 id와 겹치지 않도록 여유를 두고 시작 id 지정
+        next_id = (db.session.execute(text(f"SELECT MAX(id) FROM {TABLE_NAME}")).scalar() or 0) + BACKFILL_ID_GAP
+        db.session.execute(text(f"ALTER TABLE {new_table} AUTO_INCREMENT = {int(next_id)}"))
+    db.session.execute(text(f"RENAME TABLE {TABLE_NAME} TO {old_table}, {new_table} TO {TABLE_NAME}"))
+    # RENAME은 기존 테이블에 쓰던 트랜잭션이 모두 끝난 뒤 실행되므로 이후 기존 테이블은 더 바뀌지 않음
+    if has_id:
+        result = db.session.execute(text(f"""
+            INSERT INTO {TABLE_NAME} ({columns})
+            SELECT {columns}
+            FROM {old_table}
+            WHERE id > :max_id
+        """), {'max_id': max_id or 0})
+    else:
+        result = db.session.execute(text(f"""
+            INSERT INTO {TABLE_NAME} ({columns})
+            SELECT o.DEVICE_CODE, o.USER_ID, o.location, o.now_time
+            FROM {old_table} o
+            WHERE o.now_time >= :reconcile_from
+              AND NOT EXISTS (
+                  SELECT 1 FROM {TABLE_NAME} n
+                  WHERE n.DEVICE_CODE = o.DEVICE_CODE AND n.now_time = o.now_time AND n.USER_ID = o.USER_ID
+              )
+        """), {'reconcile_from': copy_started_at - timedelta(seconds=MAX_AGE_SECONDS)})
+    db.session.commit()
+    print(f"이관 중 추가된 로그 {result.rowcount}건 반영")
+    print(f"이관 완료. 확인 후 기존 테이블을 삭제하세요: DROP TABLE {old_table};")
+
+    # 6) 과거 주행 궤적 생성
+    downsample_old_rides(older_than_days, interval_seconds, method=method, tolerance_m=tolerance_m)
+
+
+def run(days_ahead, older_than_days, interval_seconds, retention_days, dry_run=False,
+        method='douglas_peucker', tolerance_m=TRAJECTORY_TOLERANCE_M):
+    """매일 실행하는 전체 작업 (파티션 생성 -> 궤적 축소 -> 오래된 파티션 삭제)"""
+    if retention_days < older_than_days:
+        raise ValueError('보존 기간(retention-days)은 궤적 축소 기준(older-than)보다 길어야 합니다.')
+    ensure_partitions(days_ahead)
+    downsample_old_rides(older_than_days, interval_seconds, method=method, tolerance_m=tolerance_m)
+    drop_expired_partitions(retention_days, dry_run)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='device_realtime_log 파티션/보존 기간/궤적 축소 관리')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p_run = subparsers.add_parser('run', help='파티션 생성 + 궤적 축소 + 보존 기간 지난 파티션 삭제')
+    p_partitions = subparsers.add_parser('partitions', help='앞으로 N일치 파티션 생성')
+    p_downsample = subparsers.add_parser('downsample', help='오래된 주행을 궤적으로 축소')
+    p_retention = subparsers.add_parser('retention', help='보존 기간 지난 파티션 삭제')
+    p_backfill = subparsers.add_parser('backfill', help='기존 테이블을 파티션 테이블로 이관하고 과거 주행 축소')
+
+    for p in (p_run, p_partitions, p_backfill):
+        p.add_argument('--days-ahead', type=int, default=7, help='미리 만들어 둘 파티션 일수 (기본 7)')
+    for p in (p_run, p_downsample, p_backfill):
+        p.add_argument('--older-than', type=int, default=7, help='축소할 주행의 경과 일수 (기본 7)')
+        p.add_argument('--method', choices=['douglas_peucker', 'downsample'], default='douglas_peucker',
+                       help='축소 방식 (기본 douglas_peucker)')
+        p.add_argument('--tolerance', type=float, default=TRAJECTORY_TOLERANCE_M,
+                       help=f'douglas_peucker 허용 오차(미터) (기본 {TRAJECTORY_TOLERANCE_M:g})')
+        p.add_argument('--interval', type=int, default=30, help='downsample 방식에서 남길 점 간격(초) (기본 30)')
+    for p in (p_run, p_retention):
+        p.add_argument('--retention-days', type=int, default=30, help='원본 실시간 로그 보존 일수 (기본 30)')
+        p.add_argument('--dry-run', action='store_true', help='삭제 대상만 출력')
+
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.command == 'run':
+            run(args.days_ahead, args.older_than, args.interval, args.retention_days, args.dry_run,
+                args.method, args.tolerance)
+        elif args.command == 'partitions':
+            ensure_partitions(args.days_ahead)
+        elif args.command == 'downsample':
+            downsample_old_rides(args.older_than, args.interval, method=args.method, tolerance_m=args.tolerance)
+        elif args.command == 'retention':
+            drop_expired_partitions(args.retention_days, args.dry_run)
+        elif args.command == 'backfill':
+            backfill(args.days_ahead, args.older_than, args.interval, args.method, args.tolerance)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+from timestamps import parse_client_timestamp
+
+# 실시간 위치 로그 레코드 검증
+#
+# 기기 마지막 위치(device_latest_position)는 더 최근 시각으로만 갱신되므로,
+# 미래 시각(시계 오차, 단위가 틀린 epoch) 로그 하나가 들어오면 그 시각이 될 때까지 위치와 배터리 소모가 멈춘다.
+# 허용 오차 안의 미래 시각은 현재 시각으로 맞추고, 그보다 먼 미래나 너무 오래된 시각은 거부한다.
+
+# 허용하는 시각 범위 (현재 시각 기준)
+MAX_FUTURE_SKEW_SECONDS = 60          # 이만큼 앞선 시각까지는 현재 시각으로 맞춤
+MAX_AGE_SECONDS = 24 * 3600           # 이보다 오래된 로그는 거부 (앱 재전송 버퍼 기준)
+
+# DEVICE_CODE/USER_ID 컬럼 길이 (VARCHAR(50)), 넘으면 INSERT가 실패해 같은 배치 전체가 롤백됨
+MAX_CODE_LENGTH = 50
+
+
+def normalize_realtime_record(record, now=None, max_age_seconds=MAX_AGE_SECONDS,
+                              max_future_skew_seconds=MAX_FUTURE_SKEW_SECONDS):
+    """레코드를 (device_code, user_id, lat, lng, ts) 형태로 변환, 실패 시 오류 메시지 반환"""
+    if not isinstance(record, dict):
+        return None, '레코드 형식이 올바르지 않습니다.'
+
+    device_code = record.get('device_code')
+    user_id = record.get('user_id')
+    lat = record.get('lat')
+    lng = record.get('lng')
+
+    if not all([device_code, user_id, lat is not None, lng is not None]):
+        return None, '필수 정보가 누락되었습니다.'
+
+    device_code = str(device_code)
+    user_id = str(user_id)
+    if len(device_code) > MAX_CODE_LENGTH or len(user_id) > MAX_CODE_LENGTH:
+        return None, f'device_code/user_id는 {MAX_CODE_LENGTH}자 이하여야 합니다.'
+
+    try:
+        lat = float(lat)
+        lng = float(lng)
+        ts = parse_client_timestamp(record.get('ts'))
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None, '좌표 또는 시간 형식이 올바르지 않습니다.'
+
+    if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+        return None, '좌표 범위가 올바르지 않습니다.'
+
+    now = now or datetime.now()
+    if ts > now + timedelta(seconds=max_future_skew_seconds):
+        return None, '시간이 서버 시각보다 앞서 있습니다.'
+    if ts < now - timedelta(seconds=max_age_seconds):
+        return None, '너무 오래된 로그입니다.'
+    if ts > now:
+        ts = now
+
+    return (device_code, user_id, lat, lng, ts), None
@@ -0,0 +1,241 @@
+import json
+import math
+import os
+
+from sqlalchemy import text, bindparam
+
+# 지역(대분류) 분류 - 행정구역 경계 폴리곤 + 격자 인덱스
+#
+# 경계는 GeoJSON(FeatureCollection, properties.name = 지역 이름, Polygon/MultiPolygon)에서 읽는다.
+# 경계가 겹치면 파일에서 먼저 나온 지역이 우선한다 (기본 파일은 서울시 -> 인천시 -> 경기도 순).
+# 격자 칸 중 어떤 경계선도 지나지 않는 칸은 지역을 미리 정해 두고, 경계선이 지나는 칸만 점-폴리곤 판정을 한다.
+
+# 전체 지역 합계 행에 쓰는 이름
+REGION_ALL = '전체'
+REGION_OTHER = '기타 지역'
+
+DEFAULT_REGION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'regions.geojson')
+
+# 경계 파일을 읽지 못할 때 쓰는 사각형 영역 (이름, 최소 위도, 최대 위도, 최소 경도, 최대 경도), 위에서부터 우선
+REGION_BOXES = (
+    ('서울시', 37.413, 37.715, 126.764, 127.135),
+    ('인천시', 37.2, 37.8, 126.3, 127.0),
+    ('경기도', 37.0, 38.5, 126.0, 128.0),
+)
+
+
+def _point_in_rings(lat, lng, rings):
+    """짝홀(even-odd) 규칙 점-폴리곤 판정 (rings: [(lng 배열, lat 배열)], 구멍 링 포함)"""
+    inside = False
+    for xs, ys in rings:
+        j = len(xs) - 1
+        for i in range(len(xs)):
+            if (ys[i] > lat) != (ys[j] > lat):
+                cross = xs[i] + (lat - ys[i]) * (xs[j] - xs[i]) / (ys[j] - ys[i])
+                if lng < cross:
+                    inside = not inside
+            j = i
+    return inside
+
+
+class RegionIndex:
+    """지역 경계 폴리곤 격자 인덱스
+
+    regions: [(지역 이름, [폴리곤, ...])], 폴리곤은 [링, ...], 링은 [(lng, lat), ...] (GeoJSON 좌표 순서)
+    cell_deg: 격자 칸 크기(도), 작을수록 경계 판정이 필요한 칸이 줄고 메모리가 늘어남
+    """
+
+    def __init__(self, regions, cell_deg=0.02):
+        self.cell_deg = cell_deg
+        self.names = tuple(dict.fromkeys(name for name, _ in regions))
+
+        # (우선순위, 이름, 링 목록, 경계 상자)
+        self._polygons = []
+        for name, polygons in regions:
+            for polygon in polygons:
+                rings = []
+                for ring in polygon:
+                    if len(ring) < 3:
+                        continue
+                    rings.append((tuple(float(p[0]) for p in ring), tuple(float(p[1]) for p in ring)))
+                if not rings:
+                    continue
+                min_lng = min(min(xs) for xs, _ in rings)
+                max_lng = max(max(xs) for xs, _ in rings)
+                min_lat = min(min(ys) for _, ys in rings)
+                max_lat = max(max(ys) for _, ys in rings)
+                self._polygons.append((len(self._polygons), name, rings, (min_lat, max_lat, min_lng, max_lng)))
+
+        self._cells = {}
+        self.boundary_cells = 0
+        if not self._polygons:
+            return
+
+        self.min_lat = min(p[3][0] for p in self._polygons)
+        self.min_lng = min(p[3][2] for p in self._polygons)
+
+        # 칸별 후보 폴리곤 (경계 상자 기준)
+        candidates = {}
+        for polygon in self._polygons:
+            min_lat, max_lat, min_lng, max_lng = polygon[3]
+            r0, c0 = self._cell(min_lat, min_lng)
+            r1, c1 = self._cell(max_lat, max_lng)
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    candidates.setdefault((r, c), []).append(polygon)
+
+        # 경계선(변)이 지나갈 수 있는 칸 (변의 경계 상자가 걸치는 칸, 보수적으로 표시)
+        boundary = set()
+        for _, _, rings, _ in self._polygons:
+            for xs, ys in rings:
+                for i in range(len(xs)):
+                    j = i - 1
+                    r0, c0 = self._cell(min(ys[i], ys[j]), min(xs[i], xs[j]))
+                    r1, c1 = self._cell(max(ys[i], ys[j]), max(xs[i], xs[j]))
+                    for r in range(r0, r1 + 1):
+                        for c in range(c0, c1 + 1):
+                            boundary.add((r, c))
+
+        for key, polygons in candidates.items():
+            if key in boundary:
+                self._cells[key] = tuple(polygons)
+                self.boundary_cells += 1
+            else:
+                # 경계선이 없는 칸은 칸 안 모든 점의 지역이 같으므로 중심점으로 한 번만 판정
+                center_lat = self.min_lat + (key[0] + 0.5) * cell_deg
+                center_lng = self.min_lng + (key[1] + 0.5) * cell_deg
+                self._cells[key] = self._match(center_lat, center_lng, polygons)
+
+    @classmethod
+    def from_geojson(cls, path, name_property='name', cell_deg=0.02):
+        with open(path, encoding='utf-8') as f:
+            collection = json.load(f)
+
+        regions = []
+        for feature in collection.get('features', []):
+            name = (feature.get('properties') or {}).get(name_property)
+            geometry = feature.get('geometry') or {}
+            if not name:
+                continue
+            if geometry.get('type') == 'Polygon':
+                regions.append((name, [geometry['coordinates']]))
+            elif geometry.get('type') == 'MultiPolygon':
+                regions.append((name, geometry['coordinates']))
+        if not regions:
+            raise ValueError(f"지역 경계가 없습니다: {path}")
+        return cls(regions, cell_deg)
+
+    @classmethod
+    def from_boxes(cls, boxes=REGION_BOXES, cell_deg=0.02):
+        return cls([
+            (name, [[[(min_lng, min_lat), (max_lng, min_lat), (max_lng, max_lat), (min_lng, max_lat)]]])
+            for name, min_lat, max_lat, min_lng, max_lng in boxes
+        ], cell_deg)
+
+    def _cell(self, lat, lng):
+        return math.floor((lat - self.min_lat) / self.cell_deg), math.floor((lng - self.min_lng) / self.cell_deg)
+
+    def _match(self, lat, lng, polygons):
+        for _, name, rings, (min_lat, max_lat, min_lng, max_lng) in polygons:
+            if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng and _point_in_rings(lat, lng, rings):
+                return name
+        return REGION_OTHER
+
+    def lookup(self, lat, lng):
+        """좌표가 속한 지역 이름 (어느 경계에도 없거나 좌표가 없으면 기타 지역)"""
+        if lat is None or lng is None or not self._cells:
+            return REGION_OTHER
+        lat = float(lat)
+        lng = float(lng)
+        cell = self._cells.get(self._cell(lat, lng))
+        if cell is None:
+            return REGION_OTHER
+        if isinstance(cell, str):
+            return cell
+        return self._match(lat, lng, cell)
+
+    def stats(self):
+        return {
+            'regions': list(self.names),
+            'polygons': len(self._polygons),
+            'cells': len(self._cells),
+            'boundary_cells': self.boundary_cells,
+            'cell_deg': self.cell_deg
+        }
+
+
+_region_index = None
+
+
+def load_region_index(path=None, cell_deg=0.02):
+    """경계 파일(기본 data/regions.geojson)로 인덱스를 만들어 classify_region()에서 쓰도록 설정"""
+    global _region_index
+    path = path or DEFAULT_REGION_FILE
+    try:
+        _region_index = RegionIndex.from_geojson(path, cell_deg=cell_deg)
+        print(f"지역 경계 로드: {path} ({', '.join(_region_index.names)})")
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"지역 경계 로드 실패, 사각형 영역으로 대체합니다: {str(e)}")
+        _region_index = RegionIndex.from_boxes(cell_deg=cell_deg)
+    return _region_index
+
+
+def get_region_index():
+    if _region_index is None:
+        load_region_index()
+    return _region_index
+
+
+def region_names():
+    """분류 가능한 지역 이름 (기타 지역 포함)"""
+    return get_region_index().names + (REGION_OTHER,)
+
+
+def classify_region(lat, lng):
+    """좌표가 속한 지역 이름 (좌표가 없으면 기타 지역)"""
+    return get_region_index().lookup(lat, lng)
+
+
+def assign_device_regions(session, device_codes=None, only_missing=False, batch_size=1000):
+    """device_info.region을 현재 위치 기준으로 다시 계산 (커밋은 호출하는 쪽에서), 바뀐 기기 수 반환
+
+    device_codes: 대상 기기 (None이면 전체), only_missing: region이 비어 있는 기기만
+    """
+    sql = "SELECT DEVICE_CODE, ST_X(location), ST_Y(location), region FROM device_info WHERE location IS NOT NULL"
+    params = {}
+    if device_codes is not None:
+        if not device_codes:
+            return 0
+        sql += " AND DEVICE_CODE IN :device_codes"
+        params['device_codes'] = list(device_codes)
+    if only_missing:
+        sql += " AND region IS NULL"
+    statement = text(sql)
+    if device_codes is not None:
+        statement = statement.bindparams(bindparam('device_codes', expanding=True))
+
+    changed = {}
+    for device_code, lat, lng, region in session.execute(statement, params).all():
+        new_region = classify_region(lat, lng)
+        if new_region != region:
+            changed[device_code] = new_region
+
+    items = list(changed.items())
+    for start in range(0, len(items), batch_size):
+        chunk = items[start:start + batch_size]
+        case_sql = []
+        chunk_params = {'codes': [code for code, _ in chunk]}
+        for i, (device_code, region) in enumerate(chunk):
+            case_sql.append(f"WHEN :code_{i} THEN :region_{i}")
+            chunk_params[f'code_{i}'] = device_code
+            chunk_params[f'region_{i}'] = region
+        session.execute(
+            # 지역만 바뀐 것은 변경분 피드에 내보낼 필요가 없으므로 updated_at은 그대로 둠
+            text(
+                "UPDATE device_info SET region = CASE DEVICE_CODE "
+                + " ".join(case_sql)
+                + " ELSE region END, updated_at = updated_at WHERE DEVICE_CODE IN :codes"
+            ).bindparams(bindparam('codes', expanding=True)),
+            chunk_params
+        )
+    return len(changed)
@@ -0,0 +1,116 @@
+import argparse
+from sqlalchemy import text
+from app import app, db, blob_store
+from report_images import store_report_image
+
+# report_log.image(LONGTEXT)에 남아 있는 신고 사진을 파일 저장소로 이관하는 스크립트
+#
+#   python report_image_migration.py status                 # 이관 대상/완료 건수, 테이블 크기
+#   python report_image_migration.py run                    # 50건씩 이관 (사진 파일 저장 -> 해시/크기 기록 -> image 비움)
+#   python report_image_migration.py run --keep-original    # image 컬럼은 그대로 두고 해시/크기만 기록 (검증용)
+#
+# 한 번에 한 행의 사진만 읽으므로 메모리는 사진 한 장 크기에만 비례한다.
+# 이관이 끝나면 OPTIMIZE TABLE report_log로 비워진 공간을 돌려받는다.
+# image를 비우면 파일이 유일한 사본이므로, 저장소가 임시 디렉터리면 비우지 않고
+# 파일을 다시 읽어 내용이 해시와 같은 행만 비운다.
+
+
+def status():
+    remaining = db.session.execute(text(
+        "SELECT COUNT(*) FROM report_log WHERE image IS NOT NULL AND image_sha256 IS NULL"
+    )).scalar()
+    migrated = db.session.execute(text(
+        "SELECT COUNT(*) FROM report_log WHERE image_sha256 IS NOT NULL"
+    )).scalar()
+    data_length, index_length = db.session.execute(text("""
+        SELECT DATA_LENGTH, INDEX_LENGTH
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'report_log'
+    """)).first() or (0, 0)
+    print(f"이관 대상: {remaining}건, 이관 완료: {migrated}건")
+    print(f"report_log 크기: 데이터 {(data_length or 0) / 1024 / 1024:.1f}MB, 인덱스 {(index_length or 0) / 1024 / 1024:.1f}MB")
+    print(f"사진 저장소: {blob_store.directory}" + ("" if blob_store.durable else " (임시 디렉터리)"))
+    return remaining, migrated
+
+
+def migrate(batch_size=50, keep_original=False, limit=None):
+    """image가 남아 있는 신고를 id 순서로 batch_size건씩 이관하고 배치마다 커밋"""
+    if not keep_original and not blob_store.durable:
+        print(f"사진 저장소({blob_store.directory})가 임시 디렉터리라 image를 비울 수 없습니다. "
+              "BLOB_STORE_DIR을 영구 경로로 지정하거나 --keep-original로 실행하세요.")
+        return 0, 0
+
+    last_id = 0
+    moved = 0
+    failed = 0
+
+    while limit is None or moved + failed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved - failed)
+        ids = db.session.execute(text("""
+            SELECT id FROM report_log
+            WHERE id > :last_id AND image IS NOT NULL AND image_sha256 IS NULL
+            ORDER BY id
+            LIMIT :batch_size
+        """), {'last_id': last_id, 'batch_size': size}).scalars().all()
+        if not ids:
+            break
+
+        try:
+            for report_id in ids:
+                value = db.session.execute(
+                    text("SELECT image FROM report_log WHERE id = :report_id"), {'report_id': report_id}
+                ).scalar()
+                stored = store_report_image(blob_store, value)
+                if stored is None:
+                    # 이미지로 읽을 수 없는 값은 그대로 두고 건너뜀
+                    failed += 1
+                    print(f"신고 {report_id}: 이미지로 읽을 수 없어 건너뜀")
+                    continue
+                digest, width, height = stored
+                if not keep_original and not blob_store.verify(digest):
+                    # 파일을 다시 읽은 내용이 다르면 DB 사본을 지우지 않음
+                    failed += 1
+                    print(f"신고 {report_id}: 저장한 파일을 다시 읽은 내용이 달라 건너뜀")
+                    continue
+                db.session.execute(text(f"""
+                    UPDATE report_log
+                    SET image_sha256 = :sha256, image_width = :width, image_height = :height
+                        {'' if keep_original else ', image = NULL'}
+                    WHERE id = :report_id
+                """), {'sha256': digest, 'width': width, 'height': height, 'report_id': report_id})
+                moved += 1
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        last_id = ids[-1]
+        print(f"{moved}건 이관 완료 (마지막 id={last_id}, 실패 {failed}건)")
+
+    print(f"사진 이관 완료: {moved}건 이관, {failed}건 실패")
+    if moved and not keep_original:
+        print("비워진 공간을 돌려받으려면 OPTIMIZE TABLE report_log; 를 실행하세요.")
+    return moved, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='신고 사진을 report_log에서 파일 저장소로 이관')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('status', help='이관 대상/완료 건수와 테이블 크기 출력')
+    p_run = subparsers.add_parser('run', help='사진 이관 실행')
+    p_run.add_argument('--batch-size', type=int, default=50, help='커밋 단위 건수 (기본 50)')
+    p_run.add_argument('--limit', type=int, default=None, help='이번 실행에서 처리할 최대 건수')
+    p_run.add_argument('--keep-original', action='store_true', help='image 컬럼을 비우지 않음 (검증용)')
+
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.command == 'status':
+            status()
+        elif args.command == 'run':
+            migrate(args.batch_size, args.keep_original, args.limit)
+
+
+if __name__ == '__main__':
+    main()
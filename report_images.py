@@ -0,0 +1,115 @@
+import base64
+import binascii
+import struct
+
+# 신고 사진 데이터 처리
+#
+# 사진 바이트는 BlobStore(SHA-256 이름 파일)에 두고 report_log에는 해시와 크기만 저장한다.
+# 이전 데이터는 report_log.image에 Base64 문자열 또는 바이트로 남아 있을 수 있다 (report_image_migration.py로 이관).
+
+DEFAULT_MIMETYPE = 'image/jpeg'
+
+# 파일 시작 바이트 -> content type
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+)
+
+
+def decode_report_image(value):
+    """DB에 저장된 사진 값을 이미지 바이트로 변환 (Base64 문자열, data URL, 원본 바이트 모두 허용)
+
+    디코딩 결과가 알려진 이미지 형식(IMAGE_SIGNATURES, WebP, HEIC/AVIF)이 아니면 None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        data = bytes(value)
+        if image_mimetype(data, None) is not None:
+            return data
+        # 바이트로 저장된 Base64 문자열
+        value = data.decode('ascii', errors='ignore')
+    value = value.strip()
+    if not value:
+        return None
+    if value.startswith('data:') and ',' in value:
+        value = value.split(',', 1)[1]
+    try:
+        data = base64.b64decode(value, validate=False)
+    except (binascii.Error, ValueError):
+        return None
+    # b64decode(validate=False)는 거의 모든 문자열을 바이트로 바꾸므로 이미지 형식인지 확인
+    if image_mimetype(data, None) is None:
+        return None
+    return data
+
+
+def image_mimetype(data, default=DEFAULT_MIMETYPE):
+    """이미지 바이트의 content type (알 수 없으면 default)"""
+    for signature, mimetype in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mimetype
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[4:8] == b'ftyp':
+        # ISO BMFF 이미지 (아이폰 HEIC 등), major brand로 구분
+        brand = data[8:12]
+        if brand in (b'avif', b'avis'):
+            return 'image/avif'
+        if brand in (b'heic', b'heix', b'heim', b'heis', b'mif1', b'msf1'):
+            return 'image/heic'
+    return default
+
+
+def image_dimensions(data):
+    """이미지 헤더만 읽어 (가로, 세로) 반환 (JPEG/PNG/GIF/WebP/BMP), 알 수 없으면 (None, None)"""
+    try:
+        if data.startswith(b'\x89PNG\r\n\x1a\n') and data[12:16] == b'IHDR':
+            return struct.unpack('>II', data[16:24])
+        if data[:6] in (b'GIF87a', b'GIF89a'):
+            return struct.unpack('<HH', data[6:10])
+        if data.startswith(b'BM'):
+            width, height = struct.unpack('<ii', data[18:26])
+            return width, abs(height)
+        if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+            chunk = data[12:16]
+            if chunk == b'VP8X':
+                return (int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1)
+            if chunk == b'VP8L':
+                bits = int.from_bytes(data[21:25], 'little')
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b'VP8 ':
+                width, height = struct.unpack('<HH', data[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+        if data.startswith(b'\xff\xd8'):
+            # SOF 마커(0xC0~0xCF, DHT/JPG/DAC 제외)가 나올 때까지 세그먼트를 건너뜀
+            pos = 2
+            while pos + 9 < len(data):
+                if data[pos] != 0xFF:
+                    pos += 1
+                    continue
+                marker = data[pos + 1]
+                if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+                    pos += 1 if marker == 0xFF else 2
+                    continue
+                length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+                    return width, height
+                pos += 2 + length
+    except struct.error:
+        pass
+    return None, None
+
+
+def store_report_image(store, value):
+    """사진 값을 디코딩해 store에 저장하고 (해시, 가로, 세로) 반환, 이미지가 아니면 None"""
+    data = decode_report_image(value)
+    if not data:
+        return None
+    digest, _ = store.put(data)
+    width, height = image_dimensions(data)
+    return digest, width, height
@@ -0,0 +1,84 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+from app import app, db, blob_store, thumbnail_cache
+from thumbnails import THUMBNAIL_SIZES, generate_thumbnails, thumbnails_available
+
+# 신고 사진 썸네일 일괄 생성 스크립트 (기존 신고, 썸네일 크기/품질 변경 후)
+#
+#   python report_thumbnails.py regenerate            # 썸네일이 없는 사진만 생성
+#   python report_thumbnails.py regenerate --force    # 모든 사진의 썸네일을 다시 생성
+#
+# 파일 저장소로 이관된 사진(image_sha256)만 대상이므로 먼저 report_image_migration.py run을 실행한다.
+
+
+def regenerate(force=False, batch_size=200, workers=4):
+    if not thumbnails_available():
+        print("Pillow가 설치되어 있지 않아 썸네일을 만들 수 없습니다. (pip install Pillow)")
+        return None
+
+    legacy = db.session.execute(text(
+        "SELECT COUNT(*) FROM report_log WHERE image IS NOT NULL AND image_sha256 IS NULL"
+    )).scalar()
+    if legacy:
+        print(f"파일 저장소로 이관되지 않은 사진 {legacy}건은 건너뜁니다 (report_image_migration.py run 후 다시 실행).")
+
+    def work(digest):
+        try:
+            return digest, generate_thumbnails(thumbnail_cache, blob_store, digest, THUMBNAIL_SIZES, force), None
+        except Exception as e:
+            return digest, None, e
+
+    seen = set()
+    last_id = 0
+    generated = 0
+    missing = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            rows = db.session.execute(text("""
+                SELECT id, image_sha256 FROM report_log
+                WHERE id > :last_id AND image_sha256 IS NOT NULL
+                ORDER BY id
+                LIMIT :batch_size
+            """), {'last_id': last_id, 'batch_size': batch_size}).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            # 같은 사진은 한 번만 처리
+            digests = [digest for _, digest in rows if digest not in seen]
+            seen.update(digests)
+            for digest, count, error in executor.map(work, digests):
+                if error is not None:
+                    failed += 1
+                    print(f"{digest}: 썸네일 생성 오류: {str(error)}")
+                elif count is None:
+                    missing += 1
+                    print(f"{digest}: 원본 파일이 없습니다.")
+                else:
+                    generated += count
+            print(f"신고 id {last_id}까지 처리 (사진 {len(seen)}개, 썸네일 {generated}개 생성)")
+
+    print(f"썸네일 생성 완료: 사진 {len(seen)}개, 썸네일 {generated}개 생성, 원본 없음 {missing}개, 실패 {failed}개")
+    return generated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='신고 사진 썸네일 일괄 생성')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p_regenerate = subparsers.add_parser('regenerate', help='기존 신고 사진의 썸네일 생성')
+    p_regenerate.add_argument('--force', action='store_true', help='이미 있는 썸네일도 다시 생성')
+    p_regenerate.add_argument('--batch-size', type=int, default=200, help='한 번에 조회할 신고 수 (기본 200)')
+    p_regenerate.add_argument('--workers', type=int, default=4, help='생성 스레드 수 (기본 4)')
+
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.command == 'regenerate':
+            regenerate(args.force, args.batch_size, args.workers)
+
+
+if __name__ == '__main__':
+    main()
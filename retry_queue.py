@@ -0,0 +1,155 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+
+
+class RetryQueue:
+    """재시도가 있는 백그라운드 작업 큐 (워커 프로세스별 스레드, fork 이후 첫 submit 때 시작)
+
+    submit(key)는 키를 큐에 넣고 바로 반환한다. 스레드가 handle_fn(key, attempt)를 호출해
+    True를 받으면 끝내고, False나 예외면 retry_delays[attempt - 1]초 뒤 다시 시도한다.
+    retry_delays를 다 쓰면 give_up_fn(key, attempt)를 호출한다.
+    sweep_fn()이 있으면 sweep_interval초마다 호출해 돌려받은 (키, 시도 횟수)를 다시 넣는다
+    (처리 도중 재시작된 워커가 놓친 작업을 DB에서 찾아 이어서 처리).
+    """
+
+    def __init__(self, handle_fn, give_up_fn=None, sweep_fn=None, workers=1, max_queue=10000,
+                 retry_delays=(2, 10, 60), sweep_interval=30.0, name='retry-queue'):
+        self.handle_fn = handle_fn
+        self.give_up_fn = give_up_fn
+        self.sweep_fn = sweep_fn
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_delays = tuple(retry_delays)
+        self.sweep_interval = sweep_interval
+        self.name = name
+
+        self._heap = []   # (실행 시각, 순번, 키, 시도 횟수)
+        self._keys = set()
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._pid = None
+        self._next_sweep = 0.0
+
+        self._submitted = 0
+        self._dropped = 0
+        self._succeeded = 0
+        self._retried = 0
+        self._given_up = 0
+        self._swept = 0
+        self._last_ms = None
+
+    def ensure_started(self):
+        if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+            return
+        with self._condition:
+            if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+                return
+            if self._pid != os.getpid():
+                # fork 이전 부모 프로세스의 대기 작업은 sweep_fn이 다시 찾아 줌
+                self._heap = []
+                self._keys = set()
+                self._next_sweep = time.monotonic() + self.sweep_interval
+            self._pid = os.getpid()
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _push(self, key, attempt, delay):
+        if key in self._keys:
+            return True
+        if len(self._keys) >= self.max_queue:
+            self._dropped += 1
+            return False
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), key, attempt))
+        self._keys.add(key)
+        self._condition.notify()
+        return True
+
+    def submit(self, key, attempt=0, delay=0.0):
+        """작업 추가 (같은 키가 이미 대기 중이면 무시, 큐가 가득 차면 False)"""
+        self.ensure_started()
+        with self._condition:
+            added = self._push(key, attempt, delay)
+            if added:
+                self._submitted += 1
+            return added
+
+    def _sweep(self):
+        try:
+            items = self.sweep_fn()
+        except Exception as e:
+            print(f"[{self.name}] 대기 작업 조회 오류: {str(e)}")
+            return
+        with self._condition:
+            for key, attempt in items:
+                if key not in self._keys and self._push(key, attempt, 0.0):
+                    self._swept += 1
+
+    def _next(self):
+        """실행할 (키, 시도 횟수), 없으면 sweep 시각까지 기다림"""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if self.sweep_fn is not None and now >= self._next_sweep:
+                    self._next_sweep = now + self.sweep_interval
+                    return None
+                if self._heap and self._heap[0][0] <= now:
+                    _, _, key, attempt = heapq.heappop(self._heap)
+                    self._keys.discard(key)
+                    return key, attempt
+                wait_until = self._heap[0][0] if self._heap else now + self.sweep_interval
+                if self.sweep_fn is not None:
+                    wait_until = min(wait_until, self._next_sweep)
+                self._condition.wait(max(wait_until - now, 0.01))
+
+    def _run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                self._sweep()
+                continue
+            key, attempt = item
+            attempt += 1
+            started = time.monotonic()
+            try:
+                done = self.handle_fn(key, attempt)
+            except Exception as e:
+                done = False
+                print(f"[{self.name}] 작업 오류 ({key}, {attempt}회차): {str(e)}")
+
+            with self._condition:
+                self._last_ms = (time.monotonic() - started) * 1000
+                if done:
+                    self._succeeded += 1
+                    continue
+                if attempt <= len(self.retry_delays):
+                    self._retried += 1
+                    self._push(key, attempt, self.retry_delays[attempt - 1])
+                    continue
+                self._given_up += 1
+
+            if self.give_up_fn is not None:
+                try:
+                    self.give_up_fn(key, attempt)
+                except Exception as e:
+                    print(f"[{self.name}] 포기 처리 오류 ({key}): {str(e)}")
+
+    def stats(self):
+        with self._condition:
+            return {
+                'workers': len([t for t in self._threads if t.is_alive()]) if self._pid == os.getpid() else 0,
+                'queued': len(self._heap),
+                'submitted': self._submitted,
+                'dropped': self._dropped,
+                'succeeded': self._succeeded,
+                'retried': self._retried,
+                'given_up': self._given_up,
+                'swept': self._swept,
+                'last_ms': round(self._last_ms, 1) if self._last_ms is not None else None
+            }
@@ -0,0 +1,101 @@
+import numpy as np
+from sqlalchemy import text
+
+from geo import EARTH_RADIUS_M
+
+# 이 속도(km/h) 미만인 구간은 정차(idle)로 간주
+IDLE_SPEED_KMH = 1.0
+
+
+def load_ride_points(session, device_code, user_id, start_time, end_time=None):
+    """주행 1건의 실시간 로그를 한 번의 쿼리로 조회
+
+    반환값: (lat, lng, t) numpy 배열, t는 start_time 기준 경과 초 (DB에서 계산해 시간대 차이 없음)
+    """
+    sql = """
+        SELECT ST_X(location) AS lat, ST_Y(location) AS lng,
+               TIMESTAMPDIFF(SECOND, :start_time, now_time) AS t
+        FROM device_realtime_log
+        WHERE DEVICE_CODE = :device_code AND USER_ID = :user_id
+          AND now_time >= :start_time
+    """
+    params = {'device_code': device_code, 'user_id': user_id, 'start_time': start_time}
+    if end_time is not None:
+        sql += " AND now_time <= :end_time"
+        params['end_time'] = end_time
+    sql += " ORDER BY now_time"
+
+    rows = session.execute(text(sql), params).all()
+    if not rows:
+        empty = np.empty(0, dtype=np.float64)
+        return empty, empty.copy(), empty.copy()
+
+    points = np.asarray(rows, dtype=np.float64)
+    return points[:, 0], points[:, 1], points[:, 2]
+
+
+def haversine_segments(lat, lng):
+    """연속한 점 사이의 거리 배열 (미터, 길이 n-1)"""
+    lat_rad = np.radians(lat)
+    lng_rad = np.radians(lng)
+    dlat = np.diff(lat_rad)
+    dlng = np.diff(lng_rad)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat_rad[:-1]) * np.cos(lat_rad[1:]) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def compute_ride_metrics(lat, lng, t, start_point=None, idle_speed_kmh=IDLE_SPEED_KMH):
+    """경로 전체를 따라 주행 지표 계산 (반복문 없이 배열 연산)
+
+    lat, lng, t: 시각순 배열 (t는 초 단위)
+    start_point: 대여 시작 위치 (lat, lng, t) - 있으면 경로 맨 앞에 추가
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+
+    if start_point is not None and None not in start_point:
+        lat = np.concatenate(([start_point[0]], lat))
+        lng = np.concatenate(([start_point[1]], lng))
+        t = np.concatenate(([start_point[2]], t))
+
+    # 좌표 범위를 벗어난 점 제외
+    valid = (np.abs(lat) <= 90) & (np.abs(lng) <= 180)
+    lat, lng, t = lat[valid], lng[valid], t[valid]
+
+    metrics = {
+        'point_count': int(lat.size),
+        'distance_m': 0.0,
+        'duration_seconds': 0.0,
+        'moving_seconds': 0.0,
+        'idle_seconds': 0.0,
+        'max_speed_kmh': 0.0,
+        'avg_speed_kmh': 0.0,
+        'moving_avg_speed_kmh': 0.0
+    }
+    if lat.size < 2:
+        return metrics
+
+    segments = haversine_segments(lat, lng)
+    dt = np.diff(t)
+    timed = dt > 0
+
+    speeds = np.zeros_like(segments)
+    speeds[timed] = segments[timed] / dt[timed] * 3.6
+
+    idle = timed & (speeds < idle_speed_kmh)
+    distance = float(segments.sum())
+    duration = float(t[-1] - t[0])
+    idle_seconds = float(dt[idle].sum())
+    moving_seconds = float(dt[timed & ~idle].sum())
+
+    metrics.update({
+        'distance_m': distance,
+        'duration_seconds': duration,
+        'moving_seconds': moving_seconds,
+        'idle_seconds': idle_seconds,
+        'max_speed_kmh': float(speeds.max()),
+        'avg_speed_kmh': distance / duration * 3.6 if duration > 0 else 0.0,
+        'moving_avg_speed_kmh': distance / moving_seconds * 3.6 if moving_seconds > 0 else 0.0
+    })
+    return metrics
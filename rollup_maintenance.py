@@ -0,0 +1,63 @@
+import argparse
+from datetime import date, datetime, timedelta
+from app import app, db
+from rollups import rebuild_rollups_for_day
+
+# 주행/매출/신고 집계(ride_rollup) 재계산 스크립트
+#
+#   python rollup_maintenance.py run                                  # 어제 집계 다시 계산 (매일 cron)
+#   python rollup_maintenance.py rebuild --from 2024-01-01 --to 2024-01-31   # 기간 집계 다시 계산 (과거 데이터 채우기)
+
+
+def parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"날짜 형식이 올바르지 않습니다 (YYYY-MM-DD): {value}")
+
+
+def rebuild(from_day, to_day):
+    """from_day ~ to_day(포함) 집계를 하루씩 다시 계산하고 하루마다 커밋"""
+    if to_day < from_day:
+        raise ValueError('종료일은 시작일보다 빠를 수 없습니다.')
+
+    ride_total = 0
+    report_total = 0
+    day = from_day
+    while day <= to_day:
+        try:
+            rides, reports = rebuild_rollups_for_day(db.session, day)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        ride_total += rides
+        report_total += reports
+        print(f"{day}: 주행 {rides}건, 신고 {reports}건 집계")
+        day += timedelta(days=1)
+
+    print(f"집계 재계산 완료: {from_day} ~ {to_day}, 주행 {ride_total}건, 신고 {report_total}건")
+    return ride_total, report_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='주행/매출/신고 시간대별 집계 재계산')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('run', help='어제 집계 다시 계산 (대여 종료 시 반영되지 않은 주행 보정)')
+    p_rebuild = subparsers.add_parser('rebuild', help='기간 집계 다시 계산')
+    p_rebuild.add_argument('--from', dest='from_day', type=parse_day, required=True, help='시작일 (YYYY-MM-DD)')
+    p_rebuild.add_argument('--to', dest='to_day', type=parse_day, default=None, help='종료일 (YYYY-MM-DD, 기본 오늘)')
+
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.command == 'run':
+            yesterday = date.today() - timedelta(days=1)
+            rebuild(yesterday, yesterday)
+        elif args.command == 'rebuild':
+            rebuild(args.from_day, args.to_day or date.today())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from regions import REGION_ALL, classify_region
+
+# 주행/매출/신고 시간대별 집계 (ride_rollup, ride_rollup_user 테이블)
+#
+# 대여 종료/신고 접수 시 record_ride()/record_report()로 시간(hour)/일(day) 구간 x (지역, 전체) 행을 증가시키고,
+# rebuild_rollups_for_day()가 원본 테이블에서 하루 단위로 다시 계산한다 (누락 보정, 과거 데이터 채우기).
+# 활성 사용자 수는 ride_rollup_user에 (구간, 지역, 사용자)를 처음 넣을 때만 1 증가시킨다.
+
+GRANULARITIES = ('hour', 'day')
+
+ROLLUP_UPSERT_SQL = text("""
+    INSERT INTO ride_rollup
+        (granularity, bucket_start, region, ride_count, revenue, distance_m, active_users, report_count)
+    VALUES
+        (:granularity, :bucket_start, :region, :ride_count, :revenue, :distance_m, :active_users, :report_count)
+    ON DUPLICATE KEY UPDATE
+        ride_count = ride_count + VALUES(ride_count),
+        revenue = revenue + VALUES(revenue),
+        distance_m = distance_m + VALUES(distance_m),
+        active_users = active_users + VALUES(active_users),
+        report_count = report_count + VALUES(report_count)
+""")
+
+ROLLUP_USER_INSERT_SQL = text("""
+    INSERT IGNORE INTO ride_rollup_user (granularity, bucket_start, region, USER_ID)
+    VALUES (:granularity, :bucket_start, :region, :user_id)
+""")
+
+
+def bucket_start(ts, granularity):
+    """ts가 속한 집계 구간의 시작 시각"""
+    if granularity == 'hour':
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"알 수 없는 집계 단위: {granularity}")
+
+
+def bucket_step(granularity):
+    return timedelta(hours=1) if granularity == 'hour' else timedelta(days=1)
+
+
+def record_ride(session, use_log_id):
+    """종료된 주행 1건을 집계에 반영 (커밋은 호출하는 쪽에서), 반영한 지역 반환"""
+    ride = session.execute(text("""
+        SELECT USER_ID, end_time, fee, moved_distance,
+               ST_X(COALESCE(end_loc, start_loc)) AS lat, ST_Y(COALESCE(end_loc, start_loc)) AS lng
+        FROM device_use_log
+        WHERE id = :use_log_id AND end_time IS NOT NULL
+    """), {'use_log_id': use_log_id}).mappings().first()
+    if ride is None:
+        return None
+
+    region = classify_region(ride['lat'], ride['lng'])
+    for granularity in GRANULARITIES:
+        start = bucket_start(ride['end_time'], granularity)
+        for name in (region, REGION_ALL):
+            new_user = session.execute(ROLLUP_USER_INSERT_SQL, {
+                'granularity': granularity,
+                'bucket_start': start,
+                'region': name,
+                'user_id': ride['USER_ID']
+            }).rowcount
+            session.execute(ROLLUP_UPSERT_SQL, {
+                'granularity': granularity,
+                'bucket_start': start,
+                'region': name,
+                'ride_count': 1,
+                'revenue': ride['fee'] or 0,
+                'distance_m': ride['moved_distance'] or 0,
+                'active_users': 1 if new_user else 0,
+                'report_count': 0
+            })
+    return region
+
+
+def record_report(session, report_time, lat, lng):
+    """신고 1건을 집계에 반영 (커밋은 호출하는 쪽에서)"""
+    region = classify_region(lat, lng)
+    for granularity in GRANULARITIES:
+        start = bucket_start(report_time, granularity)
+        for name in (region, REGION_ALL):
+            session.execute(ROLLUP_UPSERT_SQL, {
+                'granularity': granularity,
+                'bucket_start': start,
+                'region': name,
+                'ride_count': 0,
+                'revenue': 0,
+                'distance_m': 0,
+                'active_users': 0,
+                'report_count': 1
+            })
+    return region
+
+
+def rebuild_rollups_for_day(session, day):
+    """day(date) 하루치 집계를 원본 테이블에서 다시 계산 (커밋은 호출하는 쪽에서), (주행 수, 신고 수) 반환"""
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    params = {'start': start, 'end': end}
+
+    rides = session.execute(text("""
+        SELECT USER_ID, end_time, fee, moved_distance,
+               ST_X(COALESCE(end_loc, start_loc)) AS lat, ST_Y(COALESCE(end_loc, start_loc)) AS lng
+        FROM device_use_log
+        WHERE end_time >= :start AND end_time < :end
+    """), params).all()
+    reports = session.execute(text("""
+        SELECT report_time,
+               ST_X(COALESCE(reported_loc, reporter_loc)) AS lat, ST_Y(COALESCE(reported_loc, reporter_loc)) AS lng
+        FROM report_log
+        WHERE report_time >= :start AND report_time < :end
+    """), params).all()
+
+    # (단위, 구간 시작, 지역) -> [주행 수, 매출, 거리, 사용자 set, 신고 수]
+    totals = {}
+
+    def add(ts, region, ride_count=0, revenue=0, distance=0, user_id=None, report_count=0):
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(ts, granularity)
+            for name in (region, REGION_ALL):
+                row = totals.setdefault((granularity, bucket, name), [0, 0, 0, set(), 0])
+                row[0] += ride_count
+                row[1] += revenue
+                row[2] += distance
+                if user_id is not None:
+                    row[3].add(user_id)
+                row[4] += report_count
+
+    for user_id, end_time, fee, moved_distance, lat, lng in rides:
+        add(end_time, classify_region(lat, lng), ride_count=1, revenue=fee or 0, distance=moved_distance or 0,
+            user_id=user_id)
+    for report_time, lat, lng in reports:
+        add(report_time, classify_region(lat, lng), report_count=1)
+
+    session.execute(text("DELETE FROM ride_rollup WHERE bucket_start >= :start AND bucket_start < :end"), params)
+    session.execute(text("DELETE FROM ride_rollup_user WHERE bucket_start >= :start AND bucket_start < :end"), params)
+
+    rollup_rows = []
+    user_rows = []
+    for (granularity, bucket, region), (ride_count, revenue, distance, users, report_count) in totals.items():
+        rollup_rows.append({
+            'granularity': granularity,
+            'bucket_start': bucket,
+            'region': region,
+            'ride_count': ride_count,
+            'revenue': revenue,
+            'distance_m': distance,
+            'active_users': len(users),
+            'report_count': report_count
+        })
+        user_rows.extend(
+            {'granularity': granularity, 'bucket_start': bucket, 'region': region, 'user_id': user_id}
+            for user_id in users
+        )
+    if rollup_rows:
+        session.execute(ROLLUP_UPSERT_SQL, rollup_rows)
+    if user_rows:
+        session.execute(ROLLUP_USER_INSERT_SQL, user_rows)
+    return len(rides), len(reports)
+
+
+def query_rollups(session, granularity, start, end, region=REGION_ALL):
+    """[start, end) 구간의 집계 시계열 (빈 구간은 0으로 채움), 조회 비용은 구간 수에만 비례"""
+    start = bucket_start(start, granularity)
+    rows = session.execute(text("""
+        SELECT bucket_start, ride_count, revenue, distance_m, active_users, report_count
+        FROM ride_rollup
+        WHERE granularity = :granularity AND region = :region
+          AND bucket_start >= :start AND bucket_start < :end
+        ORDER BY bucket_start
+    """), {'granularity': granularity, 'region': region, 'start': start, 'end': end}).mappings().all()
+    by_bucket = {r['bucket_start']: r for r in rows}
+
+    series = []
+    step = bucket_step(granularity)
+    bucket = start
+    while bucket < end:
+        r = by_bucket.get(bucket)
+        series.append({
+            'bucket': bucket.isoformat(),
+            'ride_count': int(r['ride_count']) if r else 0,
+            'revenue': float(r['revenue']) if r else 0.0,
+            'distance_m': int(r['distance_m']) if r else 0,
+            'active_users': int(r['active_users']) if r else 0,
+            'report_count': int(r['report_count']) if r else 0
+        })
+        bucket += step
+    return series
+
+
+def query_region_totals(session, granularity, start, end):
+    """[start, end) 구간의 지역별 합계 (활성 사용자 수는 구간별 값의 합)"""
+    start = bucket_start(start, granularity)
+    rows = session.execute(text("""
+        SELECT region, SUM(ride_count) AS ride_count, SUM(revenue) AS revenue, SUM(distance_m) AS distance_m,
+               SUM(active_users) AS active_users, SUM(report_count) AS report_count
+        FROM ride_rollup
+        WHERE granularity = :granularity AND region <> :all_region
+          AND bucket_start >= :start AND bucket_start < :end
+        GROUP BY region
+        ORDER BY ride_count DESC
+    """), {'granularity': granularity, 'all_region': REGION_ALL, 'start': start, 'end': end}).mappings().all()
+    return [{
+        'region': r['region'],
+        'ride_count': int(r['ride_count'] or 0),
+        'revenue': float(r['revenue'] or 0),
+        'distance_m': int(r['distance_m'] or 0),
+        'active_users': int(r['active_users'] or 0),
+        'report_count': int(r['report_count'] or 0)
+    } for r in rows]
@@ -2,13 +2,18 @@ import random
 import math
 from datetime import datetime
 from sqlalchemy import text
-from app import app, db
+from app import app, db, data_versions, ingest_realtime_batch, reconcile_kpi_counters, TRAJECTORY_TOLERANCE_M
+from ride_metrics import load_ride_points, compute_ride_metrics
+from trajectory import compress_ride_trajectory
+from regions import assign_device_regions
 
 def get_available_devices(count=3):
     """is_used가 0인 기기들을 랜덤하게 지정된 개수만큼 가져오기"""
     with app.app_context():
+        # 위치는 POINT(위도 경도)로 저장되므로 ST_X가 위도, ST_Y가 경도
+        # (일괄 저장 API가 이 순서로 INSERT하므로 시작 좌표도 같은 순서로 읽어야 함)
         sql = text("""
-            SELECT DEVICE_CODE, ST_Y(location) as latitude, ST_X(location) as longitude
+            SELECT DEVICE_CODE, ST_X(location) as latitude, ST_Y(location) as longitude
             FROM device_info 
             WHERE is_used = 0
             ORDER BY RAND()
@@ -73,6 +78,7 @@ def create_user_session(device_codes):
                 continue
             
         db.session.commit()
+        data_versions.bump('devices')
         print(f"기기 {len(device_codes)}개에 대한 사용자 세션을 생성했습니다.")
         return user_sessions
 
@@ -87,19 +93,20 @@ def set_devices_in_use(device_codes):
             """)
             db.session.execute(sql, {'device_code': device_code})
         db.session.commit()
+        data_versions.bump('devices')
+        # 대여 API를 거치지 않고 상태를 바꾸므로 KPI 카운터를 실제 값으로 맞춤
+        reconcile_kpi_counters()
         print(f"기기 {len(device_codes)}개를 사용 중으로 변경했습니다.")
 
 def reset_devices_to_available(device_codes):
     """기기들을 다시 사용 가능으로 변경하고 마지막 좌표를 device_info에 저장"""
     with app.app_context():
         for device_code in device_codes:
-            # 마지막 좌표를 device_realtime_log에서 가져오기
+            # 마지막 좌표를 device_latest_position에서 가져오기
             last_position_sql = text("""
                 SELECT ST_Y(location) as latitude, ST_X(location) as longitude 
-                FROM device_realtime_log 
-                WHERE DEVICE_CODE = :device_code 
-                ORDER BY now_time DESC 
-                LIMIT 1
+                FROM device_latest_position 
+                WHERE DEVICE_CODE = :device_code
             """)
             last_pos = db.session.execute(last_position_sql, {'device_code': device_code}).mappings().first()
             
@@ -121,30 +128,17 @@ def reset_devices_to_available(device_codes):
                 # device_use_log 테이블의 종료 정보 업데이트 (종료 좌표, 요금, 이동거리 포함)
                 # 시작 좌표 가져오기
                 start_position_sql = text("""
-                    SELECT ST_Y(start_loc) as start_lat, ST_X(start_loc) as start_lng, start_time
+                    SELECT id, USER_ID, ST_X(start_loc) as start_lat, ST_Y(start_loc) as start_lng, start_time
                     FROM device_use_log 
                     WHERE DEVICE_CODE = :device_code AND end_time IS NULL
                 """)
                 start_pos = db.session.execute(start_position_sql, {'device_code': device_code}).mappings().first()
                 
                 if start_pos:
-                    # 이동 거리 계산 (Haversine 공식)
-                    def calculate_distance(lat1, lon1, lat2, lon2):
-                        from math import radians, cos, sin, asin, sqrt
-                        R = 6371  # 지구의 반지름 (km)
-                        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-                        dlat = lat2 - lat1
-                        dlon = lon2 - lon1
-                        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-                        c = 2 * asin(sqrt(a))
-                        return R * c
-                    
-                    # 거리 계산 (미터 단위)
-                    distance_km = calculate_distance(
-                        start_pos['start_lat'], start_pos['start_lng'],
-                        last_pos['latitude'], last_pos['longitude']
-                    )
-                    distance_meters = int(distance_km * 1000)
+                    # 이동 거리 계산 (대여 중 실시간 로그 전체 경로를 따라 적산 - app.py와 동일한 방식)
+                    lat, lng, t = load_ride_points(db.session, device_code, start_pos['USER_ID'], start_pos['start_time'])
+                    metrics = compute_ride_metrics(lat, lng, t, start_point=(start_pos['start_lat'], start_pos['start_lng'], 0.0))
+                    distance_meters = int(metrics['distance_m'])
                     
                     # 사용 시간 계산 (초 단위)
                     usage_seconds = int((datetime.now() - start_pos['start_time']).total_seconds())
@@ -170,6 +164,11 @@ def reset_devices_to_available(device_codes):
                         'device_code': device_code
                     })
                     print(f"{device_code}: device_use_log 종료 정보 업데이트 - 요금: {fee}원, 거리: {distance_meters}m")
+                    
+                    # 주행 궤적 축소 저장 (app.py 대여 종료와 동일)
+                    trajectory = compress_ride_trajectory(db.session, start_pos['id'], lat, lng, t, TRAJECTORY_TOLERANCE_M)
+                    print(f"{device_code}: 주행 궤적 {trajectory['raw_point_count']}점 -> {trajectory['point_count']}점 "
+                          f"(압축률 {trajectory['compression_ratio']}x)")
                 else:
                     # 시작 정보가 없으면 기본 종료 시간만 업데이트
                     update_use_log_sql = text("""
@@ -198,79 +197,28 @@ def reset_devices_to_available(device_codes):
                 db.session.execute(update_use_log_sql, {'device_code': device_code})
                 print(f"{device_code}: device_use_log 종료 시간 업데이트")
             
+        # 마지막 위치 기준으로 기기 지역 갱신
+        assign_device_regions(db.session, device_codes)
         db.session.commit()
+        data_versions.bump('devices')
+        # 대여 API를 거치지 않고 상태를 바꾸므로 KPI 카운터를 실제 값으로 맞춤
+        reconcile_kpi_counters()
         print(f"기기 {len(device_codes)}개를 사용 가능으로 변경하고 마지막 위치를 저장했습니다.")
 
-def calculate_battery_drain(device_code, time_minutes):
-    """배터리 소모량 계산 (시간 기반)"""
-    # 5초당 1% (1분당 12%)
-    time_drain = time_minutes * 12.0     # 5초당 1% = 1분당 12%
-    
-    print(f"배터리 소모 계산: {device_code} - 시간: {time_minutes:.1f}분")
-    print(f"소모량: 시간 {time_drain:.1f}% (5초당 1%)")
+def flush_position_buffer(position_buffer):
+    """버퍼에 모아 둔 위치 로그를 일괄 저장 API와 같은 경로로 한 번에 저장"""
+    if not position_buffer:
+        return
     
-    return time_drain
-
-def update_device_position(device_code, lat, lon, user_id):
-    """기기 위치를 device_realtime_log 테이블에 저장하고 배터리 소모 계산"""
     with app.app_context():
-        try:
-            # 이전 위치와 시간 가져오기 (배터리 소모 계산용)
-            prev_position_sql = text("""
-                SELECT 
-                    ST_Y(location) as prev_lat,
-                    ST_X(location) as prev_lng,
-                    now_time as prev_time
-                FROM device_realtime_log 
-                WHERE DEVICE_CODE = :device_code 
-                ORDER BY now_time DESC 
-                LIMIT 1
-            """)
-            
-            prev_pos = db.session.execute(prev_position_sql, {'device_code': device_code}).mappings().first()
-            
-            # device_realtime_log 테이블에 실시간 위치 데이터 저장
-            sql = text("""
-                INSERT INTO device_realtime_log (DEVICE_CODE, USER_ID, location, now_time)
-                VALUES (:device_code, :user_id, ST_GeomFromText('POINT(:lon :lat)', 4326), NOW())
-            """)
-            db.session.execute(sql, {
-                'device_code': device_code,
-                'user_id': user_id,
-                'lat': lat,
-                'lon': lon
-            })
-            
-            print(f"위치 업데이트 성공: {device_code} -> ({lat:.6f}, {lon:.6f})")
-            
-        except Exception as e:
-            print(f"위치 업데이트 실패: {device_code} - {str(e)}")
-            db.session.rollback()
-            return
-        
-        # 배터리 소모 계산 및 업데이트
-        if prev_pos:
-            # 시간 계산 (분 단위) - 3초 고정 (시뮬레이터는 3초마다 실행)
-            time_diff = 3.0 / 60  # 3초 = 0.05분
-            
-            # 배터리 소모량 계산 (시간만 기반)
-            battery_drain = calculate_battery_drain(device_code, time_diff)
-            
-            # 배터리 레벨 업데이트
-            battery_update_sql = text("""
-                UPDATE device_info 
-                SET battery_level = GREATEST(battery_level - :drain, 0)
-                WHERE DEVICE_CODE = :device_code
-            """)
-            
-            db.session.execute(battery_update_sql, {
-                'drain': battery_drain,
-                'device_code': device_code
-            })
-            
-            print(f"배터리 소모: {battery_drain:.1f}% (시간: {time_diff:.1f}분)")
-        
-        db.session.commit()
+        statuses = ingest_realtime_batch(position_buffer)
+    
+    stored = sum(1 for s in statuses if s['status'] == 'stored')
+    print(f"위치 로그 일괄 저장: {stored}/{len(position_buffer)}건")
+    for s in statuses:
+        if s['status'] != 'stored':
+            print(f"위치 업데이트 실패: {position_buffer[s['index']]['device_code']} - {s.get('error')}")
+    position_buffer.clear()
 
 def simulate_movement(device_count=3):
     """기기 움직임 시뮬레이션"""
@@ -309,6 +257,7 @@ def simulate_movement(device_count=3):
         # 5. 움직임 시뮬레이션 (40단계)
         for step in range(40):
             print(f"\n--- Step {step + 1}/40 ---")
+            position_buffer = []
             
             for device_code in device_codes:
                 current_pos = device_positions[device_code]
@@ -376,9 +325,15 @@ def simulate_movement(device_count=3):
                         new_lat = current_pos['lat'] + 0.00018
                         new_lon = current_pos['lon'] + 0.00008
                 
-                # 위치 업데이트 (실제 사용자 ID 사용)
+                # 위치 로그 버퍼링 (실제 사용자 ID 사용)
                 user_id = user_sessions[device_code]
-                update_device_position(device_code, new_lat, new_lon, user_id)
+                position_buffer.append({
+                    'device_code': device_code,
+                    'user_id': user_id,
+                    'lat': new_lat,
+                    'lng': new_lon,
+                    'ts': datetime.now().isoformat()
+                })
                 
                 # 다음 스텝을 위해 위치 저장
                 device_positions[device_code] = {
@@ -388,6 +343,9 @@ def simulate_movement(device_count=3):
                 
                 print(f"{device_code} ({pattern}): {new_lat:.6f}, {new_lon:.6f}")
             
+            # 스텝마다 모아 둔 위치를 한 번에 저장
+            flush_position_buffer(position_buffer)
+            
             # 3초 대기
             import time
             time.sleep(3)
@@ -507,6 +465,7 @@ def simulate_realistic_route(device_count=3):
         # 40단계로 통일된 움직임
         for step in range(40):
             print(f"\n--- 경로 Step {step + 1}/40 ---")
+            position_buffer = []
             
             for device_code in device_codes:
                 # 각 기기의 경로에서 현재 단계 위치 가져오기
@@ -521,9 +480,17 @@ def simulate_realistic_route(device_count=3):
                 new_lon = target_lon + offset_lon
                 
                 user_id = user_sessions[device_code]
-                update_device_position(device_code, new_lat, new_lon, user_id)
+                position_buffer.append({
+                    'device_code': device_code,
+                    'user_id': user_id,
+                    'lat': new_lat,
+                    'lng': new_lon,
+                    'ts': datetime.now().isoformat()
+                })
                 print(f"{device_code} ({pattern}): {new_lat:.6f}, {new_lon:.6f}")
             
+            flush_position_buffer(position_buffer)
+            
             import time
             time.sleep(3)  # 3초마다 다음 위치로
     
@@ -0,0 +1,108 @@
+import threading
+import time
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlightCache:
+    """키별 계산 결과 캐시 (single-flight)
+
+    max_age초가 지난 키를 여러 스레드가 동시에 요청해도 compute_fn은 한 번만 실행된다.
+    먼저 온 스레드가 계산하는 동안 나머지는 이전 값이 있으면 그 값을 바로 받고(serve_stale),
+    없으면 계산이 끝날 때까지 기다렸다가 같은 결과를 받는다.
+    """
+
+    def __init__(self, max_age=5.0, max_entries=64, serve_stale=True, name='single-flight'):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.serve_stale = serve_stale
+        self.name = name
+
+        self._entries = {}   # key -> (value, built_at monotonic)
+        self._flights = {}   # key -> _Flight
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._stale_hits = 0
+        self._computes = 0
+        self._waits = 0
+        self._errors = 0
+        self._last_compute_ms = None
+
+    def get(self, key, compute_fn, max_age=None):
+        """(값, 경과 초) 반환, 만료됐으면 한 스레드만 compute_fn()으로 다시 계산"""
+        max_age = self.max_age if max_age is None else max_age
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] <= max_age:
+                self._hits += 1
+                return entry[0], now - entry[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+            elif entry is not None and self.serve_stale:
+                # 다른 스레드가 계산 중이면 이전 값으로 바로 응답
+                self._stale_hits += 1
+                return entry[0], now - entry[1]
+            else:
+                self._waits += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            with self._lock:
+                entry = self._entries.get(key)
+            return flight.value, (time.monotonic() - entry[1]) if entry is not None else 0.0
+
+        started = time.monotonic()
+        try:
+            value = compute_fn()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._errors += 1
+                del self._flights[key]
+            flight.done.set()
+            raise
+
+        built_at = time.monotonic()
+        flight.value = value
+        with self._lock:
+            self._entries[key] = (value, built_at)
+            if len(self._entries) > self.max_entries:
+                # 가장 오래된 항목부터 정리
+                for old_key, _ in sorted(self._entries.items(), key=lambda item: item[1][1])[:len(self._entries) - self.max_entries]:
+                    del self._entries[old_key]
+            del self._flights[key]
+            self._computes += 1
+            self._last_compute_ms = (built_at - started) * 1000
+        flight.done.set()
+        return value, 0.0
+
+    def invalidate(self, key=None):
+        """key(없으면 전체) 캐시 삭제"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'stale_hits': self._stale_hits,
+                'waits': self._waits,
+                'computes': self._computes,
+                'errors': self._errors,
+                'last_compute_ms': round(self._last_compute_ms, 2) if self._last_compute_ms is not None else None
+            }
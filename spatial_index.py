@@ -0,0 +1,304 @@
+import heapq
+import math
+import threading
+import time
+
+import numpy as np
+
+from geo import EARTH_RADIUS_M, haversine_m
+
+# 위도 1도의 길이 (미터)
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180.0
+
+# Web Mercator(지도 타일) 위도 한계
+MERCATOR_MAX_LAT = 85.05112878
+
+
+class GridIndex:
+    """균등 격자(cell bucket) 기반 메모리 공간 색인
+
+    위도/경도를 cell_size_m 크기의 격자로 나누고 칸마다 항목 코드를 모아 둔다.
+    반경 검색은 반경을 덮는 칸만 훑은 뒤 haversine 거리로 거르고 가까운 순으로 limit개를 고르므로
+    전체 항목 수와 관계없이 주변 칸의 항목 수에만 비례한다.
+    경도 방향 칸 크기는 ref_lat(기본 37.5, 국내) 기준으로 잡는다.
+    """
+
+    def __init__(self, cell_size_m=250.0, ref_lat=37.5):
+        self.cell_size_m = cell_size_m
+        self.lat_step = cell_size_m / METERS_PER_DEGREE
+        self.lng_step = self.lat_step / math.cos(math.radians(ref_lat))
+        self._items = {}   # code -> (lat, lng, cell, payload)
+        self._cells = {}   # cell -> set(code)
+        self._lock = threading.Lock()
+        self._pending = None   # 전체 구성 중에 들어온 갱신 [(연산, 인자)], 구성 중이 아니면 None
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, code):
+        return code in self._items
+
+    def _cell(self, lat, lng):
+        return (int(math.floor(lat / self.lat_step)), int(math.floor(lng / self.lng_step)))
+
+    def _remove_locked(self, code):
+        item = self._items.pop(code, None)
+        if item is None:
+            return False
+        bucket = self._cells.get(item[2])
+        if bucket is not None:
+            bucket.discard(code)
+            if not bucket:
+                del self._cells[item[2]]
+        return True
+
+    def _insert_locked(self, code, lat, lng, payload):
+        cell = self._cell(lat, lng)
+        self._items[code] = (lat, lng, cell, payload)
+        self._cells.setdefault(cell, set()).add(code)
+
+    def _record_locked(self, op, *args):
+        if self._pending is not None:
+            self._pending.append((op, args))
+
+    def upsert(self, code, lat, lng, payload=None):
+        """항목 추가 또는 위치/부가 정보 갱신"""
+        with self._lock:
+            self._record_locked(self._upsert_locked, code, lat, lng, payload)
+            self._upsert_locked(code, lat, lng, payload)
+
+    def _upsert_locked(self, code, lat, lng, payload):
+        self._remove_locked(code)
+        self._insert_locked(code, float(lat), float(lng), payload)
+
+    def move(self, code, lat, lng):
+        """이미 색인된 항목의 위치만 갱신 (없으면 무시하고 False 반환)"""
+        with self._lock:
+            self._record_locked(self._move_locked, code, lat, lng)
+            return self._move_locked(code, lat, lng)
+
+    def _move_locked(self, code, lat, lng):
+        item = self._items.get(code)
+        if item is None:
+            return False
+        lat = float(lat)
+        lng = float(lng)
+        cell = self._cell(lat, lng)
+        if cell != item[2]:
+            self._remove_locked(code)
+            self._insert_locked(code, lat, lng, item[3])
+        else:
+            self._items[code] = (lat, lng, cell, item[3])
+        return True
+
+    def remove(self, code):
+        with self._lock:
+            self._record_locked(self._remove_locked, code)
+            return self._remove_locked(code)
+
+    def begin_rebuild(self):
+        """전체 구성용 조회 직전에 호출, 이후 rebuild()까지 들어온 upsert/move/remove를 기록해 새 색인에 다시 적용"""
+        with self._lock:
+            self._pending = []
+
+    def abort_rebuild(self):
+        """전체 구성용 조회가 실패했을 때 기록 중단"""
+        with self._lock:
+            self._pending = None
+
+    def rebuild(self, entries):
+        """(code, lat, lng, payload) 목록으로 색인 전체를 새로 구성
+
+        begin_rebuild() 이후 기록된 갱신은 entries보다 새로운 값이므로 교체 직후 순서대로 다시 적용한다.
+        """
+        items = {}
+        cells = {}
+        for code, lat, lng, payload in entries:
+            if lat is None or lng is None:
+                continue
+            lat = float(lat)
+            lng = float(lng)
+            cell = self._cell(lat, lng)
+            items[code] = (lat, lng, cell, payload)
+            cells.setdefault(cell, set()).add(code)
+        with self._lock:
+            self._items = items
+            self._cells = cells
+            pending, self._pending = self._pending, None
+            for op, args in pending or ():
+                op(*args)
+            self.built_at = time.monotonic()
+
+    def age(self):
+        """마지막 전체 구성 이후 경과 초 (구성 전이면 None)"""
+        return time.monotonic() - self.built_at if self.built_at is not None else None
+
+    def nearest(self, lat, lng, radius_m, limit=10):
+        """반경 radius_m 이내 항목을 가까운 순으로 최대 limit개 반환 [(거리 m, code, lat, lng, payload)]"""
+        lat_span = radius_m / METERS_PER_DEGREE
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        lng_span = lat_span / cos_lat
+
+        min_row, min_col = self._cell(lat - lat_span, lng - lng_span)
+        max_row, max_col = self._cell(lat + lat_span, lng + lng_span)
+
+        candidates = []
+        with self._lock:
+            cells = self._cells
+            items = self._items
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    bucket = cells.get((row, col))
+                    if not bucket:
+                        continue
+                    for code in bucket:
+                        item_lat, item_lng, _, payload = items[code]
+                        distance = haversine_m(lat, lng, item_lat, item_lng)
+                        if distance <= radius_m:
+                            candidates.append((distance, code, item_lat, item_lng, payload))
+
+        return heapq.nsmallest(limit, candidates, key=lambda c: c[0])
+
+
+def mercator_xy(lat, lng):
+    """위도/경도를 Web Mercator 정규 좌표(0~1, y는 북쪽이 0)로 변환 (numpy 배열 또는 float)"""
+    lat = np.clip(lat, -MERCATOR_MAX_LAT, MERCATOR_MAX_LAT)
+    x = (np.asarray(lng, dtype=np.float64) + 180.0) / 360.0
+    sin_lat = np.sin(np.radians(lat))
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return x, y
+
+
+class ClusterGrid:
+    """줌 레벨별 화면 격자(cell_px 픽셀 칸)로 기기를 미리 묶어 두는 클러스터 색인
+
+    rebuild()로 전체 기기 위치를 numpy 배열로 받아 두고, 줌 레벨이 처음 요청될 때 칸별로
+    기기 수/무게중심/사용 중 수/최저 배터리를 한 번에 집계해 캐시한다 (rebuild 시 캐시 비움).
+    칸은 (열, 행) 순으로 정렬되어 있어 화면 영역 조회는 열 범위를 이진 탐색한 뒤 행으로만 거른다.
+    같은 줌의 클러스터 개수는 화면 크기 / cell_px에 비례하므로 전체 기기 수와 관계없이 응답 크기가 일정하다.
+    """
+
+    def __init__(self, cell_px=64, tile_size=256):
+        self.cell_px = cell_px
+        self.tile_size = tile_size
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self.built_at = None
+
+    def __len__(self):
+        snapshot = self._snapshot
+        return 0 if snapshot is None else len(snapshot['codes'])
+
+    def rebuild(self, codes, lat, lng, in_use, battery):
+        """전체 기기 배열로 새로 구성 (battery는 NaN이면 미상)"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        valid = ~(np.isnan(lat) | np.isnan(lng))
+        x, y = mercator_xy(lat[valid], lng[valid])
+        snapshot = {
+            'codes': np.asarray(codes, dtype=object)[valid],
+            'lat': lat[valid],
+            'lng': lng[valid],
+            'in_use': np.asarray(in_use, dtype=np.int64)[valid],
+            'battery': np.asarray(battery, dtype=np.float64)[valid],
+            'x': x,
+            'y': y,
+            'zooms': {}
+        }
+        with self._lock:
+            self._snapshot = snapshot
+            self.built_at = time.monotonic()
+
+    def age(self):
+        """마지막 구성 이후 경과 초 (구성 전이면 None)"""
+        return time.monotonic() - self.built_at if self.built_at is not None else None
+
+    def _scale(self, zoom):
+        return (2 ** zoom) * self.tile_size / self.cell_px
+
+    def _aggregate(self, snapshot, zoom):
+        """zoom 레벨의 칸별 집계 (캐시)"""
+        level = snapshot['zooms'].get(zoom)
+        if level is not None:
+            return level
+
+        scale = self._scale(zoom)
+        cols = np.floor(snapshot['x'] * scale).astype(np.int64)
+        rows = np.floor(snapshot['y'] * scale).astype(np.int64)
+        row_count = int(math.ceil(scale)) + 1
+        keys = cols * row_count + rows
+
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        if len(sorted_keys):
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        else:
+            starts = np.zeros(0, dtype=np.int64)
+        counts = np.diff(np.r_[starts, len(sorted_keys)])
+
+        if len(starts):
+            sum_lat = np.add.reduceat(snapshot['lat'][order], starts)
+            sum_lng = np.add.reduceat(snapshot['lng'][order], starts)
+            in_use = np.add.reduceat(snapshot['in_use'][order], starts)
+            # fmin은 NaN(배터리 미상)을 건너뜀
+            min_battery = np.fmin.reduceat(snapshot['battery'][order], starts)
+        else:
+            sum_lat = sum_lng = min_battery = np.zeros(0, dtype=np.float64)
+            in_use = np.zeros(0, dtype=np.int64)
+
+        level = {
+            'cols': sorted_keys[starts] // row_count,
+            'rows': sorted_keys[starts] % row_count,
+            'count': counts,
+            'latitude': sum_lat / np.maximum(counts, 1),
+            'longitude': sum_lng / np.maximum(counts, 1),
+            'in_use': in_use,
+            'min_battery': min_battery,
+            # 기기가 1대뿐인 칸은 바로 선택할 수 있도록 기기 코드 포함
+            'first_code': snapshot['codes'][order[starts]]
+        }
+        with self._lock:
+            if self._snapshot is snapshot:
+                snapshot['zooms'][zoom] = level
+        return level
+
+    def clusters(self, zoom, bbox, limit=2000):
+        """bbox(min_lat, min_lng, max_lat, max_lng) 안의 zoom 레벨 클러스터 목록과 총 기기 수, 잘림 여부"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return [], 0, False
+        level = self._aggregate(snapshot, zoom)
+
+        min_lat, min_lng, max_lat, max_lng = bbox
+        scale = self._scale(zoom)
+        (x0, x1), (y_top, y_bottom) = mercator_xy(np.array([max_lat, min_lat]), np.array([min_lng, max_lng]))
+        min_col, max_col = int(math.floor(x0 * scale)), int(math.floor(x1 * scale))
+        min_row, max_row = int(math.floor(y_top * scale)), int(math.floor(y_bottom * scale))
+
+        lo = np.searchsorted(level['cols'], min_col, side='left')
+        hi = np.searchsorted(level['cols'], max_col, side='right')
+        rows = level['rows'][lo:hi]
+        selected = lo + np.flatnonzero((rows >= min_row) & (rows <= max_row))
+
+        total = int(level['count'][selected].sum())
+        truncated = len(selected) > limit
+        if truncated:
+            # 기기가 많은 칸부터 남김
+            selected = selected[np.argsort(-level['count'][selected], kind='stable')[:limit]]
+
+        result = []
+        for i in selected:
+            count = int(level['count'][i])
+            in_use = int(level['in_use'][i])
+            min_battery = level['min_battery'][i]
+            result.append({
+                'latitude': round(float(level['latitude'][i]), 6),
+                'longitude': round(float(level['longitude'][i]), 6),
+                'count': count,
+                'available': count - in_use,
+                'in_use': in_use,
+                'min_battery': None if np.isnan(min_battery) else int(min_battery),
+                'device_id': level['first_code'][i] if count == 1 else None
+            })
+        return result, total, truncated
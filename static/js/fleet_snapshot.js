@@ -0,0 +1,100 @@
+// 지도용 기기 스냅샷 바이너리 디코더 (fleet_snapshot.py의 encode_fleet_snapshot 형식)
+// 열 데이터는 응답 버퍼를 그대로 가리키는 TypedArray로 읽고, 기기 객체는 필요할 때만 만든다.
+
+const FLEET_SNAPSHOT_NULL_COORD = -2147483648;
+const FLEET_SNAPSHOT_NULL_TIME = -2147483648;
+const FLEET_SNAPSHOT_NO_USER = 0xFFFFFFFF;
+const FLEET_SNAPSHOT_NO_BATTERY = 255;
+
+function decodeFleetSnapshot(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+    if (magic !== 'FLT1' || view.getUint8(4) !== 1) {
+        throw new Error('지원하지 않는 스냅샷 형식입니다.');
+    }
+    const flags = view.getUint8(5);
+    const count = view.getUint32(8, true);
+    const baseTime = view.getFloat64(16, true);
+
+    const decoder = new TextDecoder('utf-8');
+    let offset = 24;
+    function readTable() {
+        const size = view.getUint32(offset + 4, true);
+        const items = view.getUint32(offset, true) ?
+            decoder.decode(new Uint8Array(buffer, offset + 8, size)).split('\0') : [];
+        offset += 8 + size;
+        return items;
+    }
+    const cursor = readTable();
+    const codes = readTable();
+    const types = readTable();
+    const users = readTable();
+    const removed = readTable();
+    offset += (4 - offset % 4) % 4;
+
+    function column(ArrayType) {
+        const array = new ArrayType(buffer, offset, count);
+        offset += array.byteLength;
+        return array;
+    }
+
+    return {
+        count: count,
+        cursor: cursor.length ? cursor[0] : null,
+        truncated: (flags & 1) !== 0,
+        baseTime: baseTime,
+        codes: codes,
+        types: types,
+        users: users,
+        removed: removed,
+        lat: column(Int32Array),
+        lng: column(Int32Array),
+        updated: column(Int32Array),
+        user: column(Uint32Array),
+        type: column(Uint16Array),
+        battery: column(Uint8Array),
+        isUsed: column(Uint8Array)
+    };
+}
+
+// i번째 기기를 /api/web/devices JSON 응답과 같은 형태의 객체로 변환
+function fleetSnapshotDevice(snapshot, i) {
+    const isUsed = snapshot.isUsed[i];
+    const lat = snapshot.lat[i];
+    const lng = snapshot.lng[i];
+    const updated = snapshot.updated[i];
+    const user = snapshot.user[i];
+    const battery = snapshot.battery[i];
+    return {
+        device_id: snapshot.codes[i],
+        device_type: snapshot.types[snapshot.type[i]],
+        latitude: lat === FLEET_SNAPSHOT_NULL_COORD ? null : lat / 1e6,
+        longitude: lng === FLEET_SNAPSHOT_NULL_COORD ? null : lng / 1e6,
+        battery_level: battery === FLEET_SNAPSHOT_NO_BATTERY ? null : battery,
+        is_used: isUsed,
+        status: isUsed === 1 ? 'in_use' : 'available',
+        current_user_id: user === FLEET_SNAPSHOT_NO_USER ? null : snapshot.users[user],
+        last_updated: updated === FLEET_SNAPSHOT_NULL_TIME ? null : new Date((snapshot.baseTime + updated) * 1000).toISOString()
+    };
+}
+
+function fleetSnapshotToDevices(snapshot) {
+    const devices = new Array(snapshot.count);
+    for (let i = 0; i < snapshot.count; i++) {
+        devices[i] = fleetSnapshotDevice(snapshot, i);
+    }
+    return devices;
+}
+
+// 바이너리 형식으로 기기 목록 조회 (params는 /api/web/devices 쿼리 파라미터)
+function fetchFleetSnapshot(params) {
+    const query = new URLSearchParams(Object.assign({}, params, { format: 'binary' }));
+    return fetch('/api/web/devices?' + query.toString(), { credentials: 'same-origin' })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('기기 스냅샷 조회 실패: ' + response.status);
+            }
+            return response.arrayBuffer();
+        })
+        .then(decodeFleetSnapshot);
+}
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+
+from fleet_snapshot import NO_BATTERY, NO_USER, NULL_COORD, NULL_TIME, decode_fleet_snapshot, encode_fleet_snapshot
+
+
+def test_round_trip():
+    updated = datetime(2026, 10, 18, 12, 0, 0)
+    rows = [
+        ('K001', '킥보드', 37.5665, 126.978, 80, 1, updated, 'user1'),
+        ('K002', None, 37.4563, 126.7052, None, 0, datetime(2026, 10, 18, 12, 0, 30), None),
+        ('K003', '자전거', None, None, 150, 0, None, 'user1'),
+    ]
+
+    data = encode_fleet_snapshot(rows, cursor='2026-10-18T12:00:00', removed=['K009'], truncated=True)
+    snapshot = decode_fleet_snapshot(data)
+
+    assert snapshot['cursor'] == '2026-10-18T12:00:00'
+    assert snapshot['truncated'] is True
+    assert snapshot['codes'] == ['K001', 'K002', 'K003']
+    assert snapshot['removed'] == ['K009']
+    assert snapshot['lat'].tolist() == [37566500, 37456300, NULL_COORD]
+    assert snapshot['lng'].tolist() == [126978000, 126705200, NULL_COORD]
+    assert snapshot['base_time'] == updated.timestamp()
+    assert snapshot['updated'].tolist() == [0, 30, NULL_TIME]
+    # 종류/사용자는 사전 번호 (없는 종류는 기본값 킥보드)
+    assert [snapshot['types'][i] for i in snapshot['type']] == ['킥보드', '킥보드', '자전거']
+    assert snapshot['user'].tolist() == [0, NO_USER, 0]
+    assert snapshot['users'] == ['user1']
+    assert snapshot['battery'].tolist() == [80, NO_BATTERY, 100]
+    assert snapshot['is_used'].tolist() == [1, 0, 0]
+
+
+def test_empty_snapshot():
+    snapshot = decode_fleet_snapshot(encode_fleet_snapshot([]))
+
+    assert snapshot['cursor'] is None
+    assert snapshot['truncated'] is False
+    assert snapshot['codes'] == []
+    assert len(snapshot['lat']) == 0
+
+
+def test_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        decode_fleet_snapshot(b'XXXX' + encode_fleet_snapshot([])[4:])
@@ -0,0 +1,44 @@
+import numpy as np
+
+from heatmap import HeatmapGrid, merge_counts
+
+
+def test_bin_counts_points_per_cell_and_skips_invalid():
+    grid = HeatmapGrid(cell_m=250)
+    lat = [37.5000, 37.5001, 37.5100, np.nan]
+    lng = [127.0000, 127.0001, 127.0000, 127.0]
+
+    ids, counts = grid.bin(lat, lng)
+
+    assert counts.sum() == 3
+    assert sorted(counts.tolist()) == [1, 2]
+    assert list(ids) == sorted(ids)
+
+
+def test_cell_centers_are_within_half_a_cell():
+    grid = HeatmapGrid(cell_m=100)
+    lat = np.array([37.5, 33.45, -33.9])
+    lng = np.array([127.0, 126.57, 151.2])
+
+    center_lat, center_lng = grid.cell_centers(grid.cell_ids(lat, lng))
+
+    assert np.all(np.abs(center_lat - lat) <= grid.lat_step / 2)
+    assert np.all(np.abs(center_lng - lng) <= grid.lng_step / 2)
+
+
+def test_merge_counts_adds_shared_cells():
+    ids, counts = merge_counts(np.array([1, 5, 9]), np.array([1, 2, 3]),
+                               np.array([5, 7]), np.array([10, 20]))
+
+    assert ids.tolist() == [1, 5, 7, 9]
+    assert counts.tolist() == [1, 12, 20, 3]
+    assert counts.dtype == np.int64
+
+
+def test_merge_counts_with_empty_side():
+    empty = np.empty(0, dtype=np.int64)
+    ids = np.array([3])
+    counts = np.array([4])
+
+    for merged_ids, merged_counts in (merge_counts(empty, empty, ids, counts), merge_counts(ids, counts, empty, empty)):
+        assert merged_ids is ids and merged_counts is counts
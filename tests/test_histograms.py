@@ -0,0 +1,72 @@
+import numpy as np
+
+from histograms import ValueColumn, age_histogram, battery_histogram, bin_value_counts
+
+
+def test_value_column_counts_values_and_missing():
+    column = ValueColumn('battery')
+    column.rebuild(['a', 'b', 'c', 'd'], [10, 10.4, None, float('nan')])
+    column.set('e', 300)   # MAX_VALUE로 제한
+    column.set('a', 20)
+
+    counts, missing = column.value_counts()
+
+    assert missing == 2
+    assert counts[10] == 1 and counts[20] == 1 and counts[254] == 1
+    assert len(column) == 5
+
+
+def test_value_column_grows_past_capacity():
+    column = ValueColumn('age', capacity=2)
+    column.rebuild([], [])
+    for i in range(3000):
+        column.set(i, 30)
+
+    counts, missing = column.value_counts()
+    assert counts[30] == 3000 and missing == 0
+
+
+def test_value_column_remove_moves_last_value_into_gap():
+    column = ValueColumn('age')
+    column.rebuild(['a', 'b', 'c'], [20, 30, 40])
+    column.remove('a')
+    column.remove('missing')
+    column.set('c', 45)
+    column.set('d', 50)
+
+    counts, missing = column.value_counts()
+    assert len(column) == 3 and missing == 0
+    assert counts[20] == 0 and counts[30] == 1 and counts[45] == 1 and counts[50] == 1
+
+
+def test_bin_value_counts_last_bin_takes_remainder():
+    counts = np.array([1, 2, 3, 4, 5])
+    assert bin_value_counts(counts, [0, 2, 4]).tolist() == [3, 7, 5]
+    assert bin_value_counts(counts, [0, 3]).tolist() == [6, 9]
+
+
+def test_battery_histogram_bins_100_and_above_into_last_bin():
+    column = ValueColumn('battery')
+    column.rebuild(['a', 'b', 'c', 'd', 'e'], [0, 95, 100, 120, None])
+
+    bins, missing = battery_histogram(column)
+
+    assert len(bins) == 10
+    assert bins[0] == {'battery_range': '0-9%', 'count': 1}
+    assert bins[-1] == {'battery_range': '90-100%', 'count': 3}
+    assert sum(b['count'] for b in bins) == 4
+    assert missing == 1
+
+
+def test_age_histogram_labels_and_open_ends():
+    column = ValueColumn('age')
+    column.rebuild(range(5), [15, 25, 29, 70, 88])
+
+    bins, missing = age_histogram(column)
+
+    assert [b['age_group'] for b in bins] == ['10대', '20대', '30대', '40대', '50대', '60대', '70대 이상']
+    assert [b['count'] for b in bins] == [1, 2, 0, 0, 0, 0, 2]
+    assert missing == 0
+
+    bins, _ = age_histogram(column, width=5, min_age=20, max_age=30)
+    assert [b['age_group'] for b in bins] == ['20세 미만', '20-24세', '25-29세', '30세 이상']
@@ -0,0 +1,105 @@
+import time
+from datetime import datetime, timedelta
+
+from ping_buffer import RecentPingBuffer
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def make_fetch(rows):
+    calls = []
+
+    def fetch(after_id, since_time, limit):
+        calls.append(after_id)
+        return [row for row in rows if after_id is None or row[0] > after_id][:limit]
+    return fetch, calls
+
+
+def test_candidates_scores_nearby_pings_and_excludes_reporter():
+    now = datetime.now()
+    fetch, _ = make_fetch([
+        (1, 'K1', 'rider', 37.5001, 127.0, now),
+        (2, 'K2', 'reporter', 37.5, 127.0, now),
+        (3, 'K3', 'far', 37.6, 127.0, now),
+    ])
+    buffer = RecentPingBuffer(fetch)
+    buffer.tail()
+
+    result = buffer.candidates(37.5, 127.0, now, exclude_user='reporter')
+
+    assert [c['user_id'] for c in result] == ['rider']
+    assert buffer.covers(now)
+
+
+def test_tail_stops_and_resets_after_idle():
+    fetch, calls = make_fetch([(1, 'K1', 'rider', 37.5, 127.0, datetime.now())])
+    buffer = RecentPingBuffer(fetch, tail_interval=0.01, idle_seconds=0.1)
+
+    buffer.ensure_started()
+    assert wait_until(lambda: calls)
+    assert wait_until(lambda: not buffer.stats()['running'])
+    assert buffer.stats()['pings'] == 0
+    assert buffer.stats()['watermark'] is None
+
+    # 다시 사용하면 새로 적재
+    buffer.ensure_started()
+    assert buffer.stats()['running']
+    assert wait_until(lambda: buffer.stats()['pings'] == 1)
+    buffer.stop()
+
+
+def test_tail_reloads_when_ids_restart():
+    now = datetime.now()
+    rows = [(5000, 'K1', 'old-rider', 37.5, 127.0, now)]
+    max_id = [5000]
+
+    def fetch(after_id, since_time, limit):
+        return [row for row in rows if after_id is None or row[0] > after_id][:limit]
+
+    buffer = RecentPingBuffer(fetch, position_fn=lambda: (datetime.now(), None, max_id[0]))
+    buffer.tail()
+    assert buffer.stats()['watermark'] == 5000
+
+    # 테이블이 교체되어 id가 1부터 다시 시작
+    rows[:] = [(1, 'K2', 'new-rider', 37.5, 127.0, now)]
+    max_id[0] = 1
+    buffer.tail()
+
+    assert buffer.stats()['watermark'] == 1
+    assert [c['user_id'] for c in buffer.candidates(37.5, 127.0, now)] == ['new-rider']
+
+
+def test_tail_rereads_from_id_recorded_before_oldest_open_transaction():
+    now = datetime.now()
+    rows = [(1, 'K1', 'rider-1', 37.5, 127.0, now), (3, 'K3', 'rider-3', 37.5, 127.0, now)]
+    position = [now, now, 3]
+    fetch, calls = make_fetch(rows)
+    buffer = RecentPingBuffer(fetch, position_fn=lambda: tuple(position))
+
+    # 열린 트랜잭션이 없으면 그 시점의 MAX(id)부터 겹치지 않고 읽음
+    buffer.tail()
+    assert buffer.stats()['safe_id'] == 3
+
+    # id 5가 먼저 커밋되고, id 4를 쓴 트랜잭션은 아직 열려 있음
+    rows.append((5, 'K5', 'rider-5', 37.5, 127.0, now))
+    position[:] = [now + timedelta(seconds=1), now + timedelta(seconds=0.5), 5]
+    buffer.tail()
+    assert calls[-1] == 3
+    assert buffer.stats()['safe_id'] == 3
+
+    # 늦게 커밋된 id 4도 다음 tail에서 읽음
+    rows.insert(2, (4, 'K4', 'rider-4', 37.5, 127.0, now))
+    position[:] = [now + timedelta(seconds=2), now + timedelta(seconds=2), 5]
+    buffer.tail()
+    assert calls[-1] == 3
+    assert buffer.stats()['safe_id'] == 5
+    assert {c['user_id'] for c in buffer.candidates(37.5, 127.0, now)} == {
+        'rider-1', 'rider-3', 'rider-4', 'rider-5'
+    }
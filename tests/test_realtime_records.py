@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from realtime_records import MAX_AGE_SECONDS, MAX_CODE_LENGTH, MAX_FUTURE_SKEW_SECONDS, normalize_realtime_record
+
+NOW = datetime(2025, 10, 1, 12, 0, 0)
+
+
+def record(**overrides):
+    base = {'device_code': 'KICK001', 'user_id': 'user_1', 'lat': 37.5, 'lng': 127.0}
+    base.update(overrides)
+    return base
+
+
+def test_valid_record():
+    normalized, error = normalize_realtime_record(record(ts='2025-10-01T11:59:30'), now=NOW)
+    assert error is None
+    assert normalized == ('KICK001', 'user_1', 37.5, 127.0, datetime(2025, 10, 1, 11, 59, 30))
+
+
+def test_missing_ts_uses_now():
+    normalized, error = normalize_realtime_record(record(), now=datetime.now() + timedelta(seconds=5))
+    assert error is None
+    assert abs((normalized[4] - datetime.now()).total_seconds()) < 5
+
+
+@pytest.mark.parametrize('value', [
+    {'lat': None},
+    {'device_code': ''},
+    {'lat': 'abc'},
+    {'lat': 91},
+    {'lng': -181},
+    {'ts': 'not-a-date'},
+    {'user_id': 'u' * (MAX_CODE_LENGTH + 1)},
+    {'device_code': 'K' * (MAX_CODE_LENGTH + 1)},
+])
+def test_rejects_invalid_fields(value):
+    normalized, error = normalize_realtime_record(record(**value), now=NOW)
+    assert normalized is None
+    assert error
+
+
+def test_small_future_skew_is_clamped_to_now():
+    ts = NOW + timedelta(seconds=MAX_FUTURE_SKEW_SECONDS - 1)
+    normalized, error = normalize_realtime_record(record(ts=ts.isoformat()), now=NOW)
+    assert error is None
+    assert normalized[4] == NOW
+
+
+def test_far_future_is_rejected():
+    ts = NOW + timedelta(seconds=MAX_FUTURE_SKEW_SECONDS + 1)
+    normalized, error = normalize_realtime_record(record(ts=ts.isoformat()), now=NOW)
+    assert normalized is None
+    assert error
+
+
+def test_epoch_in_wrong_unit_is_rejected():
+    # 초 단위 epoch에 1000을 두 번 곱한 값 (마이크로초) -> 변환 불가
+    epoch = datetime(2025, 10, 1, 12, 0, 0).timestamp()
+    normalized, error = normalize_realtime_record(record(ts=epoch * 1e6), now=NOW)
+    assert normalized is None
+    assert error
+
+
+def test_epoch_milliseconds_accepted():
+    now = datetime.now().replace(microsecond=0)
+    normalized, error = normalize_realtime_record(record(ts=now.timestamp() * 1000), now=now)
+    assert error is None
+    assert normalized[4] == now
+
+
+def test_too_old_is_rejected():
+    ts = NOW - timedelta(seconds=MAX_AGE_SECONDS + 1)
+    normalized, error = normalize_realtime_record(record(ts=ts.isoformat()), now=NOW)
+    assert normalized is None
+    assert error
+
+
+def test_custom_bounds():
+    ts = NOW - timedelta(minutes=10)
+    _, error = normalize_realtime_record(record(ts=ts.isoformat()), now=NOW, max_age_seconds=300)
+    assert error
+    _, error = normalize_realtime_record(record(ts=(NOW + timedelta(seconds=30)).isoformat()), now=NOW,
+                                         max_future_skew_seconds=10)
+    assert error
+
+
+def test_aware_timestamp_converted_to_local():
+    ts = datetime(2025, 10, 1, 3, 0, 0, tzinfo=timezone.utc)
+    local = ts.astimezone().replace(tzinfo=None)
+    normalized, error = normalize_realtime_record(record(ts=ts.isoformat()), now=local)
+    assert error is None
+    assert normalized[4] == local
+
+
+def test_code_length_limit_inclusive():
+    normalized, error = normalize_realtime_record(record(user_id='u' * MAX_CODE_LENGTH, ts=NOW.isoformat()), now=NOW)
+    assert error is None
+    assert normalized[1] == 'u' * MAX_CODE_LENGTH
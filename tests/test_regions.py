@@ -0,0 +1,55 @@
+import pytest
+
+from regions import DEFAULT_REGION_FILE, REGION_OTHER, RegionIndex
+
+# (위도, 경도, 지역)
+SAMPLES = [
+    (37.5665, 126.9780, '서울시'),   # 시청
+    (37.4560, 126.7050, '인천시'),   # 인천시청
+    (37.4800, 126.6200, '인천시'),
+    (37.2636, 127.0286, '경기도'),   # 수원
+    (35.1796, 129.0756, REGION_OTHER),   # 부산
+]
+
+
+@pytest.fixture(scope='module')
+def polygon_index():
+    return RegionIndex.from_geojson(DEFAULT_REGION_FILE)
+
+
+@pytest.mark.parametrize('lat, lng, expected', SAMPLES)
+def test_geojson_boundaries(polygon_index, lat, lng, expected):
+    assert polygon_index.lookup(lat, lng) == expected
+
+
+def test_incheon_is_reachable_in_fallback_boxes():
+    # 기존 CASE 식은 경기도 범위가 인천시보다 먼저 와서 인천시가 집계되지 않았음
+    index = RegionIndex.from_boxes()
+    assert index.names == ('서울시', '인천시', '경기도')
+    assert index.lookup(37.456, 126.705) == '인천시'
+    assert index.lookup(37.5665, 126.978) == '서울시'
+    assert index.lookup(37.2636, 127.0286) == '경기도'
+
+
+def test_missing_coordinates_are_other(polygon_index):
+    assert polygon_index.lookup(None, 127.0) == REGION_OTHER
+    assert polygon_index.lookup(37.5, None) == REGION_OTHER
+
+
+def test_boundary_cells_use_exact_polygon_test():
+    # 대각선 경계가 지나는 삼각형: 같은 칸 안에서도 선 양쪽이 다르게 분류돼야 함
+    triangle = [[(127.0, 37.0), (127.1, 37.0), (127.0, 37.1)]]
+    index = RegionIndex([('A', [triangle])], cell_deg=0.1)
+
+    assert index.lookup(37.01, 127.01) == 'A'
+    assert index.lookup(37.09, 127.09) == REGION_OTHER
+    assert index.stats()['boundary_cells'] >= 1
+
+
+def test_hole_is_excluded():
+    outer = [(126.0, 37.0), (128.0, 37.0), (128.0, 38.0), (126.0, 38.0)]
+    hole = [(126.9, 37.4), (127.1, 37.4), (127.1, 37.6), (126.9, 37.6)]
+    index = RegionIndex([('ring', [[outer, hole]])], cell_deg=0.05)
+
+    assert index.lookup(37.2, 126.5) == 'ring'
+    assert index.lookup(37.5, 127.0) == REGION_OTHER
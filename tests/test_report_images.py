@@ -0,0 +1,50 @@
+import base64
+import struct
+
+from report_images import decode_report_image, image_dimensions, image_mimetype
+
+PNG_1x1 = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+def test_decode_base64_and_data_url():
+    encoded = base64.b64encode(PNG_1x1).decode()
+    assert decode_report_image(encoded) == PNG_1x1
+    assert decode_report_image('data:image/png;base64,' + encoded) == PNG_1x1
+    assert decode_report_image(encoded.encode()) == PNG_1x1
+
+
+def test_decode_raw_bytes():
+    assert decode_report_image(PNG_1x1) == PNG_1x1
+
+
+def test_decode_rejects_non_image_values():
+    assert decode_report_image(None) is None
+    assert decode_report_image('') is None
+    # Base64로는 디코딩되지만 이미지가 아닌 값
+    assert decode_report_image('hello world') is None
+    assert decode_report_image(base64.b64encode(b'just some text').decode()) is None
+
+
+def test_mimetype_signatures():
+    assert image_mimetype(PNG_1x1) == 'image/png'
+    assert image_mimetype(b'\xff\xd8\xff\xe0' + b'\x00' * 8) == 'image/jpeg'
+    assert image_mimetype(b'RIFF\x00\x00\x00\x00WEBPVP8 ') == 'image/webp'
+    assert image_mimetype(b'\x00\x00\x00\x18ftypheic') == 'image/heic'
+    assert image_mimetype(b'unknown', None) is None
+
+
+def test_png_dimensions():
+    assert image_dimensions(PNG_1x1) == (1, 1)
+
+
+def test_jpeg_dimensions():
+    # SOI + APP0(길이 16) + SOF0(높이 480, 너비 640)
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof0 = b'\xff\xc0' + struct.pack('>HBHH', 17, 8, 480, 640) + b'\x00' * 10
+    assert image_dimensions(b'\xff\xd8' + app0 + sof0) == (640, 480)
+
+
+def test_unknown_dimensions():
+    assert image_dimensions(b'not an image') == (None, None)
@@ -0,0 +1,91 @@
+import threading
+
+from retry_queue import RetryQueue
+
+
+def test_retries_with_backoff_until_success():
+    attempts = []
+    done = threading.Event()
+
+    def handle(key, attempt):
+        attempts.append((key, attempt))
+        if attempt < 3:
+            return False
+        done.set()
+        return True
+
+    queue = RetryQueue(handle, retry_delays=(0.01, 0.01, 0.01))
+    assert queue.submit('r1')
+    assert done.wait(5)
+
+    assert attempts == [('r1', 1), ('r1', 2), ('r1', 3)]
+    stats = queue.stats()
+    assert stats['succeeded'] == 1
+    assert stats['retried'] == 2
+    assert stats['given_up'] == 0
+
+
+def test_gives_up_after_retry_delays_and_treats_exceptions_as_failure():
+    gave_up = []
+    done = threading.Event()
+
+    def handle(key, attempt):
+        raise RuntimeError('db down')
+
+    def give_up(key, attempt):
+        gave_up.append((key, attempt))
+        done.set()
+
+    queue = RetryQueue(handle, give_up_fn=give_up, retry_delays=(0.01, 0.02))
+    queue.submit('r1')
+    assert done.wait(5)
+
+    # 첫 시도 + 재시도 2번 후 포기
+    assert gave_up == [('r1', 3)]
+    stats = queue.stats()
+    assert stats['retried'] == 2
+    assert stats['given_up'] == 1
+
+
+def test_duplicate_keys_are_ignored_and_full_queue_drops():
+    started = threading.Event()
+    release = threading.Event()
+
+    def handle(key, attempt):
+        started.set()
+        release.wait(5)
+        return True
+
+    queue = RetryQueue(handle, max_queue=1)
+    queue.submit('busy')
+    assert started.wait(5)              # 스레드가 busy를 처리 중
+    assert queue.submit('a', delay=60)
+    assert queue.submit('a', delay=60)  # 대기 중인 키는 무시 (True)
+    assert queue.submit('b') is False   # max_queue 초과
+    release.set()
+
+    stats = queue.stats()
+    assert stats['queued'] == 1
+    assert stats['dropped'] == 1
+
+
+def test_sweep_requeues_missed_work():
+    handled = []
+    done = threading.Event()
+    sweeps = [[('lost', 2)]]
+
+    def handle(key, attempt):
+        handled.append((key, attempt))
+        done.set()
+        return True
+
+    def sweep():
+        return sweeps.pop() if sweeps else []
+
+    queue = RetryQueue(handle, sweep_fn=sweep, sweep_interval=0.01)
+    queue.ensure_started()
+    assert done.wait(5)
+
+    # 이전 워커가 2번 시도한 작업은 3번째 시도로 이어서 처리
+    assert handled == [('lost', 3)]
+    assert queue.stats()['swept'] == 1
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlightCache
+
+
+def test_concurrent_misses_compute_once():
+    cache = SingleFlightCache(max_age=60)
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('k', compute)[0])) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ['value'] * 5
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats['computes'] == 1
+    assert stats['waits'] == 4
+
+
+def test_expired_entry_serves_stale_while_recomputing():
+    cache = SingleFlightCache(max_age=60)
+    cache.get('k', lambda: 'old')
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_compute():
+        started.set()
+        release.wait(5)
+        return 'new'
+
+    leader = threading.Thread(target=lambda: cache.get('k', slow_compute, max_age=0))
+    leader.start()
+    assert started.wait(5)
+
+    value, age = cache.get('k', slow_compute, max_age=0)
+    assert value == 'old'
+    release.set()
+    leader.join(5)
+
+    assert cache.get('k', slow_compute)[0] == 'new'
+    assert cache.stats()['stale_hits'] == 1
+
+
+def test_errors_propagate_and_are_not_cached():
+    cache = SingleFlightCache()
+
+    def broken():
+        raise RuntimeError('query failed')
+
+    with pytest.raises(RuntimeError):
+        cache.get('k', broken)
+    assert cache.get('k', lambda: 1) == (1, 0.0)
+    assert cache.stats()['errors'] == 1
+
+
+def test_max_entries_evicts_oldest_and_invalidate():
+    cache = SingleFlightCache(max_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.get(key, lambda: key)
+
+    assert cache.stats()['entries'] == 2
+    assert cache.get('a', lambda: 'recomputed')[0] == 'recomputed'
+
+    cache.invalidate('a')
+    assert cache.get('a', lambda: 'again')[0] == 'again'
+    cache.invalidate()
+    assert cache.stats()['entries'] == 0
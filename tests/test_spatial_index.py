@@ -0,0 +1,63 @@
+from spatial_index import GridIndex
+
+
+def test_nearest_orders_by_distance_within_radius():
+    index = GridIndex(cell_size_m=250)
+    index.rebuild([
+        ('near', 37.5001, 127.0, {'n': 1}),
+        ('mid', 37.5050, 127.0, {'n': 2}),
+        ('far', 37.6, 127.0, {'n': 3}),
+        ('no-location', None, None, None),
+    ])
+
+    result = index.nearest(37.5, 127.0, 1000, limit=10)
+
+    assert [code for _, code, _, _, _ in result] == ['near', 'mid']
+    assert result[0][2:] == (37.5001, 127.0, {'n': 1})
+    assert 'no-location' not in index
+
+
+def test_nearest_respects_limit():
+    index = GridIndex()
+    index.rebuild((f'd{i}', 37.5 + i * 0.0001, 127.0, None) for i in range(10))
+
+    assert [code for _, code, _, _, _ in index.nearest(37.5, 127.0, 5000, limit=3)] == ['d0', 'd1', 'd2']
+
+
+def test_move_across_cells_updates_search():
+    index = GridIndex(cell_size_m=100)
+    index.rebuild([('a', 37.5, 127.0, None)])
+
+    assert index.move('a', 37.51, 127.0)
+    assert not index.move('missing', 37.5, 127.0)
+    assert index.nearest(37.5, 127.0, 100) == []
+    assert [code for _, code, _, _, _ in index.nearest(37.51, 127.0, 100)] == ['a']
+
+
+def test_updates_during_rebuild_are_replayed_on_new_snapshot():
+    index = GridIndex()
+    index.rebuild([('a', 37.5, 127.0, None), ('b', 37.5, 127.0, None)])
+
+    index.begin_rebuild()
+    # 스냅샷 조회 이후 다른 요청에서 들어온 갱신
+    index.move('a', 37.51, 127.0)
+    index.remove('b')
+    index.upsert('c', 37.52, 127.0, {'battery_level': 80})
+    # 스냅샷은 조회 시점 값 (b가 아직 있고 a는 예전 위치)
+    index.rebuild([('a', 37.5, 127.0, None), ('b', 37.5, 127.0, None)])
+
+    assert 'b' not in index
+    assert index.nearest(37.51, 127.0, 10)[0][1] == 'a'
+    assert index.nearest(37.52, 127.0, 10)[0][4] == {'battery_level': 80}
+
+
+def test_abort_rebuild_stops_recording():
+    index = GridIndex()
+    index.rebuild([('a', 37.5, 127.0, None)])
+
+    index.begin_rebuild()
+    index.remove('a')
+    index.abort_rebuild()
+    index.rebuild([('a', 37.5, 127.0, None)])
+
+    assert 'a' in index
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from timestamps import parse_client_timestamp, parse_local_datetime
+
+
+def test_parse_local_datetime_returns_naive_local_time_for_aware_input():
+    parsed = parse_local_datetime('2026-10-18T03:00:00Z')
+
+    expected = datetime(2026, 10, 18, 3, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    assert parsed == expected
+    assert parsed.tzinfo is None
+    # 기본값(naive)과 비교해도 TypeError가 나지 않아야 함
+    assert parsed < datetime(2100, 1, 1)
+
+
+def test_parse_local_datetime_keeps_naive_and_date_only_input():
+    assert parse_local_datetime('2026-10-18T09:30') == datetime(2026, 10, 18, 9, 30)
+    assert parse_local_datetime('2026-10-18') == datetime(2026, 10, 18)
+
+
+def test_parse_local_datetime_rejects_bad_format():
+    with pytest.raises(ValueError):
+        parse_local_datetime('yesterday')
+
+
+def test_parse_client_timestamp_accepts_epoch_seconds_and_milliseconds():
+    expected = datetime.fromtimestamp(1760000000)
+
+    assert parse_client_timestamp(1760000000) == expected
+    assert parse_client_timestamp(1760000000000) == expected
+    assert parse_client_timestamp(1760000000.5) == datetime.fromtimestamp(1760000000.5)
+
+
+def test_parse_client_timestamp_converts_strings_and_datetimes_to_local_naive():
+    aware = datetime(2026, 10, 18, 3, tzinfo=timezone.utc)
+    expected = aware.astimezone().replace(tzinfo=None)
+
+    assert parse_client_timestamp('2026-10-18T03:00:00Z') == expected
+    assert parse_client_timestamp(aware) == expected
+    assert parse_client_timestamp('2026-10-18T12:00:00') == datetime(2026, 10, 18, 12)
+
+
+def test_parse_client_timestamp_defaults_to_now_and_rejects_garbage():
+    before = datetime.now()
+    assert before <= parse_client_timestamp(None) <= datetime.now()
+    assert before <= parse_client_timestamp('') <= datetime.now()
+    with pytest.raises(ValueError):
+        parse_client_timestamp('not a time')
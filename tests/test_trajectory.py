@@ -0,0 +1,48 @@
+import numpy as np
+
+from trajectory import (decode_deltas, decode_polyline, downsample_by_time, encode_deltas, encode_polyline,
+                        simplify_douglas_peucker)
+
+
+def test_polyline_round_trip():
+    points = [(37.566500, 126.978000), (37.566612, 126.978345), (37.565001, 126.977999), (-33.9, 151.2)]
+
+    decoded = decode_polyline(encode_polyline(points))
+
+    assert np.allclose(decoded, points, atol=1e-6)
+
+
+def test_polyline_matches_reference_encoding():
+    # Google 예제 (정밀도 1e-5)
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(points, precision=5) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+
+
+def test_deltas_round_trip():
+    values = [0, 3, 3, 10, 7, 3600]
+    assert decode_deltas(encode_deltas(values)) == values
+
+
+def test_downsample_keeps_first_point_per_interval_and_last():
+    t = [0, 1, 4, 5, 9, 10, 11]
+    assert downsample_by_time(t, 5).tolist() == [0, 3, 5, 6]
+    assert downsample_by_time([0, 1], 5).tolist() == [0, 1]
+
+
+def test_simplify_drops_collinear_points_and_keeps_corners():
+    # 동쪽으로 직선 이동 후 북쪽으로 꺾임 (약 0.0001도 = 9~11m 간격)
+    lat = [37.5] * 11 + [37.5 + 0.0001 * i for i in range(1, 11)]
+    lng = [127.0 + 0.0001 * i for i in range(11)] + [127.001] * 10
+
+    keep = simplify_douglas_peucker(lat, lng, tolerance_m=1.0)
+
+    assert keep.tolist() == [0, 10, 20]
+
+
+def test_simplify_keeps_points_beyond_tolerance():
+    lat = [37.5, 37.5002, 37.5]
+    lng = [127.0, 127.001, 127.002]
+
+    assert simplify_douglas_peucker(lat, lng, tolerance_m=5.0).tolist() == [0, 1, 2]
+    assert simplify_douglas_peucker(lat, lng, tolerance_m=50.0).tolist() == [0, 2]
+    assert simplify_douglas_peucker(lat, lng, tolerance_m=0).tolist() == [0, 1, 2]
@@ -0,0 +1,118 @@
+import threading
+
+from write_behind import WriteBehindQueue
+
+
+def make_transactional_flush(bad=(), calls=None):
+    """배치 전체를 한 트랜잭션으로 저장하는 flush_fn 흉내 (bad 레코드가 하나라도 있으면 전체 실패)"""
+    stored = []
+
+    def flush(records):
+        if calls is not None:
+            calls.append(list(records))
+        if any(record in bad for record in records):
+            return [{'index': i, 'status': 'failed', 'error': 'Data too long'} for i in range(len(records))]
+        stored.extend(records)
+        return [{'index': i, 'status': 'stored'} for i in range(len(records))]
+
+    return flush, stored
+
+
+def drain(queue, records):
+    for record in records:
+        assert queue.put(record)
+    queue.stop()
+    return queue.stats()
+
+
+def test_stores_all_records():
+    flush, stored = make_transactional_flush()
+    queue = WriteBehindQueue(flush, batch_size=100, flush_interval=0.05, max_retries=3)
+    stats = drain(queue, range(10))
+    assert sorted(stored) == list(range(10))
+    assert stats['flushed'] == 10
+    assert stats['dropped'] == 0
+
+
+def test_bad_record_is_isolated_and_dropped_after_retries():
+    flush, stored = make_transactional_flush(bad={3})
+    queue = WriteBehindQueue(flush, batch_size=100, flush_interval=0.05, max_retries=3)
+    stats = drain(queue, range(10))
+    assert sorted(stored) == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+    assert stats['flushed'] == 9
+    assert stats['dropped'] == 1
+    assert stats['retried'] == 2
+    assert stats['last_error'] == 'Data too long'
+
+
+def test_two_bad_records_in_different_halves():
+    flush, stored = make_transactional_flush(bad={1, 8})
+    queue = WriteBehindQueue(flush, batch_size=100, flush_interval=0.05, max_retries=1)
+    stats = drain(queue, range(10))
+    # 두 쪽이 모두 전부 실패하면 장애로 보고 나누지 않으므로 같은 배치의 나머지도 이번에는 버려짐
+    assert stats['flushed'] + stats['dropped'] == 10
+    assert 1 not in stored and 8 not in stored
+
+
+def test_outage_does_not_split_endlessly():
+    calls = []
+
+    def failing_flush(records):
+        calls.append(len(records))
+        raise RuntimeError('connection refused')
+
+    queue = WriteBehindQueue(failing_flush, batch_size=100, flush_interval=0.05, max_retries=3)
+    stats = drain(queue, range(64))
+    assert stats['dropped'] == 64
+    assert stats['flushed'] == 0
+    assert stats['last_error'] == 'connection refused'
+    # 재시도마다 전체 1번 + 반씩 2번만 호출
+    assert len(calls) == 3 * 3
+
+
+def test_rejected_records_are_not_retried():
+    def flush(records):
+        return [{'index': i, 'status': 'rejected', 'error': 'invalid'} for i in range(len(records))]
+
+    queue = WriteBehindQueue(flush, batch_size=100, flush_interval=0.05, max_retries=3)
+    stats = drain(queue, range(5))
+    assert stats['invalid'] == 5
+    assert stats['retried'] == 0
+    assert stats['dropped'] == 0
+
+
+def test_put_returns_false_when_full():
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_flush(records):
+        started.set()
+        release.wait(5)
+        return [{'index': i, 'status': 'stored'} for i in range(len(records))]
+
+    queue = WriteBehindQueue(slow_flush, max_size=1, batch_size=1, flush_interval=0.01, put_timeout=0.01)
+    assert queue.put('x')
+    assert started.wait(5)       # 백그라운드 스레드가 x를 꺼내 저장 중
+    assert queue.put('y')        # 큐에 1건
+    assert queue.put('z') is False
+    release.set()
+    stats = drain(queue, [])
+    assert stats['rejected'] == 1
+    assert stats['flushed'] == 2
+
+
+def test_transient_failure_is_retried_and_stored():
+    calls = []
+
+    def flush(records):
+        calls.append(len(records))
+        # 첫 주기(전체 1번 + 반씩 2번)는 장애로 모두 실패, 다음 주기부터 정상
+        if len(calls) <= 3:
+            raise RuntimeError('deadlock')
+        return [{'index': i, 'status': 'stored'} for i in range(len(records))]
+
+    queue = WriteBehindQueue(flush, batch_size=100, flush_interval=0.05, max_retries=3)
+    stats = drain(queue, range(8))
+    assert stats['flushed'] == 8
+    assert stats['dropped'] == 0
+    assert stats['retried'] == 8
@@ -0,0 +1,180 @@
+import io
+import os
+import queue
+import threading
+import time
+import uuid
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow가 없으면 썸네일 없이 원본만 제공
+    Image = None
+    ImageOps = None
+
+# 신고 사진 썸네일 (EXIF 방향 보정 + 크기별 JPEG)
+#
+# 썸네일은 원본 SHA-256 해시와 크기로 이름을 정해 디스크에 캐시하므로 원본이 같으면 한 번만 만든다.
+# 신고 접수 시 ThumbnailWorkerPool에 해시를 넣으면 백그라운드 스레드가 모든 크기를 미리 만든다.
+
+# 기본 저장 위치 (앱 디렉터리 아래, 재부팅 후 다시 만들지 않도록)
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'storage', 'thumbnails')
+
+# 긴 변 기준 썸네일 크기 (목록/상세 미리보기)
+THUMBNAIL_SIZES = (200, 800)
+THUMBNAIL_QUALITY = 82
+
+
+def thumbnails_available():
+    return Image is not None
+
+
+def make_thumbnail(data, size, quality=THUMBNAIL_QUALITY):
+    """이미지 바이트를 EXIF 방향대로 돌린 뒤 긴 변이 size 이하인 JPEG 바이트로 변환"""
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.thumbnail((size, size), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=quality, optimize=True)
+        return output.getvalue()
+
+
+class ThumbnailCache:
+    """{directory}/{해시 앞 2자}/{해시}_{크기}.jpg 파일 캐시"""
+
+    def __init__(self, directory=None):
+        self.directory = os.path.abspath(directory or DEFAULT_DIRECTORY)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, digest, size):
+        if len(digest) != 64 or any(c not in '0123456789abcdef' for c in digest):
+            raise ValueError(f"잘못된 해시: {digest}")
+        return os.path.join(self.directory, digest[:2], f"{digest}_{int(size)}.jpg")
+
+    def get(self, digest, size):
+        try:
+            with open(self.path(digest, size), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, digest, size):
+        return os.path.exists(self.path(digest, size))
+
+    def put(self, digest, size, data):
+        path = self.path(digest, size)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def generate_thumbnails(cache, blob_store, digest, sizes=THUMBNAIL_SIZES, force=False):
+    """원본(blob_store)에서 없는 크기의 썸네일을 만들어 캐시, 만든 개수 반환 (원본이 없으면 None)"""
+    missing = [size for size in sizes if force or not cache.exists(digest, size)]
+    if not missing:
+        return 0
+    data = blob_store.get(digest)
+    if data is None:
+        return None
+    for size in missing:
+        cache.put(digest, size, make_thumbnail(data, size))
+    return len(missing)
+
+
+class ThumbnailWorkerPool:
+    """썸네일 생성 백그라운드 스레드 풀 (워커 프로세스별, fork 이후 첫 submit 때 시작)
+
+    submit()은 해시를 큐에 넣고 바로 반환하며, 큐가 가득 차면 버린다 (조회 시 즉석 생성으로 보완).
+    같은 해시가 처리 중이거나 대기 중이면 다시 넣지 않는다.
+    """
+
+    def __init__(self, cache, blob_store, workers=2, max_queue=1000, sizes=THUMBNAIL_SIZES, name='thumbnail-worker'):
+        self.cache = cache
+        self.blob_store = blob_store
+        self.workers = workers
+        self.sizes = sizes
+        self.name = name
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+
+        self._submitted = 0
+        self._dropped = 0
+        self._generated = 0
+        self._failed = 0
+        self._last_ms = None
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+                return
+            if self._pid != os.getpid():
+                # fork 이전 부모 프로세스의 대기 목록은 이 프로세스에서 처리되지 않음
+                self._pending.clear()
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._pid = os.getpid()
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, digest):
+        """썸네일 생성 요청 (생성 불가/큐 가득 참이면 False)"""
+        if not thumbnails_available() or not digest:
+            return False
+        self._ensure_started()
+        with self._lock:
+            if digest in self._pending:
+                return True
+            try:
+                self._queue.put_nowait(digest)
+            except queue.Full:
+                self._dropped += 1
+                return False
+            self._pending.add(digest)
+            self._submitted += 1
+        return True
+
+    def _run(self):
+        while True:
+            digest = self._queue.get()
+            started = time.monotonic()
+            try:
+                count = generate_thumbnails(self.cache, self.blob_store, digest, self.sizes)
+                with self._lock:
+                    self._generated += count or 0
+                    self._last_ms = (time.monotonic() - started) * 1000
+            except Exception as e:
+                with self._lock:
+                    self._failed += 1
+                print(f"[{self.name}] 썸네일 생성 오류 ({digest}): {str(e)}")
+            finally:
+                with self._lock:
+                    self._pending.discard(digest)
+                self._queue.task_done()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'available': thumbnails_available(),
+                'workers': len([t for t in self._threads if t.is_alive()]) if self._pid == os.getpid() else 0,
+                'queued': self._queue.qsize(),
+                'submitted': self._submitted,
+                'dropped': self._dropped,
+                'generated': self._generated,
+                'failed': self._failed,
+                'last_ms': round(self._last_ms, 1) if self._last_ms is not None else None
+            }
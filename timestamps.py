@@ -0,0 +1,32 @@
+from datetime import datetime
+
+# 클라이언트/쿼리 문자열 시각 처리
+#
+# DB의 DATETIME 값(now_time, report_time 등)은 서버 로컬 기준 naive 시각이므로
+# 시간대가 붙은 입력은 서버 로컬 시각으로 바꾼 뒤 시간대를 떼어 비교한다.
+
+
+def to_local_naive(dt):
+    """시간대가 있는 datetime을 서버 로컬 naive 시각으로 변환 (naive는 그대로)"""
+    if dt.tzinfo is not None:
+        return dt.astimezone().replace(tzinfo=None)
+    return dt
+
+
+def parse_local_datetime(value):
+    """YYYY-MM-DD[THH:MM[:SS]][+09:00] 문자열을 서버 로컬 naive 시각으로 변환 (형식 오류는 ValueError)"""
+    return to_local_naive(datetime.fromisoformat(str(value).replace('Z', '+00:00')))
+
+
+def parse_client_timestamp(ts):
+    """클라이언트가 보낸 시각(ISO 8601 문자열 또는 epoch 초/밀리초)을 서버 로컬 시각으로 변환"""
+    if ts is None or ts == '':
+        return datetime.now()
+    if isinstance(ts, datetime):
+        return to_local_naive(ts)
+    if isinstance(ts, (int, float)) and not isinstance(ts, bool):
+        # 밀리초 단위 epoch도 허용
+        if ts > 1e11:
+            ts = ts / 1000.0
+        return datetime.fromtimestamp(ts)
+    return parse_local_datetime(ts)
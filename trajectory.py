@@ -0,0 +1,210 @@
+# 주행 궤적 인코딩/축소 유틸리티
+#
+# 좌표는 Google Encoded Polyline 형식(정밀도 1e-6)으로, 시각은 시작 시각 기준 초 단위 차분을
+# 같은 가변 길이 문자 인코딩으로 저장한다. 모두 ASCII 문자열이라 TEXT 컬럼에 그대로 담을 수 있다.
+
+import numpy as np
+from sqlalchemy import text
+
+from geo import EARTH_RADIUS_M
+
+POLYLINE_PRECISION = 6
+
+# Douglas-Peucker 기본 허용 오차 (미터, 운영 값은 TRAJECTORY_TOLERANCE_M 환경 변수로 app.py에서 지정)
+DEFAULT_TOLERANCE_M = 5.0
+
+
+def _encode_signed(value, out):
+    value = ~(value << 1) if value < 0 else (value << 1)
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def _decode_signed(encoded, index):
+    result = 0
+    shift = 0
+    while True:
+        b = ord(encoded[index]) - 63
+        index += 1
+        result |= (b & 0x1f) << shift
+        shift += 5
+        if b < 0x20:
+            break
+    value = ~(result >> 1) if result & 1 else (result >> 1)
+    return value, index
+
+
+def encode_polyline(points, precision=POLYLINE_PRECISION):
+    """[(lat, lng), ...] 좌표 목록을 encoded polyline 문자열로 변환"""
+    factor = 10 ** precision
+    out = []
+    prev_lat = 0
+    prev_lng = 0
+    for lat, lng in points:
+        lat_i = int(round(lat * factor))
+        lng_i = int(round(lng * factor))
+        _encode_signed(lat_i - prev_lat, out)
+        _encode_signed(lng_i - prev_lng, out)
+        prev_lat = lat_i
+        prev_lng = lng_i
+    return ''.join(out)
+
+
+def decode_polyline(encoded, precision=POLYLINE_PRECISION):
+    """encoded polyline 문자열을 [(lat, lng), ...] 좌표 목록으로 변환"""
+    factor = 10 ** precision
+    points = []
+    index = 0
+    lat = 0
+    lng = 0
+    while index < len(encoded):
+        dlat, index = _decode_signed(encoded, index)
+        dlng, index = _decode_signed(encoded, index)
+        lat += dlat
+        lng += dlng
+        points.append((lat / factor, lng / factor))
+    return points
+
+
+def encode_deltas(values):
+    """정수 목록을 차분 후 같은 문자 인코딩으로 변환 (시각 오프셋 저장용)"""
+    out = []
+    prev = 0
+    for value in values:
+        _encode_signed(int(value) - prev, out)
+        prev = int(value)
+    return ''.join(out)
+
+
+def decode_deltas(encoded):
+    """encode_deltas로 만든 문자열을 정수 목록으로 복원"""
+    values = []
+    index = 0
+    current = 0
+    while index < len(encoded):
+        delta, index = _decode_signed(encoded, index)
+        current += delta
+        values.append(current)
+    return values
+
+
+def downsample_by_time(t, interval_seconds):
+    """시간 구간(interval_seconds)마다 첫 점만 남기고 마지막 점은 항상 유지, 남길 점의 인덱스 배열 반환
+
+    t: 시각순으로 정렬된 초 단위 배열
+    """
+    t = np.asarray(t, dtype=np.float64)
+    if t.size <= 2:
+        return np.arange(t.size)
+
+    buckets = np.floor((t - t[0]) / interval_seconds)
+    keep = np.empty(t.size, dtype=bool)
+    keep[0] = True
+    keep[1:] = buckets[1:] != buckets[:-1]
+    keep[-1] = True
+    return np.flatnonzero(keep)
+
+
+def simplify_douglas_peucker(lat, lng, tolerance_m=DEFAULT_TOLERANCE_M):
+    """Douglas-Peucker 알고리즘으로 경로 축소, 남길 점의 인덱스 배열 반환
+
+    첫 점 기준 평면(미터) 좌표로 근사해 각 구간의 선분과 가장 먼 점이 tolerance_m 이내가 될 때까지 분할한다.
+    재귀 대신 스택을 쓰고 구간 안의 거리 계산은 배열 연산으로 처리한다.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    n = lat.size
+    if n <= 2 or tolerance_m <= 0:
+        return np.arange(n)
+
+    y = np.radians(lat - lat[0]) * EARTH_RADIUS_M
+    x = np.radians(lng - lng[0]) * EARTH_RADIUS_M * np.cos(np.radians(lat[0]))
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = True
+    keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        px = x[first + 1:last] - x[first]
+        py = y[first + 1:last] - y[first]
+        dx = x[last] - x[first]
+        dy = y[last] - y[first]
+        length_sq = dx * dx + dy * dy
+        if length_sq > 0:
+            # 점에서 선분까지의 거리 (선분 밖으로 벗어나는 점은 끝점까지의 거리)
+            u = np.clip((px * dx + py * dy) / length_sq, 0.0, 1.0)
+            dist = np.hypot(px - u * dx, py - u * dy)
+        else:
+            dist = np.hypot(px, py)
+
+        farthest = int(np.argmax(dist))
+        if dist[farthest] > tolerance_m:
+            index = first + 1 + farthest
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return np.flatnonzero(keep)
+
+
+def save_ride_trajectory(session, use_log_id, lat, lng, t, method, tolerance, raw_point_count):
+    """축소된 궤적을 ride_trajectory에 저장 (이미 있으면 유지), t는 대여 시작 시각 기준 경과 초"""
+    session.execute(text("""
+        INSERT INTO ride_trajectory (
+            USE_LOG_ID, DEVICE_CODE, USER_ID, start_time, end_time,
+            method, tolerance, raw_point_count, point_count, polyline, time_offsets
+        )
+        SELECT id, DEVICE_CODE, USER_ID, start_time, end_time,
+               :method, :tolerance, :raw_point_count, :point_count, :polyline, :time_offsets
+        FROM device_use_log
+        WHERE id = :use_log_id
+        ON DUPLICATE KEY UPDATE USE_LOG_ID = ride_trajectory.USE_LOG_ID
+    """), {
+        'use_log_id': use_log_id,
+        'method': method,
+        'tolerance': tolerance,
+        'raw_point_count': raw_point_count,
+        'point_count': len(lat),
+        'polyline': encode_polyline(zip(np.asarray(lat).tolist(), np.asarray(lng).tolist())),
+        'time_offsets': encode_deltas(np.rint(t).astype(np.int64).tolist())
+    })
+
+
+def compress_ride_trajectory(session, use_log_id, lat, lng, t, tolerance_m=DEFAULT_TOLERANCE_M):
+    """주행 1건의 실시간 로그를 Douglas-Peucker로 축소해 저장하고 압축 결과 반환"""
+    keep = simplify_douglas_peucker(lat, lng, tolerance_m)
+    save_ride_trajectory(session, use_log_id, lat[keep], lng[keep], t[keep],
+                         'douglas_peucker', tolerance_m, len(t))
+    raw_count = int(len(t))
+    kept_count = int(len(keep))
+    return {
+        'raw_point_count': raw_count,
+        'point_count': kept_count,
+        'tolerance_m': tolerance_m,
+        'compression_ratio': round(raw_count / kept_count, 2) if kept_count else None
+    }
+
+
+def load_ride_trajectory(session, use_log_id):
+    """저장된 궤적을 복원 (없으면 None)"""
+    row = session.execute(text("""
+        SELECT USE_LOG_ID, DEVICE_CODE, USER_ID, start_time, end_time, method, tolerance,
+               raw_point_count, point_count, polyline, time_offsets
+        FROM ride_trajectory
+        WHERE USE_LOG_ID = :use_log_id
+    """), {'use_log_id': use_log_id}).mappings().first()
+    if not row:
+        return None
+
+    trajectory = dict(row)
+    trajectory['points'] = [
+        (lat, lng, offset)
+        for (lat, lng), offset in zip(decode_polyline(row['polyline']), decode_deltas(row['time_offsets']))
+    ]
+    return trajectory
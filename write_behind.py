@@ -0,0 +1,265 @@
+import atexit
+import os
+import queue
+import signal
+import threading
+import time
+
+
+class WriteBehindQueue:
+    """프로세스 내부 쓰기 지연(write-behind) 버퍼
+
+    요청 스레드는 put()으로 레코드를 큐에 넣고 바로 반환하며,
+    백그라운드 스레드가 batch_size개가 모이거나 flush_interval초가 지나면
+    flush_fn(records)을 호출해 한 트랜잭션으로 저장한다.
+    큐가 가득 차면 put()이 put_timeout초 동안 기다린 뒤 False를 반환한다(배압).
+    배치가 실패하면 반씩 나눠 다시 저장해 DB에서 실패하는 레코드만 골라내고,
+    그 레코드만 다음 주기에 max_retries번까지 재시도한다.
+    """
+
+    def __init__(self, flush_fn, max_size=10000, batch_size=500, flush_interval=2.0,
+                 put_timeout=0.5, max_retries=3, name='write-behind'):
+        self.flush_fn = flush_fn
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.name = name
+
+        self._queue = queue.Queue(maxsize=max_size)
+        self._flush_lock = threading.RLock()
+        self._stats_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flush_requested = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._hooks_installed = False
+
+        self._enqueued = 0
+        self._rejected = 0
+        self._flushed = 0
+        self._retried = 0
+        self._invalid = 0
+        self._dropped = 0
+        self._flush_count = 0
+        self._split_count = 0
+        self._last_error = None
+        self._last_flush_ms = None
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+        self._last_flush_at = None
+
+        # 요청 스레드(gthread 워커)에서 처음 put()될 때는 시그널 처리기를 등록할 수 없으므로 생성 시 등록
+        self._install_hooks()
+
+    # 백그라운드 스레드 시작 (fork 이후 자식 프로세스에서도 다시 시작되도록 pid 확인)
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._stop_event.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    # 종료(atexit)와 HUP 시그널에서 남은 레코드 저장
+    # (메인 스레드에서 생성되지 않았거나 gunicorn이 시그널 처리기를 바꾸는 경우는 gunicorn.conf.py의 worker_exit이 저장)
+    def _install_hooks(self):
+        if self._hooks_installed:
+            return
+        self._hooks_installed = True
+        atexit.register(self.stop)
+
+        if threading.current_thread() is not threading.main_thread() or not hasattr(signal, 'SIGHUP'):
+            return
+
+        previous = signal.getsignal(signal.SIGHUP)
+
+        def handle_hup(signum, frame):
+            print(f"[{self.name}] SIGHUP 수신 - 버퍼 flush")
+            self.flush()
+            if callable(previous):
+                previous(signum, frame)
+            elif previous == signal.SIG_DFL:
+                # 기본 동작(프로세스 종료)을 그대로 유지
+                signal.signal(signal.SIGHUP, signal.SIG_DFL)
+                os.kill(os.getpid(), signal.SIGHUP)
+
+        try:
+            signal.signal(signal.SIGHUP, handle_hup)
+        except ValueError:
+            pass
+
+    def put(self, record):
+        """레코드를 큐에 추가 (가득 차 있으면 put_timeout초 대기 후 False 반환)"""
+        self._ensure_started()
+        try:
+            self._queue.put((record, 0), timeout=self.put_timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self._rejected += 1
+            return False
+
+        with self._stats_lock:
+            self._enqueued += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._flush_requested.set()
+        return True
+
+    # batch_size개가 모이거나 flush_interval초가 지날 때까지 수집
+    def _collect(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if self._stop_event.is_set() or self._flush_requested.is_set():
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.2)))
+            except queue.Empty:
+                continue
+        self._flush_requested.clear()
+
+        # 이미 쌓여 있는 것은 기다리지 않고 함께 가져감
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._collect()
+            if batch:
+                self._flush_batch(batch)
+        self.flush()
+
+    def _write(self, records):
+        """flush_fn 호출, 레코드별 상태 목록 반환 (예외는 전체 failed)"""
+        try:
+            return self.flush_fn(records)
+        except Exception as e:
+            print(f"[{self.name}] flush 오류: {str(e)}")
+            return [{'index': i, 'status': 'failed', 'error': str(e)} for i in range(len(records))]
+
+    def _isolate_failures(self, records, statuses):
+        """실패한 레코드를 반씩 나눠 다시 저장 (한 건 때문에 배치 전체가 실패하지 않도록)
+
+        flush_fn은 배치를 한 트랜잭션으로 저장하므로 DB에서 실패하는 레코드 하나가 있으면 전체가 failed가 된다.
+        나눈 두 쪽이 모두 전부 실패하면 DB 장애 등으로 보고 더 나누지 않는다.
+        """
+        failed = [i for i, status in enumerate(statuses) if status['status'] == 'failed']
+        if len(failed) < 2:
+            return statuses
+
+        with self._stats_lock:
+            self._split_count += 1
+        mid = len(failed) // 2
+        parts = []
+        for positions in (failed[:mid], failed[mid:]):
+            part = [records[i] for i in positions]
+            parts.append((positions, part, self._write(part)))
+        if all(all(status['status'] == 'failed' for status in part_statuses) for _, _, part_statuses in parts):
+            return statuses
+
+        statuses = list(statuses)
+        for positions, part, part_statuses in parts:
+            part_statuses = self._isolate_failures(part, part_statuses)
+            for i, status in zip(positions, part_statuses):
+                statuses[i] = dict(status, index=i)
+        return statuses
+
+    def _flush_batch(self, batch):
+        records = [record for record, _ in batch]
+        started = time.monotonic()
+        with self._flush_lock:
+            statuses = self._isolate_failures(records, self._write(records))
+        elapsed_ms = (time.monotonic() - started) * 1000
+
+        stored = 0
+        retried = 0
+        invalid = 0
+        dropped = 0
+        last_error = None
+        for (record, attempts), status in zip(batch, statuses):
+            if status['status'] == 'stored':
+                stored += 1
+                continue
+            last_error = status.get('error') or last_error
+            if status['status'] == 'rejected':
+                invalid += 1
+            elif attempts + 1 < self.max_retries:
+                # 일시적 오류는 다음 주기에 재시도 (큐가 가득 차면 버림)
+                try:
+                    self._queue.put_nowait((record, attempts + 1))
+                    retried += 1
+                except queue.Full:
+                    dropped += 1
+            else:
+                dropped += 1
+                print(f"[{self.name}] {self.max_retries}회 실패한 레코드 버림: {status.get('error')}")
+
+        with self._stats_lock:
+            if last_error is not None:
+                self._last_error = last_error
+            self._flushed += stored
+            self._retried += retried
+            self._invalid += invalid
+            self._dropped += dropped
+            self._flush_count += 1
+            self._last_flush_ms = elapsed_ms
+            self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+            self._last_flush_at = time.time()
+
+    def flush(self):
+        """큐에 남은 레코드를 모두 저장 (호출한 스레드에서 동기 실행)"""
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                self._flush_batch(batch)
+
+    def stop(self, timeout=10.0):
+        """백그라운드 스레드를 멈추고 남은 레코드를 저장"""
+        self._stop_event.set()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        """큐 깊이와 flush 지연 시간 등 모니터링 지표"""
+        with self._stats_lock:
+            return {
+                'depth': self._queue.qsize(),
+                'max_size': self.max_size,
+                'batch_size': self.batch_size,
+                'flush_interval': self.flush_interval,
+                'running': self._thread is not None and self._thread.is_alive() and self._pid == os.getpid(),
+                'enqueued': self._enqueued,
+                'rejected': self._rejected,
+                'flushed': self._flushed,
+                'retried': self._retried,
+                'invalid': self._invalid,
+                'dropped': self._dropped,
+                'flush_count': self._flush_count,
+                'split_count': self._split_count,
+                'last_error': self._last_error,
+                'last_flush_ms': round(self._last_flush_ms, 2) if self._last_flush_ms is not None else None,
+                'max_flush_ms': round(self._max_flush_ms, 2),
+                'avg_flush_ms': round(self._total_flush_ms / self._flush_count, 2) if self._flush_count else None,
+                'last_flush_at': self._last_flush_at
+            }